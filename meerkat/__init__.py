@@ -80,6 +80,7 @@ from meerkat.ops.sliceby.groupby import groupby
 from meerkat.ops.sort import sort
 from meerkat.provenance import provenance
 from meerkat.row import Row
+from meerkat.tools.profile import Profiler
 from meerkat.tools.utils import classproperty
 
 from .config import config
@@ -95,6 +96,9 @@ objects = ObjectColumn
 files = FileColumn
 audio = AudioColumn
 
+# alias for profiling deferred operations
+profile = Profiler
+
 # aliases for io
 from_csv = DataFrame.from_csv
 from_feather = DataFrame.from_feather
@@ -214,6 +218,8 @@ __all__ = [
     "FormatterPlaceholder",
     # <<<< Misc >>>>
     "provenance",
+    "profile",
+    "Profiler",
     "config",
     "gui",
     "format",
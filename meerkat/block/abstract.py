@@ -1,11 +1,29 @@
 from __future__ import annotations
 
+import io
 import os
+import weakref
 from dataclasses import dataclass
-from typing import TYPE_CHECKING, Dict, Hashable, List, Mapping, Sequence, Tuple, Union
+from functools import partial
+from typing import (
+    TYPE_CHECKING,
+    BinaryIO,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import dill
+import numpy as np
 
 from meerkat.errors import ConsolidationError
-from meerkat.tools.utils import dump_yaml, load_yaml
+from meerkat.tools.utils import MeerkatUnpickler, dump_meta, load_meta
 
 # an index into a block that specifies where a column's data lives in the block
 BlockIndex = Union[int, slice, str]
@@ -27,6 +45,12 @@ class BlockView:
 
 
 class AbstractBlock:
+    # the number of writes to the data of the block, which tells whether the block
+    # has changed since it was last written to disk (see `BlockManager.write`)
+    _version: int = 0
+    # whether ``write`` and ``_write_consolidated`` take a ``compression`` codec
+    _supports_compression: bool = False
+
     def __init__(self, *args, **kwargs):
         super(AbstractBlock, self).__init__(*args, **kwargs)
 
@@ -80,20 +104,73 @@ class AbstractBlock:
     def is_mmap(self):
         return False
 
+    def _checksum(self) -> Optional[str]:
+        """A fingerprint of the data of the block, which tells whether the data has
+        been changed in place (e.g. through the ``data`` of a column, which doesn't
+        bump ``_version``) since the block was written, see ``BlockManager.write``.
+
+        Returns None if the data can't be changed in place.
+        """
+        from meerkat.tools.cache import fingerprint
+
+        return fingerprint(self.data)
+
+    def _is_consolidated(self, block_ref: BlockRef) -> bool:
+        """Whether the columns in ``block_ref`` hold all of the data in the block
+        exactly once, in which case consolidating the block would only copy it."""
+        return False
+
     def write(self, path: str, *args, **kwargs):
         os.makedirs(path, exist_ok=True)
         self._write_data(path, *args, **kwargs)
-        metadata = {"klass": type(self)}
-        metadata_path = os.path.join(path, "meta.yaml")
-        dump_yaml(metadata, metadata_path)
+        self._write_meta(path)
+
+    @classmethod
+    def _write_meta(cls, path: str):
+        metadata = {"klass": cls}
+        dump_meta(metadata, path)
 
     @classmethod
-    def read(cls, path: str, *args, **kwargs):
+    def _write_consolidated(
+        cls, block_refs: Sequence[BlockRef], path: str, **kwargs
+    ) -> Dict[str, BlockIndex]:
+        """Write the columns in ``block_refs`` to ``path`` as a single block.
+
+        Subclasses that can stream the data of each column into the written block
+        override this, so that the columns aren't consolidated in memory first.
+
+        Returns:
+            Dict[str, BlockIndex]: The index of each column in the written block.
+        """
+        block_ref = cls.consolidate(block_refs)
+        block_ref.block.write(path, **kwargs)
+        return block_ref.block_indices
+
+    @classmethod
+    def read(cls, path: str, *args, lazy: bool = False, nrows: int = None, **kwargs):
+        """Read the block written to ``path``.
+
+        Args:
+            lazy (bool, optional): Whether to defer reading the data of the block
+                until it's first accessed. Only blocks that support it (i.e.
+                subclasses of ``SelectionBlock``) are read lazily. Defaults to False.
+            nrows (int, optional): The number of rows of the block, which lets a
+                lazily read block report its length without reading its data.
+        """
         assert os.path.exists(path), f"`path` {path} does not exist."
-        metadata_path = os.path.join(path, "meta.yaml")
-        metadata = dict(load_yaml(metadata_path))
+        metadata = dict(load_meta(path))
 
         block_class = metadata["klass"]
+        if lazy and issubclass(block_class, SelectionBlock):
+            return block_class._read_lazy(
+                partial(block_class._read_data, path, *args, **kwargs),
+                nrows=nrows,
+                read_rows=(
+                    partial(block_class._read_data, path, *args, **kwargs)
+                    if block_class._reads_row_ranges
+                    else None
+                ),
+            )
         data = block_class._read_data(path, *args, **kwargs)
         return block_class(data)
 
@@ -103,3 +180,280 @@ class AbstractBlock:
     @staticmethod
     def _read_data(path: str, *args, **kwargs) -> object:
         raise NotImplementedError
+
+    def _write_payload(self, f: BinaryIO) -> dict:
+        """Write the data of the block to the open file ``f``, as a payload of a
+        single-file container (see :mod:`meerkat.block.container`).
+
+        Returns:
+            dict: The metadata ``_read_payload`` needs to read the data back.
+        """
+        dill.dump(self.data, f)
+        return {"pickled": True}
+
+    @staticmethod
+    def _read_payload(buffer: memoryview, meta: dict, mmap: bool = False) -> object:
+        """Read the data written by ``_write_payload`` from ``buffer``.
+
+        Args:
+            mmap (bool, optional): Whether the data may be a zero-copy view of
+                ``buffer``, rather than a copy. Defaults to False.
+        """
+        return MeerkatUnpickler(io.BytesIO(buffer)).load()
+
+
+def _covers_block_axis(block_ref: BlockRef, width: int) -> bool:
+    """Whether the columns in ``block_ref`` index each position along the column
+    axis of a block with ``width`` positions exactly once."""
+    positions = []
+    for col in block_ref.values():
+        index = col._block_index
+        if isinstance(index, slice):
+            positions.extend(range(*index.indices(width)))
+        else:
+            positions.append(index)
+    return sorted(positions) == list(range(width))
+
+
+class SelectionBlock(AbstractBlock):
+    """A block whose row selections are composed lazily.
+
+    Indexing the rows of the block with an array or a mask does not gather a copy
+    of its data. Instead, the new block shares the data of the block it was indexed
+    from and keeps a selection vector: the positions of its rows in that data.
+    Chained selections compose their selection vectors, so each costs O(selected
+    rows), and the rows are only gathered when ``data`` is first accessed.
+
+    The block that owns the data keeps track of the blocks selected from it, and
+    gathers their rows before its data is written to (see ``_detach_dependents``),
+    so a selection never sees writes made after it was taken.
+    """
+
+    # whether ``_read_data`` takes ``rows``, a slice or an array of positions, to
+    # only read those rows
+    _reads_row_ranges: bool = False
+
+    def __init__(self, data, *args, selection: np.ndarray = None, **kwargs):
+        super(SelectionBlock, self).__init__(*args, **kwargs)
+        self._data = data
+        self.selection = selection
+        self._dependents = weakref.WeakSet()
+        self._source: SelectionBlock = None
+
+    @property
+    def _data(self):
+        data = self.__dict__["_data"]
+        if isinstance(data, _PendingRead):
+            # the block was read lazily, see `_read_lazy`
+            data = self.__dict__["_data"] = data.read()
+        return data
+
+    @_data.setter
+    def _data(self, value):
+        self.__dict__["_data"] = value
+
+    @property
+    def is_pending(self) -> bool:
+        """Whether the rows of the block have yet to be read or gathered."""
+        return self.selection is not None or isinstance(
+            self.__dict__["_data"], _PendingRead
+        )
+
+    @classmethod
+    def _read_lazy(
+        cls,
+        read: Callable[[], object],
+        nrows: int = None,
+        read_rows: Callable[..., object] = None,
+    ):
+        """Return a block whose data is read by calling ``read`` when it's first
+        accessed.
+
+        Args:
+            read_rows (Callable, optional): A function that reads only the rows it's
+                passed as ``rows`` (a slice with a step of 1 or an array of
+                non-negative positions), with which the rows of the block can be
+                indexed before its data is read, see ``_pending_rows``.
+        """
+        block = cls.__new__(cls)
+        SelectionBlock.__init__(
+            block, _PendingRead(read, nrows=nrows, read_rows=read_rows)
+        )
+        return block
+
+    def _pending_rows(
+        self, index: Union[slice, np.ndarray]
+    ) -> Optional[SelectionBlock]:
+        """A block that lazily reads only the rows of the block at ``index`` (a
+        slice, or an array of positions or a mask), if the data of the block has yet
+        to be read and can be read by rows. Otherwise, None."""
+        pending = self.__dict__["_data"]
+        if (
+            self.selection is not None
+            or not isinstance(pending, _PendingRead)
+            or pending.read_rows is None
+            or pending.nrows is None
+        ):
+            return None
+        selected = _normalize_rows(index, pending.nrows)
+        if selected is None:
+            return None
+
+        def read_rows(rows: Union[slice, np.ndarray]):
+            return pending.read_rows(rows=_compose_rows(selected, rows))
+
+        return self._read_lazy(
+            partial(pending.read_rows, rows=selected),
+            nrows=_num_rows(selected),
+            read_rows=read_rows,
+        )
+
+    @property
+    def data(self):
+        self._gather()
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+        self.selection = None
+        self._source = None
+
+    def _gather(self):
+        if self.selection is not None:
+            self._data = self._take(self._data, self.selection)
+            self.selection = None
+            self._source = None
+
+    def _detach_dependents(self):
+        """Gather the rows of the blocks lazily selected from this block, so that
+        they don't see subsequent writes to its data."""
+        for block in list(self._dependents):
+            block._gather()
+        self._dependents.clear()
+
+    @property
+    def nrows(self) -> int:
+        if self.selection is not None:
+            return len(self.selection)
+        data = self.__dict__["_data"]
+        if isinstance(data, _PendingRead) and data.nrows is not None:
+            return data.nrows
+        return len(self._data)
+
+    def _select(self, index: Union[slice, np.ndarray]) -> SelectionBlock:
+        """Return a block with the rows at ``index``, without gathering them."""
+        if self.selection is not None:
+            if not isinstance(index, slice):
+                index = np.asarray(index)
+            return self._dependent(self.selection[index])
+
+        length = len(self._data)
+        if isinstance(index, slice):
+            selection = np.arange(*index.indices(length))
+        else:
+            index = np.asarray(index)
+            if index.dtype == bool:
+                if len(index) != length:
+                    raise IndexError(
+                        f"Boolean index of length {len(index)} does not match the "
+                        f"number of rows {length}."
+                    )
+                selection = np.flatnonzero(index)
+            else:
+                selection = index.astype(np.int64, copy=False)
+                if ((selection < -length) | (selection >= length)).any():
+                    raise IndexError(
+                        f"Index out of bounds for block with {length} rows."
+                    )
+                selection = np.where(selection < 0, selection + length, selection)
+        return self._dependent(selection)
+
+    def _dependent(self, selection: np.ndarray) -> SelectionBlock:
+        block = self.__class__(self._data, selection=selection)
+        # register the block with the block that owns the data
+        block._source = self if self.selection is None else self._source
+        block._source._dependents.add(block)
+        return block
+
+    def _position(self, index: int) -> int:
+        """The position of row ``index`` of the block in its underlying data."""
+        return index if self.selection is None else int(self.selection[index])
+
+    @staticmethod
+    def _take(data: object, selection: np.ndarray) -> object:
+        """Gather the rows at positions ``selection`` of ``data``."""
+        raise NotImplementedError
+
+    def __getstate__(self):
+        # a copy of the block does not share its data, so the rows are gathered
+        self._gather()
+        state = self.__dict__.copy()
+        del state["_dependents"], state["_source"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._dependents = weakref.WeakSet()
+        self._source = None
+
+
+def _normalize_rows(
+    index: Union[slice, np.ndarray], length: int
+) -> Optional[Union[slice, np.ndarray]]:
+    """Normalize an ``index`` into rows of a block with ``length`` rows to either a
+    slice with a step of 1 or an array of non-negative positions, or None if
+    ``index`` is neither a slice nor an array."""
+    if isinstance(index, slice):
+        start, stop, step = index.indices(length)
+        if step == 1:
+            return slice(start, max(start, stop))
+        return np.arange(start, stop, step)
+    if not isinstance(index, np.ndarray) or index.ndim != 1:
+        return None
+    if index.dtype == bool:
+        if len(index) != length:
+            raise IndexError(
+                f"Boolean index of length {len(index)} does not match the "
+                f"number of rows {length}."
+            )
+        return np.flatnonzero(index)
+    if len(index) and not np.issubdtype(index.dtype, np.integer):
+        return None
+    rows = index.astype(np.int64, copy=False)
+    if ((rows < -length) | (rows >= length)).any():
+        raise IndexError(f"Index out of bounds for block with {length} rows.")
+    return np.where(rows < 0, rows + length, rows)
+
+
+def _num_rows(rows: Union[slice, np.ndarray]) -> int:
+    return rows.stop - rows.start if isinstance(rows, slice) else len(rows)
+
+
+def _compose_rows(
+    rows: Union[slice, np.ndarray], index: Union[slice, np.ndarray]
+) -> Union[slice, np.ndarray]:
+    """The rows that the normalized ``index`` into the normalized ``rows`` of a
+    block selects from the block."""
+    if isinstance(rows, slice):
+        if isinstance(index, slice):
+            return slice(rows.start + index.start, rows.start + index.stop)
+        return rows.start + index
+    return rows[index]
+
+
+class _PendingRead:
+    """The data of a block that has yet to be read by calling ``read``."""
+
+    def __init__(
+        self,
+        read: Callable[[], object],
+        nrows: int = None,
+        read_rows: Callable[..., object] = None,
+    ):
+        self._read = read
+        self.nrows = nrows
+        self.read_rows = read_rows
+
+    def read(self) -> object:
+        return self._read()
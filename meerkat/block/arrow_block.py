@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+import json
 import os
 from dataclasses import dataclass
-from typing import Dict, Hashable, List, Sequence, Union
+from functools import partial
+from typing import TYPE_CHECKING, BinaryIO, Dict, Hashable, List, Sequence, Union
 
 import numpy as np
 import pandas as pd
@@ -14,29 +16,48 @@ from meerkat.columns.tensor.numpy import NumPyTensorColumn
 from meerkat.columns.tensor.torch import TorchTensorColumn
 from meerkat.tools.lazy_loader import LazyLoader
 
-from .abstract import AbstractBlock, BlockIndex, BlockView
+from .abstract import BlockIndex, BlockView, SelectionBlock
+
+if TYPE_CHECKING:
+    from meerkat.tools.parquet import ParquetSource
 
 torch = LazyLoader("torch")
 
+# the size of the record batches that tables are written in
+RECORD_BATCH_NBYTES = 1 << 20
+# the magic bytes at the start of a file in the IPC file format
+_FILE_MAGIC = b"ARROW1"
+# the key in the schema of a written table holding the offsets of its record batches
+_BATCH_OFFSETS_KEY = b"meerkat:batch_offsets"
+# the least average number of rows per run of a selection that is taken chunk by
+# chunk even though it has more runs than there are chunks, see `take_chunked`
+_MIN_RUN_ROWS = 64
+
 
-class ArrowBlock(AbstractBlock):
+class ArrowBlock(SelectionBlock):
     @dataclass(eq=True, frozen=True)
     class Signature:
         nrows: int
         klass: type
         # mmap: bool
 
+    _supports_compression = True
+    _reads_row_ranges = True
+
     def __init__(self, data: pa.Table, *args, **kwargs):
-        super(ArrowBlock, self).__init__(*args, **kwargs)
-        self.data = data
+        super(ArrowBlock, self).__init__(data, *args, **kwargs)
 
     @property
     def signature(self) -> Hashable:
-        return self.Signature(klass=ArrowBlock, nrows=len(self.data))
+        return self.Signature(klass=ArrowBlock, nrows=self.nrows)
 
     def _get_data(self, index: BlockIndex) -> pa.Array:
         return self.data[index]
 
+    def _checksum(self) -> None:
+        # arrow arrays are immutable, so the data can't be changed in place
+        return None
+
     @classmethod
     def from_column_data(cls, data: pa.Array) -> BlockView:
         data = pa.Table.from_pydict({"col": data})
@@ -50,6 +71,18 @@ class ArrowBlock(AbstractBlock):
             BlockView(block=block, block_index=column) for column in data.column_names
         ]
 
+    @classmethod
+    def from_parquet(cls, source: "ParquetSource", column: str) -> BlockView:
+        """Return a view of a block holding ``column`` of a Parquet file, whose
+        rows are only read from the file when they're first accessed.
+
+        Indexing the rows of the block before its data is read only reads the row
+        groups holding those rows (see ``SelectionBlock._pending_rows``).
+        """
+        read = partial(source.read, [column])
+        block = cls._read_lazy(read, nrows=source.num_rows, read_rows=read)
+        return block[column]
+
     @classmethod
     def _consolidate(
         cls,
@@ -77,6 +110,11 @@ class ArrowBlock(AbstractBlock):
 
         return BlockRef(block=block, columns=new_columns)
 
+    def _is_consolidated(self, block_ref: BlockRef) -> bool:
+        return sorted(col._block_index for col in block_ref.values()) == sorted(
+            self._data.column_names
+        )
+
     @staticmethod
     def _convert_index(index):
         if isinstance(index, list):
@@ -115,27 +153,24 @@ class ArrowBlock(AbstractBlock):
             # if indexing a single row, we do not return a block manager, just a dict
             # Convert to Python object for consistency with other ScalarColumn
             # implementations.
+            # the row of a block that has yet to be read is read on its own
+            block = self._pending_rows(np.array([index]))
+            if block is None:
+                data, position = self._data, self._position(index)
+            else:
+                data, position = block._data, 0
             return {
-                name: self.data[col._block_index][index].as_py()
+                name: data[col._block_index][position].as_py()
                 for name, col in block_ref.columns.items()
             }
 
-        if isinstance(index, slice):
-            data = self.data[index]
-        elif index.dtype == bool:
-            data = self.data.filter(pa.array(index))
-        else:
-            # we do not want to use ``data = self.data.take(index)``
-            # because it can't handle ChunkedArrays that don't fit in an Array
-            # https://issues.apache.org/jira/browse/ARROW-9773
-            # TODO (Sabri): Huggingface gets around this in a similar manner but
-            # applies the slices to the record batches, because this allows them to do
-            # the batch lookup in numpy, which is faster than pure python, which is
-            # presumably why Table.slice does
-            # noqa E501, https://github.com/huggingface/datasets/blob/491dad8507792f6f51077867e22412af7cd5c2f1/src/datasets/table.py#L110
-            data = pa.concat_tables(self.data.slice(i, 1) for i in index)
-
-        block = self.__class__(data)
+        # the rows of a block that has yet to be read are read on their own
+        block = self._pending_rows(index)
+        if block is None and isinstance(index, slice) and self.selection is None:
+            # slices are zero-copy, so there is nothing to gather
+            block = self.__class__(self._data[index])
+        elif block is None:
+            block = self._select(index)
 
         columns = {
             name: col._clone(data=block[col._block_index])
@@ -145,28 +180,167 @@ class ArrowBlock(AbstractBlock):
         return BlockRef(block=block, columns=columns)
 
     @staticmethod
-    def _write_table(path: str, table: pa.Table):
-        # noqa E501, source: huggingface implementation https://github.com/huggingface/datasets/blob/92304b42cf0cc6edafc97832c07de767b81306a6/src/datasets/table.py#L50
-        with open(path, "wb") as sink:
-            writer = pa.RecordBatchStreamWriter(sink=sink, schema=table.schema)
-            batches: List[pa.RecordBatch] = table.to_batches()
+    def _take(data: pa.Table, selection: np.ndarray) -> pa.Table:
+        return take_chunked(data, selection)
+
+    @staticmethod
+    def _write_table(path: str, table: pa.Table, compression: str = None):
+        """Write ``table`` to ``path`` in the IPC file format, in record batches of
+        about ``RECORD_BATCH_NBYTES`` each, so that a range of rows can be read by
+        only reading the batches that hold them (see ``_read_table``)."""
+        row_nbytes = table.nbytes // max(1, len(table))
+        batch_rows = max(1, RECORD_BATCH_NBYTES // max(1, row_nbytes))
+        batches = table.to_batches(max_chunksize=batch_rows)
+        # the offsets of the batches are stored in the schema, so that the batches
+        # holding a range of rows are known without reading any batch
+        offsets = np.cumsum([0] + [batch.num_rows for batch in batches]).tolist()
+        schema = table.schema.with_metadata(
+            {
+                **(table.schema.metadata or {}),
+                _BATCH_OFFSETS_KEY: json.dumps(offsets).encode(),
+            }
+        )
+        with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(
+            sink, schema, options=pa.ipc.IpcWriteOptions(compression=compression)
+        ) as writer:
             for batch in batches:
                 writer.write_batch(batch)
-            writer.close()
-            return sum(batch.nbytes for batch in batches)
+        return sum(batch.nbytes for batch in batches)
 
     @staticmethod
-    def _read_table(path: str, mmap: bool = False):
-        if mmap:
-            return pa.ipc.open_stream(pa.memory_map(path)).read_all()
-        else:
-            return pa.ipc.open_stream(pa.input_stream(path)).read_all()
+    def _write_stream(sink: BinaryIO, table: pa.Table, compression: str = None):
+        """Write ``table`` to ``sink`` as an IPC stream, compressing the buffers of
+        each record batch with the ``compression`` codec ("zstd" or "lz4")."""
+        # noqa E501, source: huggingface implementation https://github.com/huggingface/datasets/blob/92304b42cf0cc6edafc97832c07de767b81306a6/src/datasets/table.py#L50
+        writer = pa.RecordBatchStreamWriter(
+            sink=sink,
+            schema=table.schema,
+            options=pa.ipc.IpcWriteOptions(compression=compression),
+        )
+        batches: List[pa.RecordBatch] = table.to_batches()
+        for batch in batches:
+            writer.write_batch(batch)
+        writer.close()
+        return sum(batch.nbytes for batch in batches)
 
-    def _write_data(self, path: str):
-        self._write_table(os.path.join(path, "data.arrow"), self.data)
+    @staticmethod
+    def _read_table(
+        path: str, mmap: bool = False, rows: Union[slice, np.ndarray] = None
+    ) -> pa.Table:
+        """Read the table written to ``path``, or only the ``rows`` of it (a slice
+        with a step of 1 or an array of positions), which only reads the record
+        batches holding those rows."""
+        with (pa.memory_map(path) if mmap else pa.OSFile(path)) as source:
+            if source.read(len(_FILE_MAGIC)) != _FILE_MAGIC:
+                # tables used to be written as IPC streams, which are read in full
+                source.seek(0)
+                table = pa.ipc.open_stream(source).read_all()
+                if rows is None:
+                    return table
+                if isinstance(rows, slice):
+                    return table.slice(rows.start, rows.stop - rows.start)
+                return table.take(rows)
+
+            reader = pa.ipc.open_file(source)
+            metadata = dict(reader.schema.metadata)
+            offsets = np.array(json.loads(metadata.pop(_BATCH_OFFSETS_KEY)))
+            if rows is None:
+                batches = np.arange(reader.num_record_batches)
+            elif isinstance(rows, slice):
+                batches = np.arange(
+                    np.searchsorted(offsets, rows.start, side="right") - 1,
+                    np.searchsorted(offsets, rows.stop, side="left"),
+                )
+            else:
+                batch_of_rows = np.searchsorted(offsets, rows, side="right") - 1
+                batches = np.unique(batch_of_rows)
+            table = pa.Table.from_batches(
+                [reader.get_batch(int(batch)) for batch in batches],
+                schema=reader.schema,
+            ).replace_schema_metadata(metadata or None)
+
+        if rows is None:
+            return table
+        # the offsets of the batches that were read in ``table``
+        read_offsets = np.cumsum([0, *np.diff(offsets)[batches]])
+        if isinstance(rows, slice):
+            start = rows.start - offsets[batches[0]] if len(batches) else 0
+            return table.slice(start, rows.stop - rows.start)
+        positions = (
+            rows
+            - offsets[batch_of_rows]
+            + read_offsets[np.searchsorted(batches, batch_of_rows)]
+        )
+        return table.take(positions)
+
+    def _write_data(self, path: str, compression: str = None):
+        self._write_table(
+            os.path.join(path, "data.arrow"), self.data, compression=compression
+        )
 
     @staticmethod
     def _read_data(
-        path: str, mmap: bool = False, read_inputs: Dict[str, Column] = None
+        path: str,
+        mmap: bool = False,
+        read_inputs: Dict[str, Column] = None,
+        rows: Union[slice, np.ndarray] = None,
     ):
-        return ArrowBlock._read_table(os.path.join(path, "data.arrow"), mmap=mmap)
+        return ArrowBlock._read_table(
+            os.path.join(path, "data.arrow"), mmap=mmap, rows=rows
+        )
+
+    def _write_payload(self, f: BinaryIO) -> dict:
+        self._write_stream(f, self.data)
+        return {}
+
+    @staticmethod
+    def _read_payload(buffer: memoryview, meta: dict, mmap: bool = False) -> object:
+        buffer = pa.py_buffer(buffer if mmap else bytes(buffer))
+        return pa.ipc.open_stream(buffer).read_all()
+
+
+def take_chunked(
+    data: Union[pa.Table, pa.ChunkedArray, pa.Array], selection: np.ndarray
+) -> Union[pa.Table, pa.ChunkedArray, pa.Array]:
+    """Gather the rows at positions ``selection`` of a table or an array, chunk by
+    chunk.
+
+    Arrow's ``take`` combines the chunks of ``data`` into a single array first,
+    which copies all of ``data`` and fails when it doesn't fit in an array (see
+    https://issues.apache.org/jira/browse/ARROW-9773). Instead, each run of
+    consecutive positions in ``selection`` that falls in the same chunk is taken from
+    that chunk, and the result holds one chunk per run. Selections that jump
+    between chunks more often than they hold rows of them (e.g. shuffles) would
+    result in a chunk per few rows, so they are taken with Arrow's ``take``,
+    unless that fails.
+    """
+    is_table = isinstance(data, pa.Table)
+    if is_table:
+        chunks = data.to_batches()
+    elif isinstance(data, pa.ChunkedArray):
+        chunks = data.chunks
+    else:
+        chunks = [data]
+    if len(chunks) <= 1:
+        return data.take(selection)
+
+    selection = np.asarray(selection, dtype=np.int64)
+    offsets = np.cumsum([0] + [len(chunk) for chunk in chunks])
+    chunk_of_rows = np.searchsorted(offsets, selection, side="right") - 1
+    # the positions in ``selection`` at which each run starts
+    run_starts = np.flatnonzero(np.diff(chunk_of_rows, prepend=-1))
+    if len(run_starts) > max(len(chunks), len(selection) // _MIN_RUN_ROWS):
+        try:
+            return data.take(selection)
+        except pa.ArrowInvalid:
+            pass
+
+    pieces = []
+    for start, stop in zip(run_starts, [*run_starts[1:], len(selection)]):
+        chunk = chunk_of_rows[start]
+        pieces.append(
+            chunks[chunk].take(pa.array(selection[start:stop] - offsets[chunk]))
+        )
+    if is_table:
+        return pa.Table.from_batches(pieces, schema=data.schema)
+    return pa.chunked_array(pieces, type=data.type)
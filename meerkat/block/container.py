@@ -0,0 +1,297 @@
+"""A single-file container format for block managers.
+
+Writing a block manager to a directory (see :meth:`BlockManager.write`) produces a
+tree of metadata files and per-block data files, so reading it back opens and
+parses many small files. A container instead holds the data of every block in a
+single file, followed by a footer indexing the blocks and columns::
+
+    MAGIC | payload | padding | payload | ... | footer | footer length | MAGIC
+
+Each payload is the data of one block (see ``AbstractBlock._write_payload``),
+aligned to ``ALIGNMENT`` bytes so that NumPy and Arrow payloads can be read as
+zero-copy views of the memory-mapped file. Reading a container opens and maps the
+file once, parses the footer, and only reads the payloads of the columns that are
+read, so individual columns can be read at random.
+"""
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING, BinaryIO, Dict, List, Sequence, Tuple
+
+import pyarrow as pa
+
+from meerkat.block.abstract import AbstractBlock, SelectionBlock
+from meerkat.block.deferred_block import DeferredBlock, DeferredOp
+from meerkat.block.ref import BlockRef
+from meerkat.columns.abstract import Column
+from meerkat.tools.utils import dumps_manifest, loads_manifest
+
+if TYPE_CHECKING:
+    from meerkat.block.manager import BlockManager
+
+MAGIC = b"MKCNTNR1"
+ALIGNMENT = 64
+# the footer length is stored as an unsigned 8-byte little-endian integer
+_FOOTER_LENGTH_SIZE = 8
+
+
+def is_container(path: str) -> bool:
+    """Whether ``path`` is a file written by :func:`write_container`."""
+    if not os.path.isfile(path):
+        return False
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def write_container(path: str, mgr: BlockManager, meta: dict = None):
+    """Write the block manager ``mgr`` to a single file at ``path``.
+
+    The file is written next to ``path`` and then moved into place, so an
+    interrupted write leaves a previously written container intact.
+
+    Args:
+        path (str): The path of the file.
+        mgr (BlockManager): The block manager to write.
+        meta (dict, optional): Metadata to store in the footer of the container,
+            which :func:`read_container` returns. Defaults to None.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        writer = _ContainerWriter(f)
+        writer.add_manager(mgr)
+
+        footer = {
+            **({} if meta is None else meta),
+            "mgr": {
+                "len": mgr.nrows,
+                "_column_order": list(mgr.keys()),
+                "inputs": writer.inputs,
+                "columns": writer.columns,
+                "blocks": writer.blocks,
+            },
+        }
+        footer = dumps_manifest(footer).encode()
+        f.write(footer)
+        f.write(len(footer).to_bytes(_FOOTER_LENGTH_SIZE, "little"))
+        f.write(MAGIC)
+    os.replace(tmp_path, path)
+
+
+def read_container(
+    path: str,
+    columns: Sequence[str] = None,
+    lazy: bool = False,
+    mmap: bool = None,
+    **kwargs,
+) -> Tuple[dict, BlockManager]:
+    """Read a block manager written to ``path`` with :func:`write_container`.
+
+    Args:
+        path (str): The path of the file.
+        columns (Sequence[str], optional): The columns to read. Defaults to None,
+            in which case all columns are read.
+        lazy (bool, optional): Whether to defer reading the payloads of NumPy,
+            Pandas and Arrow blocks until a column in the block is first accessed.
+            Defaults to False.
+        mmap (bool, optional): Whether NumPy and Arrow blocks are zero-copy views of
+            the memory-mapped file, rather than copies. Defaults to None, in which
+            case they are when reading lazily. Memory-mapped NumPy blocks are
+            read-only.
+
+    Returns:
+        Tuple[dict, BlockManager]: The metadata passed to :func:`write_container`
+            and the block manager.
+    """
+    from meerkat.block.manager import BlockManager, _deserialize_block_index
+
+    # a zero-copy view of the whole memory-mapped file, which the payloads are
+    # sliced from
+    file = pa.memory_map(path, "r").read_buffer()
+    size = file.size
+    tail_size = _FOOTER_LENGTH_SIZE + len(MAGIC)
+    tail = file[size - tail_size :].to_pybytes()
+    if size < len(MAGIC) + tail_size or tail[_FOOTER_LENGTH_SIZE:] != MAGIC:
+        raise ValueError(f"{path} is not a meerkat container.")
+    footer_length = int.from_bytes(tail[:_FOOTER_LENGTH_SIZE], "little")
+    footer = file.slice(size - tail_size - footer_length, footer_length)
+    meta = loads_manifest(footer.to_pybytes())
+    mgr_meta = meta.pop("mgr")
+    mmap = lazy if mmap is None else mmap
+
+    def _read_payload(block_class: type, block_meta: dict):
+        buffer = file.slice(block_meta["offset"], block_meta["nbytes"])
+        return block_class._read_payload(memoryview(buffer), block_meta, mmap=mmap)
+
+    if columns is None:
+        columns = set(mgr_meta["columns"]) - set(mgr_meta["inputs"])
+    else:
+        columns = set(columns)
+    needed = _with_inputs(columns, mgr_meta)
+
+    read_columns: Dict[str, Column] = {}
+    blocks: Dict[int, AbstractBlock] = {}
+    mgr = BlockManager()
+    # the columns are in the footer in the order they were written, so the inputs
+    # of deferred blocks are read before the blocks
+    for name, col_meta in mgr_meta["columns"].items():
+        if name not in needed:
+            continue
+
+        if "block" in col_meta:
+            block_id = col_meta["block"]["block_id"]
+            if block_id not in blocks:
+                block_meta = mgr_meta["blocks"][block_id]
+                block_class = block_meta["klass"]
+                if issubclass(block_class, DeferredBlock):
+                    op = DeferredOp(
+                        args=[read_columns[arg] for arg in block_meta["args"]],
+                        kwargs={
+                            key: read_columns[kwarg]
+                            for key, kwarg in block_meta["kwargs"].items()
+                        },
+                        **block_meta["state"],
+                    )
+                    blocks[block_id] = block_class(op)
+                elif lazy and issubclass(block_class, SelectionBlock):
+                    blocks[block_id] = block_class._read_lazy(
+                        lambda cls=block_class, m=block_meta: _read_payload(cls, m),
+                        nrows=mgr_meta["len"],
+                    )
+                else:
+                    blocks[block_id] = block_class(
+                        _read_payload(block_class, block_meta)
+                    )
+            block = blocks[block_id]
+            data = block[_deserialize_block_index(col_meta["block"]["block_index"])]
+        else:
+            data = _read_payload(AbstractBlock, col_meta["payload"])
+
+        col = col_meta["dtype"].read(path, _data=data, _meta=col_meta, **kwargs)
+        read_columns[name] = col
+        if name in columns:
+            mgr.add_column(col, name)
+
+    mgr.reorder([name for name in mgr_meta["_column_order"] if name in mgr])
+    return meta, mgr
+
+
+def _with_inputs(columns: Sequence[str], mgr_meta: dict) -> set:
+    """The names of ``columns`` and of all the columns that the deferred blocks
+    holding them take as inputs."""
+    needed = set(columns)
+    for name in reversed(list(mgr_meta["columns"])):
+        col_meta = mgr_meta["columns"][name]
+        if name not in needed or "block" not in col_meta:
+            continue
+        block_meta = mgr_meta["blocks"][col_meta["block"]["block_id"]]
+        if issubclass(block_meta["klass"], DeferredBlock):
+            needed.update(block_meta["args"])
+            needed.update(block_meta["kwargs"].values())
+    return needed
+
+
+class _ContainerWriter:
+    """Writes the payloads of the blocks of a block manager to ``f`` and collects
+    the footer of the container."""
+
+    def __init__(self, f: BinaryIO):
+        self.f = f
+        self.columns: Dict[str, dict] = {}
+        self.blocks: List[dict] = []
+        # the names of the columns that are only written because a deferred block
+        # takes them as inputs
+        self.inputs: List[str] = []
+        # maps the ids of the written columns to their names in the footer
+        self._written: Dict[int, str] = {}
+
+    def add_manager(self, mgr: BlockManager):
+        # deferred blocks may depend on any other block, so they're written last,
+        # in topological order
+        for name, col in mgr.items():
+            if not col.is_blockable():
+                self._add_column(name, col)
+        for block_ref in mgr._block_refs.values():
+            if not isinstance(block_ref.block, DeferredBlock):
+                self._add_block_ref(block_ref)
+        for _, block_ref in mgr.topological_block_refs():
+            if isinstance(block_ref.block, DeferredBlock):
+                self._add_block_ref(block_ref)
+
+    def _add_input(self, col: Column) -> str:
+        if id(col) in self._written:
+            return self._written[id(col)]
+
+        name = f"__input_{len(self.inputs)}__"
+        self.inputs.append(name)
+        if col.is_blockable():
+            self._add_block_ref(BlockRef(columns={name: col}, block=col._block))
+        else:
+            self._add_column(name, col)
+        return name
+
+    def _add_block_ref(self, block_ref: BlockRef):
+        from meerkat.block.manager import _serialize_block_index
+
+        block = block_ref.block
+        if isinstance(block, DeferredBlock):
+            op = block.data
+            block_meta = {
+                "klass": type(block),
+                "state": op._get_state(),
+                "args": [self._add_input(arg) for arg in op.args],
+                "kwargs": {
+                    key: self._add_input(kwarg) for key, kwarg in op.kwargs.items()
+                },
+            }
+            written_ref = block_ref
+        else:
+            # only write the data in the block that the columns hold
+            written_ref = (
+                block_ref
+                if block._is_consolidated(block_ref)
+                else type(block).consolidate([block_ref])
+            )
+            block_meta = {
+                "klass": type(block),
+                **self._write_payload(written_ref.block),
+            }
+
+        block_id = len(self.blocks)
+        self.blocks.append(block_meta)
+        for name, col in block_ref.items():
+            self.columns[name] = {
+                **col._get_meta(),
+                "state": col._get_state(),
+                "block": {
+                    "block_id": block_id,
+                    "block_index": _serialize_block_index(
+                        written_ref[name]._block_index
+                    ),
+                },
+            }
+            self._written[id(col)] = name
+
+    def _add_column(self, name: str, col: Column):
+        self.columns[name] = {
+            **col._get_meta(),
+            "state": col._get_state(),
+            "payload": self._write_payload(_DataBlock(col)),
+        }
+        self._written[id(col)] = name
+
+    def _write_payload(self, block: AbstractBlock) -> dict:
+        offset = self.f.tell()
+        padding = -offset % ALIGNMENT
+        self.f.write(b"\0" * padding)
+        offset += padding
+
+        meta = block._write_payload(self.f)
+        return {"offset": offset, "nbytes": self.f.tell() - offset, **meta}
+
+
+class _DataBlock(AbstractBlock):
+    """Writes the data of a column that is not in a block as a payload."""
+
+    def __init__(self, col: Column):
+        self.data = col.data
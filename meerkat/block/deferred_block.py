@@ -1,8 +1,9 @@
 from __future__ import annotations
 
+import itertools
 import os
 from copy import copy
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Dict, Hashable, List, Sequence, Tuple, Union
 
 import numpy as np
@@ -11,10 +12,19 @@ from cytoolz import merge_with
 import meerkat as mk
 from meerkat.block.ref import BlockRef
 from meerkat.columns.abstract import Column
-from meerkat.tools.utils import dump_yaml, load_yaml, meerkat_dill_load, translate_index
+from meerkat.tools.aio import resolve, resolve_all
+from meerkat.tools.cache import MemoryCache
+from meerkat.tools.profile import span
+from meerkat.tools.utils import dump_meta, load_meta, meerkat_dill_load, translate_index
 
 from .abstract import AbstractBlock, BlockIndex, BlockView
 
+_MISSING = object()
+
+# distinguishes the cells of sliced ops that no longer match the op they were sliced
+# from, see `DeferredOp._cell_version`
+_CELL_TOKENS = itertools.count()
+
 
 @dataclass
 class DeferredCellOp:
@@ -23,6 +33,10 @@ class DeferredCellOp:
     fn: callable
     is_batched_fn: bool
     return_index: Union[str, int] = None
+    # the cell cache of the op the cell was taken from and the key of the cell in
+    # it, see `DeferredOp._get_cell_cached`
+    cache: MemoryCache = field(default=None, repr=False, compare=False)
+    key: Tuple[Tuple, int] = field(default=None, repr=False, compare=False)
 
     @staticmethod
     def prepare_arg(arg):
@@ -35,9 +49,14 @@ class DeferredCellOp:
         return arg
 
     def _get(self):
-        args = [self.prepare_arg(arg) for arg in self.args]
-        kwargs = {kw: self.prepare_arg(arg) for kw, arg in self.kwargs.items()}
-        out = self.fn(*args, **kwargs)
+        if self.cache is not None and self.cache.enabled:
+            try:
+                out = self.cache[self.key]
+            except KeyError:
+                out = self._call()
+                self.cache[self.key] = out
+        else:
+            out = self._call()
 
         if self.return_index is not None:
             return out[self.return_index]
@@ -47,6 +66,14 @@ class DeferredCellOp:
 
         return out
 
+    def _call(self):
+        with span(self.fn, "index", rows=1):
+            args = [self.prepare_arg(arg) for arg in self.args]
+            kwargs = {kw: self.prepare_arg(arg) for kw, arg in self.kwargs.items()}
+        with span(self.fn, "fn", rows=1) as s:
+            s.output = output = resolve(self.fn(*args, **kwargs))
+        return output
+
     def with_return_index(self, index: Union[str, int]):
         op = copy(self)
         op.return_index = index
@@ -92,6 +119,33 @@ class DeferredOp:
     return_index: Union[str, int] = None
     materialize_inputs: bool = True
 
+    def __post_init__(self):
+        # cache of materialized cells keyed by row position, shared by the copies of
+        # the op held by the columns of a block (see `with_return_index`) and by the
+        # ops sliced from it (see `_share_cells`)
+        self._cell_cache = MemoryCache()
+        # for an op sliced from another one: the op it was sliced from, and the
+        # versions of both when it was sliced (see `_cell_version`)
+        self._cell_parent: Tuple[DeferredOp, Tuple, Tuple] = None
+        # for an op sliced from another one: the positions of its rows in the cell
+        # cache, i.e. in the op the cache was created for
+        self._cell_positions: np.ndarray = None
+        self._cell_token: int = None
+        # the fingerprint of `fn`, which may hash e.g. the weights of a model, so it
+        # is computed once and shared by the copies of the op (see `_fingerprint_fn`)
+        self._fn_fingerprints: Dict[str, str] = {}
+
+    def _fingerprint_fn(self) -> str:
+        """The fingerprint of ``fn`` (see :func:`meerkat.tools.cache.fingerprint`),
+        computed on first use rather than for every batch."""
+        from meerkat.tools.cache import fingerprint
+
+        try:
+            return self._fn_fingerprints["fn"]
+        except KeyError:
+            key = self._fn_fingerprints["fn"] = fingerprint(self.fn)
+            return key
+
     @staticmethod
     def concat(ops: Sequence[DeferredOp]):
         """Concatenate a sequence of operations."""
@@ -103,12 +157,27 @@ class DeferredOp:
 
         # going to use the `fn` etc. of the first op
         op = copy(ops[0])
+        op._cell_cache = MemoryCache()
+        op._cell_parent = op._cell_positions = op._cell_token = None
 
         op.args = [mk.concat([op.args[i] for op in ops]) for i in range(len(op.args))]
         op.kwargs = {
             kwarg: mk.concat([op.kwargs[kwarg] for op in ops])
             for kwarg in op.kwargs.keys()
         }
+
+        # ops sliced from the same op (e.g. the pages of a dataframe) share its cells
+        version = ops[0]._cell_version()
+        if all(
+            other._cell_cache is ops[0]._cell_cache and other._cell_version() == version
+            for other in ops[1:]
+        ):
+            ops[0]._share_cells(
+                op,
+                positions=np.concatenate(
+                    [other._cell_key_positions(np.arange(len(other))) for other in ops]
+                ),
+            )
         return op
 
     def is_equal(self, other: Column):
@@ -132,6 +201,17 @@ class DeferredOp:
                 return False
         return True
 
+    def _get_state(self) -> dict:
+        """The state of the op, except for its inputs."""
+        return {
+            "fn": self.fn,
+            "return_index": self.return_index,
+            "return_format": self.return_format,
+            "is_batched_fn": self.is_batched_fn,
+            "batch_size": self.batch_size,
+            "materialize_inputs": self.materialize_inputs,
+        }
+
     def write(self, path: str, written_inputs: Dict[int, str] = None):
         """_summary_
 
@@ -144,18 +224,10 @@ class DeferredOp:
 
         if written_inputs is None:
             written_inputs = {}
-        state = {
-            "fn": self.fn,
-            "return_index": self.return_index,
-            "return_format": self.return_format,
-            "is_batched_fn": self.is_batched_fn,
-            "batch_size": self.batch_size,
-            "materialize_inputs": self.materialize_inputs,
-        }
         # state_path = os.path.join(path, "state.dill")
         # dill.dump(state, open(state_path, "wb"))
 
-        meta = {"args": [], "kwargs": {}, "state": state}
+        meta = {"args": [], "kwargs": {}, "state": self._get_state()}
 
         args_dir = os.path.join(path, "args")
         os.makedirs(args_dir, exist_ok=True)
@@ -177,9 +249,8 @@ class DeferredOp:
                 arg.write(col_path)
                 meta["kwargs"][key] = os.path.relpath(col_path, path)
 
-        # Save the metadata as a yaml file
-        meta_path = os.path.join(path, "meta.yaml")
-        dump_yaml(meta, meta_path)
+        # Save the metadata
+        dump_meta(meta, path)
 
     @classmethod
     def read(cls, path, read_inputs: Dict[str, Column] = None):
@@ -189,7 +260,7 @@ class DeferredOp:
         # Assert that the path exists
         assert os.path.exists(path), f"`path` {path} does not exist."
 
-        meta = dict(load_yaml(os.path.join(path, "meta.yaml")))
+        meta = dict(load_meta(path))
 
         args = [
             read_inputs[arg_path]
@@ -220,12 +291,164 @@ class DeferredOp:
         if indexed_inputs is None:
             indexed_inputs = {}
 
-        # if function is batched, but the index is singular, we need to turn the
-        # single index into a batch index, and then later unpack the result
-        single_on_batched = self.is_batched_fn and isinstance(index, int)
-        if single_on_batched:
-            index = np.array([index])
+        if (
+            materialize
+            and isinstance(index, np.ndarray)
+            and mk.config.cache.enabled
+            and len(index) > 0
+        ):
+            return self._get_cached(index, indexed_inputs=indexed_inputs)
+
+        if materialize and self._cell_cache.enabled:
+            if isinstance(index, int):
+                return self._get_cell_cached(index, indexed_inputs=indexed_inputs)
+            elif not self.is_batched_fn and len(index) > 0:
+                return self._get_rows_cached(index, indexed_inputs=indexed_inputs)
+        return self._compute(
+            index, indexed_inputs=indexed_inputs, materialize=materialize
+        )
+
+    def _get_cached(self, index: np.ndarray, indexed_inputs: Dict[int, Column]):
+        """Materialize a batch, reusing the result from the persistent cache if the
+        function and its inputs are unchanged."""
+        from meerkat.tools.cache import fingerprint, get_deferred_cache
+
+        cache = get_deferred_cache()
+
+        # fingerprint the inputs before they are materialized, so that on a cache hit
+        # we can skip loading them altogether
+        def _index_input(column: Column):
+            if id(column) in indexed_inputs:
+                return indexed_inputs[id(column)]
+            return column._get(index, materialize=False)
+
+        key = fingerprint(
+            (
+                self._fingerprint_fn(),
+                [_index_input(column) for column in self.args],
+                {kwarg: _index_input(column) for kwarg, column in self.kwargs.items()},
+                self.is_batched_fn,
+                self.return_format,
+                self.return_index,
+                self.materialize_inputs,
+            )
+        )
+        try:
+            return cache[key]
+        except KeyError:
+            pass
+
+        output = self._compute(index, indexed_inputs=indexed_inputs, materialize=True)
+        cache[key] = output
+        return output
+
+    def _get_cell_cached(self, index: int, indexed_inputs: Dict[int, Column]):
+        """Materialize a single row, reusing the output from the in-memory cell cache
+        if the row was materialized before."""
+        key = self._cell_key(index)
+        try:
+            output = self._cell_cache[key]
+        except KeyError:
+            # the output is cached before `return_index` is applied, so that it is
+            # shared by all columns of the block
+            output = self.with_return_index(None)._compute(
+                index, indexed_inputs=indexed_inputs, materialize=True
+            )
+            self._cell_cache[key] = output
 
+        if self.return_index is not None:
+            output = output[self.return_index]
+        return output
+
+    def _get_rows_cached(self, index: np.ndarray, indexed_inputs: Dict[int, Column]):
+        """Materialize a batch row by row, only computing the rows that are missing
+        from the in-memory cell cache."""
+        version = self._cell_version()
+        keys = [self._cell_key(i, version=version) for i in index]
+        outputs = [_MISSING] * len(keys)
+        for i, key in enumerate(keys):
+            try:
+                outputs[i] = self._cell_cache[key]
+            except KeyError:
+                pass
+
+        missing = np.array(
+            [i for i, output in enumerate(outputs) if output is _MISSING], dtype=int
+        )
+        if len(missing) > 0:
+            # the inputs of the missing rows only, so cached rows aren't loaded
+            indexed_inputs = {
+                key: column._get(missing, materialize=self.materialize_inputs)
+                for key, column in indexed_inputs.items()
+            }
+            args, kwargs = self._index_inputs(index[missing], indexed_inputs)
+            for i, output in zip(missing, self._apply_rows(args, kwargs, len(missing))):
+                outputs[i] = output
+                self._cell_cache[keys[i]] = output
+
+        return self._collect_rows(outputs)
+
+    def _cell_key(self, index: int, version: Tuple = None) -> Tuple[Tuple, int]:
+        """The key of the row at ``index`` in the cell cache."""
+        if version is None:
+            version = self._cell_version()
+        index = int(index)
+        if index < 0:
+            index += len(self)
+        if self._cell_positions is not None:
+            index = int(self._cell_positions[index])
+        return version, index
+
+    def _cell_key_positions(self, index: np.ndarray) -> np.ndarray:
+        """The positions of the rows at ``index`` in the cell cache."""
+        index = np.where(index < 0, index + len(self), index)
+        if self._cell_positions is not None:
+            return self._cell_positions[index]
+        return index
+
+    def _cell_version(self) -> Tuple:
+        """The version of the op's rows in the cell cache.
+
+        An op sliced from another one shares its cells for as long as neither of
+        their inputs have been written to since. Otherwise, its rows are cached apart
+        from those of the op it was sliced from.
+        """
+        version = self._input_version()
+        if self._cell_parent is None:
+            return version
+
+        parent, parent_version, base_version = self._cell_parent
+        if version == base_version and parent._cell_version() == parent_version:
+            return parent_version
+        return self._cell_token, version
+
+    def _share_cells(self, op: DeferredOp, positions: np.ndarray):
+        """Share the cell cache with ``op``, whose rows are the rows of this op at
+        ``positions`` in the cell cache (e.g. a slice of this op)."""
+        op._cell_cache = self._cell_cache
+        op._cell_parent = (self, self._cell_version(), op._input_version())
+        op._cell_positions = positions
+        op._cell_token = next(_CELL_TOKENS)
+
+    def _input_version(self) -> Tuple:
+        """The number of writes to each of the inputs of the op, including those of
+        the deferred ops it depends on.
+
+        The version is part of the keys of the cell cache, so that cells are
+        recomputed once an input is written to.
+        """
+        from meerkat.columns.deferred.base import DeferredColumn
+
+        return tuple(
+            column.data._input_version()
+            if isinstance(column, DeferredColumn)
+            else column._version
+            for column in [*self.args, *self.kwargs.values()]
+        )
+
+    def _index_inputs(
+        self, index: Union[int, np.ndarray], indexed_inputs: Dict[int, Column]
+    ):
         # we pass results from other columns
         # prepare inputs
         kwargs = {
@@ -242,10 +465,62 @@ class DeferredOp:
             else column._get(index, materialize=self.materialize_inputs)
             for column in self.args
         ]
+        return args, kwargs
+
+    def _apply_rows(self, args: List[Column], kwargs: Dict[str, Column], length: int):
+        with span(self.fn, "fn", rows=length) as s:
+            prefetch = getattr(self.fn, "prefetch", None)
+            if prefetch is not None and length > 1:
+                # functions that load their inputs (e.g. `FileLoader`) are passed the
+                # whole batch first, so they can fetch the rows concurrently
+                prefetch(*args, **kwargs)
+            # coroutines returned by `async def` functions are awaited concurrently
+            s.output = outputs = resolve_all(
+                [
+                    self.fn(
+                        *[arg[i] for arg in args],
+                        **{kwarg: column[i] for kwarg, column in kwargs.items()},
+                    )
+                    for i in range(length)
+                ]
+            )
+        return outputs
+
+    def _collect_rows(self, outputs: List[any]):
+        if self.return_index is not None:
+            outputs = [output[self.return_index] for output in outputs]
+
+        if (self.return_format is dict) and (self.return_index is None):
+            return merge_with(list, outputs)
+        elif (self.return_format is tuple) and (self.return_index is None):
+            return tuple(zip(*outputs))
+        else:
+            return outputs
+
+    def _compute(
+        self,
+        index: Union[int, np.ndarray],
+        indexed_inputs: Dict[int, Column],
+        materialize: bool = True,
+    ):
+
+        # if function is batched, but the index is singular, we need to turn the
+        # single index into a batch index, and then later unpack the result
+        single_on_batched = self.is_batched_fn and isinstance(index, int)
+        if single_on_batched:
+            index = np.array([index])
+        elif materialize and isinstance(index, np.ndarray):
+            fused = self.fuse(indexed_inputs)
+            if fused is not self:
+                return fused._compute(index, indexed_inputs=indexed_inputs)
+
+        with span(self.fn, "index", rows=1 if isinstance(index, int) else len(index)):
+            args, kwargs = self._index_inputs(index, indexed_inputs)
 
         if isinstance(index, int):
             if materialize:
-                output = self.fn(*args, **kwargs)
+                with span(self.fn, "fn", rows=1) as s:
+                    s.output = output = resolve(self.fn(*args, **kwargs))
                 if self.return_index is not None:
                     output = output[self.return_index]
                 return output
@@ -256,12 +531,15 @@ class DeferredOp:
                     kwargs=kwargs,
                     is_batched_fn=self.is_batched_fn,
                     return_index=self.return_index,
+                    cache=self._cell_cache,
+                    key=self._cell_key(index),
                 )
 
         elif isinstance(index, np.ndarray):
             if materialize:
                 if self.is_batched_fn:
-                    output = self.fn(*args, **kwargs)
+                    with span(self.fn, "fn", rows=len(index)) as s:
+                        s.output = output = resolve(self.fn(*args, **kwargs))
 
                     if self.return_index is not None:
                         output = output[self.return_index]
@@ -284,23 +562,9 @@ class DeferredOp:
                     return output
 
                 else:
-                    outputs = []
-                    for i in range(len(index)):
-                        output = self.fn(
-                            *[arg[i] for arg in args],
-                            **{kwarg: column[i] for kwarg, column in kwargs.items()},
-                        )
-
-                        if self.return_index is not None:
-                            output = output[self.return_index]
-                        outputs.append(output)
-
-                    if (self.return_format is dict) and (self.return_index is None):
-                        return merge_with(list, outputs)
-                    elif (self.return_format is tuple) and (self.return_index is None):
-                        return tuple(zip(*outputs))
-                    else:
-                        return outputs
+                    return self._collect_rows(
+                        self._apply_rows(args, kwargs, len(index))
+                    )
 
             else:
                 if single_on_batched:
@@ -311,7 +575,7 @@ class DeferredOp:
                         is_batched_fn=self.is_batched_fn,
                         return_index=self.return_index,
                     )
-                return DeferredOp(
+                op = DeferredOp(
                     fn=self.fn,
                     args=args,
                     kwargs=kwargs,
@@ -320,6 +584,68 @@ class DeferredOp:
                     return_format=self.return_format,
                     return_index=self.return_index,
                 )
+                # the op has the same `fn`, so it shares its fingerprint, and its rows
+                # are rows of this op, so it shares their cells
+                op._fn_fingerprints = self._fn_fingerprints
+                self._share_cells(op, positions=self._cell_key_positions(index))
+                return op
+
+    def fuse(self, indexed_inputs: Dict[int, Column] = None) -> DeferredOp:
+        """Fuse the chains of deferred columns this op takes as inputs into a single
+        op over their non-deferred inputs.
+
+        When the fused op is materialized, every stage of the chain is computed
+        batch-by-batch in the same pass, instead of materializing each deferred input
+        into an intermediate column first.
+
+        Args:
+            indexed_inputs (Dict[int, Column], optional): Inputs that have already
+                been indexed (e.g. columns materialized earlier by the block manager),
+                which are not recomputed. Defaults to None.
+
+        Returns:
+            DeferredOp: A batched op over the leaf inputs of the chain, or ``self`` if
+                none of the inputs can be fused.
+        """
+        if indexed_inputs is None:
+            indexed_inputs = {}
+
+        if not self.materialize_inputs or not any(
+            _is_fusable(column, indexed_inputs)
+            for column in self.args + list(self.kwargs.values())
+        ):
+            return self
+
+        leaves: List[Column] = []
+        leaf_positions: Dict[int, int] = {}
+        stages: Dict[int, _FusedStage] = {}
+
+        def _plan_input(column: Column):
+            if _is_fusable(column, indexed_inputs):
+                if id(column) not in stages:
+                    stages[id(column)] = _plan(column.data, column=column)
+                return stages[id(column)]
+
+            if id(column) not in leaf_positions:
+                leaf_positions[id(column)] = len(leaves)
+                leaves.append(column)
+            return leaf_positions[id(column)]
+
+        def _plan(op: DeferredOp, column: Column = None):
+            return _FusedStage(
+                op=op,
+                args=[_plan_input(arg) for arg in op.args],
+                kwargs={kwarg: _plan_input(arg) for kwarg, arg in op.kwargs.items()},
+                column=column,
+            )
+
+        return DeferredOp(
+            fn=_FusedFn(_plan(self)),
+            args=leaves,
+            kwargs={},
+            is_batched_fn=True,
+            batch_size=self.batch_size,
+        )
 
     def __len__(self):
         if len(self.args) > 0:
@@ -336,6 +662,91 @@ class DeferredOp:
         return op
 
 
+def _is_fusable(column: Column, indexed_inputs: Dict[int, Column]) -> bool:
+    from ..columns.deferred.base import DeferredColumn
+
+    return (
+        isinstance(column, DeferredColumn)
+        and id(column) not in indexed_inputs
+        # subclasses may materialize their data differently
+        and type(column)._get is DeferredColumn._get
+        and column.data.materialize_inputs
+    )
+
+
+@dataclass
+class _FusedStage:
+    """One op in a fused chain, whose inputs are either positions in the leaf inputs
+    of the chain or upstream stages."""
+
+    op: DeferredOp
+    args: List[Union[int, _FusedStage]]
+    kwargs: Dict[str, Union[int, _FusedStage]]
+    # the deferred column the stage was planned from, used to convert its output
+    column: Column = None
+
+    def compute(self, batch: Sequence[Column], outputs: Dict[int, any]):
+        args = [self._get_input(arg, batch, outputs) for arg in self.args]
+        kwargs = {
+            kwarg: self._get_input(arg, batch, outputs)
+            for kwarg, arg in self.kwargs.items()
+        }
+
+        if self.op.is_batched_fn:
+            with span(self.op.fn, "fn", rows=len(batch[0]) if batch else 0) as s:
+                s.output = output = resolve(self.op.fn(*args, **kwargs))
+            if self.op.return_index is not None:
+                output = output[self.op.return_index]
+            return output
+
+        return self.op._collect_rows(
+            self.op._apply_rows(args, kwargs, len(batch[0]) if batch else 0)
+        )
+
+    def _get_input(
+        self,
+        arg: Union[int, _FusedStage],
+        batch: Sequence[Column],
+        outputs: Dict[int, any],
+    ):
+        if isinstance(arg, int):
+            return batch[arg]
+
+        # stages feeding several inputs are only computed once per batch
+        if id(arg) not in outputs:
+            outputs[id(arg)] = arg.compute(batch, outputs)
+        output = outputs[id(arg)]
+
+        if not self.op.is_batched_fn and isinstance(output, list):
+            # row-wise functions can consume the outputs of the upstream stage
+            # directly, without building an intermediate column
+            return output
+        rows = len(batch[0]) if batch else 0
+        with span(arg.op.fn, "collate", rows=rows):
+            output = arg.column.collate(output)
+        with span(arg.op.fn, "convert", rows=rows) as s:
+            s.output = output = arg.column.convert_to_output_type(output)
+        return output
+
+    def ops(self) -> List[DeferredOp]:
+        """The ops of the stage and its upstream stages, upstream first."""
+        ops = []
+        for arg in [*self.args, *self.kwargs.values()]:
+            if isinstance(arg, _FusedStage):
+                ops.extend(op for op in arg.ops() if op not in ops)
+        return ops + [self.op]
+
+
+class _FusedFn:
+    """A batched function computing all stages of a fused chain of deferred ops."""
+
+    def __init__(self, stage: _FusedStage):
+        self.stage = stage
+
+    def __call__(self, *batch: Column):
+        return self.stage.compute(batch, outputs={})
+
+
 class DeferredBlock(AbstractBlock):
     @dataclass(eq=True, frozen=True)
     class Signature:
@@ -434,12 +845,12 @@ class DeferredBlock(AbstractBlock):
         else:
             if materialize:
                 outputs = {
-                    name: col.convert_to_output_type(
-                        col.collate(
-                            outputs
-                            if (col._block_index is None)
-                            else outputs[col._block_index]
-                        )
+                    name: self._convert_output(
+                        col,
+                        outputs
+                        if (col._block_index is None)
+                        else outputs[col._block_index],
+                        rows=len(index),
                     )
                     for name, col in block_ref.columns.items()
                 }
@@ -459,6 +870,13 @@ class DeferredBlock(AbstractBlock):
                 }
                 return BlockRef(block=block, columns=columns)
 
+    def _convert_output(self, col: Column, output: object, rows: int) -> Column:
+        with span(self.data.fn, "collate", rows=rows):
+            output = col.collate(output)
+        with span(self.data.fn, "convert", rows=rows) as s:
+            s.output = output = col.convert_to_output_type(output)
+        return output
+
     def _get_data(self, index: BlockIndex) -> object:
         return self.data.with_return_index(index)
 
@@ -4,16 +4,16 @@ import os
 import shutil
 from collections import defaultdict
 from collections.abc import MutableMapping
-from typing import Dict, List, Mapping, Sequence, Tuple, Union
+from typing import Dict, Hashable, Iterable, List, Mapping, Sequence, Tuple, Union
 
 import numpy as np
 import pandas as pd
 
 import meerkat.config
-from meerkat.block.abstract import AbstractBlock, BlockIndex
+from meerkat.block.abstract import AbstractBlock, BlockIndex, _PendingRead
 from meerkat.columns.abstract import Column
 from meerkat.interactive.graph.marking import unmarked
-from meerkat.tools.utils import dump_yaml, load_yaml
+from meerkat.tools.utils import dump_meta, load_meta, meta_path
 
 from .deferred_block import DeferredBlock
 from .ref import BlockRef
@@ -141,15 +141,34 @@ class BlockManager(MutableMapping):
             self._columns.keys()
         )  # need to maintain order after consolidate
 
+        self._consolidate_groups(
+            self._block_ref_groups().values(),
+            consolidate_unitary_groups=consolidate_unitary_groups,
+        )
+        self.reorder(column_order)
+
+    def _block_ref_groups(self) -> Dict[Hashable, List[BlockRef]]:
+        """Group the block refs that can be consolidated together, in topological
+        order."""
         block_ref_groups = defaultdict(list)
         for _, block_ref in self.topological_block_refs():
             block_ref_groups[block_ref.block.signature].append(block_ref)
+        return block_ref_groups
 
+    def _consolidate_groups(
+        self,
+        block_ref_groups: Iterable[List[BlockRef]],
+        consolidate_unitary_groups: bool = False,
+    ):
         # TODO we need to go through these block_ref groups in topological order
         consolidated_inputs: Dict[int, Column] = {}
-        for block_refs in block_ref_groups.values():
-            if (not consolidate_unitary_groups) and len(block_refs) == 1:
+        for block_refs in block_ref_groups:
+            if len(block_refs) == 1 and (
                 # if there is only one block ref in the group, do not consolidate
+                (not consolidate_unitary_groups)
+                # unless the block holds data that isn't in the block ref
+                or block_refs[0].block._is_consolidated(block_refs[0])
+            ):
                 continue
 
             # consolidate group
@@ -166,8 +185,6 @@ class BlockManager(MutableMapping):
 
             self.update(new_block_ref)
 
-        self.reorder(column_order)
-
     def remove(self, name):
         if name not in self._columns:
             raise ValueError(f"Remove failed: no column '{name}' in BlockManager.")
@@ -274,59 +291,86 @@ class BlockManager(MutableMapping):
             mgr.add_column(col=col, name=name)
         return mgr
 
-    def write(self, path: str):
+    def write(self, path: str, compression: Union[str, Mapping[type, str]] = None):
+        """Write the block manager to ``path``.
+
+        Writing to a path the blocks were previously written to (or read from) is
+        incremental: a written block is kept as is if all of the columns it holds are
+        still in the block manager and none of them has been written to since, so
+        only new and changed blocks are written. Changes made in place through the
+        data of a column (e.g. ``df["a"].data[0] = 1``) are detected by comparing a
+        checksum of the data of the block to that of the written block. The metadata
+        is replaced atomically once the blocks are written, after which the blocks
+        it no longer references are removed.
+
+        Args:
+            path (str): The path to write the block manager to.
+            compression (Union[str, Mapping[type, str]], optional): The codec to
+                compress the blocks with, e.g. "zstd" or "lz4", or a mapping from
+                block classes to codecs. Only NumPy, Arrow and Pandas blocks are
+                compressed. NumPy blocks are compressed in chunks of rows, so that a
+                range of rows can be read without decompressing the whole block.
+                Compressed blocks can't be memory-mapped. Defaults to None, in which
+                case the blocks are written uncompressed (Pandas blocks are written
+                to feather files, which are compressed with lz4 by default).
+        """
+        path = os.path.abspath(path)
+        column_order = list(self.keys())
         meta = {
             "dtype": BlockManager,
             "columns": {},
-            "_column_order": list(self.keys()),
+            "_column_order": column_order,
+            "len": self.nrows,
         }
 
         # prepare directories
         columns_dir = os.path.join(path, "columns")
         blocks_dir = os.path.join(path, "blocks")
-        meta_path = os.path.join(path, "meta.yaml")
-        if os.path.isdir(path):
-            if (
-                os.path.exists(meta_path)
-                and os.path.exists(columns_dir)
-                and os.path.exists(blocks_dir)
-            ):
-                # if overwriting, ensure that old columns are removed
-                shutil.rmtree(columns_dir)
-                shutil.rmtree(blocks_dir)
-            else:
-                # if path already points to a dir that wasn't previously holding a
-                # block manager, do not overwrite it. We'd like to protect against
-                # situation in which user accidentally puts in an important directory
-                raise IsADirectoryError(
-                    f"Cannot write `BlockManager`. {path} is a directory."
-                )
+        if os.path.isdir(path) and not (
+            meta_path(path) is not None
+            and os.path.exists(columns_dir)
+            and os.path.exists(blocks_dir)
+        ):
+            # if path already points to a dir that wasn't previously holding a
+            # block manager, do not overwrite it. We'd like to protect against
+            # situation in which user accidentally puts in an important directory
+            raise IsADirectoryError(
+                f"Cannot write `BlockManager`. {path} is a directory."
+            )
 
-        os.makedirs(path, exist_ok=True)
-        os.makedirs(blocks_dir)
-        os.makedirs(columns_dir)
+        os.makedirs(blocks_dir, exist_ok=True)
+        os.makedirs(columns_dir, exist_ok=True)
 
         # consolidate before writing
         # we also want to consolidate unitary groups (i.e. groups with only one block
-        # ref) so that we don't write any data not actually in the dataframe
-        # because of this we need to make sure lambda columns know about there
-        # dependencies
-        self.consolidate(consolidate_unitary_groups=True)  # TODO: change this back
+        # ref) so that we don't write any data not actually in the dataframe.
+        # Deferred blocks only hold an op, so they are consolidated in memory. Other
+        # blocks are consolidated as they are written, so that the consolidated data
+        # is never held in memory, and blocks that are already consolidated are
+        # written as is.
+        block_ref_groups = self._block_ref_groups()
+        self._consolidate_groups(
+            [
+                block_refs
+                for signature, block_refs in block_ref_groups.items()
+                if signature.klass is DeferredBlock
+            ],
+            consolidate_unitary_groups=True,
+        )
+        self.reorder(column_order)
 
         # maintain a dictionary mapping column ids to paths where they are written
         # so that lambda blocks that depend on those columns can refer to them
         # appropriately
         written_inputs: Dict[int, str] = {}
 
-        for block_id, block_ref in self.topological_block_refs():
-            block: AbstractBlock = block_ref.block
-            block_dir = os.path.join(blocks_dir, str(block_id))
-
-            if isinstance(block, DeferredBlock):
-                block.write(block_dir, written_inputs=written_inputs)
-            else:
-                block.write(block_dir)
-
+        def _add_block_columns(
+            block_ref: BlockRef,
+            block_dir: str,
+            mmap: bool,
+            block_indices: Dict[str, BlockIndex] = None,
+            compression: str = None,
+        ):
             for name, column in block_ref.items():
                 column_dir = os.path.join(columns_dir, name)
                 # os.makedirs(column_dir, exist_ok=True)
@@ -339,45 +383,177 @@ class BlockManager(MutableMapping):
                     "state": state,
                     "block": {
                         "block_dir": os.path.relpath(block_dir, path),
-                        "block_index": _serialize_block_index(column._block_index),
-                        "mmap": block.is_mmap,
+                        "block_index": _serialize_block_index(
+                            column._block_index
+                            if block_indices is None
+                            else block_indices[name]
+                        ),
+                        "mmap": mmap,
+                        "compression": compression,
                     },
                 }
 
                 # add the written column to the inputs
                 written_inputs[id(column)] = os.path.relpath(column_dir, path)
 
+        # deferred blocks may depend on any other block, so they're written last
+        for signature, block_refs in block_ref_groups.items():
+            if signature.klass is DeferredBlock:
+                continue
+
+            codec = _block_compression(compression, signature.klass)
+            block_refs, kept = _kept_block_refs(
+                block_refs, blocks_dir, compression=codec
+            )
+            for block_ref, written in kept:
+                _add_block_columns(
+                    block_ref,
+                    block_dir=written.block_dir,
+                    mmap=written.mmap,
+                    block_indices=written.block_indices(block_ref),
+                    compression=codec,
+                )
+            if not block_refs:
+                continue
+
+            block: AbstractBlock = block_refs[0].block
+            block_dir = _new_block_dir(blocks_dir, str(id(block)))
+            write_kwargs = {} if codec is None else {"compression": codec}
+            if len(block_refs) == 1 and block._is_consolidated(block_refs[0]):
+                block.write(block_dir, **write_kwargs)
+                block_indices = None
+                mmap = block.is_mmap and codec is None
+            else:
+                block_indices = type(block)._write_consolidated(
+                    block_refs, block_dir, **write_kwargs
+                )
+                mmap = False
+
+            _WrittenBlock.record(
+                block_refs,
+                block_dir=block_dir,
+                mmap=mmap,
+                block_indices=block_indices,
+                compression=codec,
+            )
+            for block_ref in block_refs:
+                _add_block_columns(
+                    block_ref,
+                    block_dir=block_dir,
+                    mmap=mmap,
+                    block_indices=block_indices,
+                    compression=codec,
+                )
+
+        for block_id, block_ref in self.topological_block_refs():
+            block: AbstractBlock = block_ref.block
+            if not isinstance(block, DeferredBlock):
+                continue
+
+            block_dir = _new_block_dir(blocks_dir, str(block_id))
+            block.write(block_dir, written_inputs=written_inputs)
+            _add_block_columns(block_ref, block_dir=block_dir, mmap=block.is_mmap)
+
         # write columns not in a block
         for name, column in self._columns.items():
             if name in meta["columns"]:
                 continue
             meta["columns"][name] = column._get_meta()
-            column.write(os.path.join(columns_dir, name))
+            column_dir = os.path.join(columns_dir, name)
+            if os.path.exists(column_dir):
+                shutil.rmtree(column_dir)
+            column.write(column_dir)
 
             # TODO(sabri): move this above and add to written inputs
 
-        # Save the metadata as a yaml file
-        # sort_keys=Flase is required so that the columns are written in topological
-        # order
-        dump_yaml(meta, meta_path, sort_keys=False)
+        meta["columns"] = {
+            name: meta["columns"][name] for name in self._dependency_order()
+        }
+
+        # Save the metadata, in which the columns are in topological order
+        # the metadata is replaced atomically, so an interrupted write leaves the
+        # previously written block manager intact
+        dump_meta(meta, path)
+
+        # remove the blocks and columns that are no longer referenced
+        block_dirs = {
+            os.path.join(path, col_meta["block"]["block_dir"])
+            for col_meta in meta["columns"].values()
+            if "block" in col_meta
+        }
+        for name in os.listdir(blocks_dir):
+            if os.path.join(blocks_dir, name) not in block_dirs:
+                shutil.rmtree(os.path.join(blocks_dir, name), ignore_errors=True)
+        for name in os.listdir(columns_dir):
+            col_meta = meta["columns"].get(name)
+            if col_meta is None or "block" in col_meta:
+                shutil.rmtree(os.path.join(columns_dir, name), ignore_errors=True)
+
+    def _dependency_order(self) -> List[str]:
+        """The columns in order, except that deferred columns come after the columns
+        they take as inputs, so that those are read first."""
+        names = {id(col): name for name, col in self._columns.items()}
+        dependencies = {}
+        for name, col in self._columns.items():
+            dependencies[name] = set()
+            if name in self._column_to_block_id:
+                block = self.get_block_ref(name).block
+                if isinstance(block, DeferredBlock):
+                    dependencies[name] = {
+                        names[id(arg)]
+                        for arg in [*block.data.args, *block.data.kwargs.values()]
+                        if id(arg) in names and names[id(arg)] != name
+                    }
+
+        order, emitted = [], set()
+        pending = list(self._columns)
+        while pending:
+            ready = [name for name in pending if dependencies[name] <= emitted]
+            if not ready:
+                # a cycle can't be resolved, so fall back to the column order
+                ready = pending
+            order.extend(ready)
+            emitted.update(ready)
+            pending = [name for name in pending if name not in emitted]
+        return order
 
     @classmethod
     def read(
         cls,
         path: str,
         columns: Sequence[str] = None,
+        lazy: bool = False,
+        mmap: bool = None,
         **kwargs,
     ) -> BlockManager:
-        """Load a DataFrame stored on disk."""
+        """Load a DataFrame stored on disk.
+
+        Args:
+            path (str): The path the block manager was written to.
+            columns (Sequence[str], optional): The columns to read. Defaults to None,
+                in which case all columns are read.
+            lazy (bool, optional): Whether to defer reading the data of NumPy, Pandas
+                and Arrow blocks until a column in the block is first accessed, so
+                that only the columns that are used are read. Defaults to False.
+            mmap (bool, optional): Whether to memory-map NumPy and Arrow blocks.
+                Defaults to None, in which case blocks are memory-mapped when
+                reading lazily, and otherwise as they were written. Memory-mapped
+                NumPy blocks are read-only.
+        """
 
         # Load the metadata
-        meta = dict(load_yaml(os.path.join(path, "meta.yaml")))
+        meta = dict(load_meta(path))
+        written_meta = {
+            col_meta["block"]["block_dir"]: col_meta["block"]
+            for col_meta in meta["columns"].values()
+            if "block" in col_meta
+        }
 
         # maintain a dictionary mapping from paths to columns
         # so that lambda blocks that depend on those columns don't load them again
         read_inputs: Dict[int, Column] = {}
 
-        blocks = {}
+        blocks, block_indices = {}, {}
         mgr = cls()
         for name, col_meta in meta["columns"].items():
             column_dir = os.path.join(path, "columns", name)
@@ -391,10 +567,20 @@ class BlockManager(MutableMapping):
                 if block_meta["block_dir"] not in blocks:
                     blocks[block_meta["block_dir"]] = AbstractBlock.read(
                         os.path.join(path, block_meta["block_dir"]),
-                        mmap=block_meta.get("mmap", False),
+                        mmap=(
+                            (lazy or block_meta.get("mmap", False))
+                            if mmap is None
+                            else mmap
+                        ),
                         read_inputs=read_inputs,
+                        lazy=lazy,
+                        nrows=meta.get("len"),
                     )
+                    block_indices[block_meta["block_dir"]] = []
                 block = blocks[block_meta["block_dir"]]
+                block_indices[block_meta["block_dir"]].append(
+                    _deserialize_block_index(block_meta["block_index"])
+                )
 
                 # read column, passing in a block_view
                 col = col_meta["dtype"].read(
@@ -412,6 +598,26 @@ class BlockManager(MutableMapping):
                     name,
                 )
         mgr.reorder(meta["_column_order"])
+
+        # record the blocks that were read, so that writing the block manager back to
+        # `path` doesn't write them again, unless they are changed
+        num_columns = defaultdict(int)
+        for col_meta in meta["columns"].values():
+            if "block" in col_meta:
+                num_columns[col_meta["block"]["block_dir"]] += 1
+        for block_dir, block in blocks.items():
+            if isinstance(block, DeferredBlock):
+                continue
+            _WrittenBlock(
+                block_dir=os.path.join(os.path.abspath(path), block_dir),
+                mmap=written_meta[block_dir].get("mmap", False),
+                compression=written_meta[block_dir].get("compression"),
+                num_columns=num_columns[block_dir],
+                version=block._version,
+                block_indices={
+                    _block_index_key(index): index for index in block_indices[block_dir]
+                },
+            ).attach(block)
         return mgr
 
     @unmarked()
@@ -450,6 +656,194 @@ class BlockManager(MutableMapping):
         return mgr
 
 
+class _WrittenBlock:
+    """A record, attached to a block, of the block directory its columns were last
+    written to (or read from) under a ``blocks`` directory.
+
+    Args:
+        block_dir (str): The absolute path of the written block directory.
+        mmap (bool): Whether the written block is memory-mapped when read.
+        num_columns (int): The number of columns written to the block directory,
+            including those of other blocks that were consolidated with the block.
+        version (int): The version of the block when it was written.
+        block_indices (Dict[Hashable, BlockIndex]): The index in the written block of
+            each column of the block, keyed by ``_block_index_key`` of the index of
+            the column in the block.
+        compression (str): The codec the written block is compressed with.
+        checksum (str): The checksum of the data of the block when it was written
+            (see ``AbstractBlock._checksum``). Defaults to None, in which case the
+            checksum of the written block directory is computed when it's first
+            needed (e.g. for a block read from it).
+    """
+
+    def __init__(
+        self,
+        block_dir: str,
+        mmap: bool,
+        num_columns: int,
+        version: int,
+        block_indices: Dict[Hashable, BlockIndex],
+        compression: str = None,
+        checksum: str = None,
+    ):
+        self.block_dir = block_dir
+        self.mmap = mmap
+        self.compression = compression
+        self.checksum = checksum
+        self.num_columns = num_columns
+        self.version = version
+        self.block_indices_by_key = block_indices
+        self.stat = _stat_block_dir(block_dir)
+
+    @classmethod
+    def record(
+        cls,
+        block_refs: Sequence[BlockRef],
+        block_dir: str,
+        mmap: bool,
+        block_indices: Dict[str, BlockIndex] = None,
+        compression: str = None,
+    ):
+        """Record that the columns in ``block_refs`` were written to
+        ``block_dir``."""
+        num_columns = sum(len(block_ref) for block_ref in block_refs)
+        for block_ref in block_refs:
+            cls(
+                block_dir=block_dir,
+                mmap=mmap,
+                compression=compression,
+                num_columns=num_columns,
+                version=block_ref.block._version,
+                checksum=block_ref.block._checksum(),
+                block_indices={
+                    _block_index_key(col._block_index): col._block_index
+                    if block_indices is None
+                    else block_indices[name]
+                    for name, col in block_ref.items()
+                },
+            ).attach(block_ref.block)
+
+    def attach(self, block: AbstractBlock):
+        if "_written" not in block.__dict__:
+            block._written = {}
+        block._written[os.path.dirname(self.block_dir)] = self
+
+    def is_valid(self, block: AbstractBlock) -> bool:
+        """Whether the block is unchanged since it was written, and the written block
+        directory hasn't been written over since.
+
+        Writes to the columns of the block bump its version, but the data of the
+        block can also be changed in place (e.g. ``df["a"].data[0] = 1``), so
+        unless the block is yet to be read, its checksum is compared too.
+        """
+        if (
+            block._version != self.version
+            or _stat_block_dir(self.block_dir) != self.stat
+        ):
+            return False
+        if isinstance(block.__dict__.get("_data"), _PendingRead):
+            # the data hasn't been read, so it can't have been changed
+            return True
+        checksum = block._checksum()
+        if checksum is None:
+            return True
+        if self.checksum is None:
+            # the block was read from the block directory, so the directory holds
+            # the data of the block as it was read
+            self.checksum = AbstractBlock.read(self.block_dir)._checksum()
+        return checksum == self.checksum
+
+    def covers(self, block_ref: BlockRef) -> bool:
+        return all(
+            _block_index_key(col._block_index) in self.block_indices_by_key
+            for col in block_ref.values()
+        )
+
+    def block_indices(self, block_ref: BlockRef) -> Dict[str, BlockIndex]:
+        return {
+            name: self.block_indices_by_key[_block_index_key(col._block_index)]
+            for name, col in block_ref.items()
+        }
+
+
+def _kept_block_refs(
+    block_refs: Sequence[BlockRef], blocks_dir: str, compression: str = None
+) -> Tuple[List[BlockRef], List[Tuple[BlockRef, _WrittenBlock]]]:
+    """Split ``block_refs`` into those that must be written to ``blocks_dir`` and
+    those whose previously written block directory can be kept.
+
+    A written block directory is kept only if every column written to it is still
+    referenced by one of ``block_refs`` and unchanged, so that we don't keep any data
+    that isn't actually in the block manager, and it is compressed with
+    ``compression``.
+    """
+    claims = defaultdict(list)
+    to_write = []
+    for block_ref in block_refs:
+        written = block_ref.block.__dict__.get("_written", {}).get(blocks_dir)
+        if (
+            written is not None
+            and written.compression == compression
+            and written.covers(block_ref)
+            # checked last, since it may checksum the data of the block
+            and written.is_valid(block_ref.block)
+        ):
+            claims[written.block_dir].append((block_ref, written))
+        else:
+            to_write.append(block_ref)
+
+    kept = []
+    for claimed in claims.values():
+        indices = {
+            _block_index_key(index)
+            for block_ref, written in claimed
+            for index in written.block_indices(block_ref).values()
+        }
+        if len(indices) == claimed[0][1].num_columns:
+            kept.extend(claimed)
+        else:
+            to_write.extend(block_ref for block_ref, _ in claimed)
+    return to_write, kept
+
+
+def _block_compression(
+    compression: Union[str, Mapping[type, str]], block_class: type
+) -> str:
+    """The codec to compress blocks of ``block_class`` with, see
+    ``BlockManager.write``."""
+    if isinstance(compression, Mapping):
+        compression = compression.get(block_class)
+    return compression if block_class._supports_compression else None
+
+
+def _stat_block_dir(block_dir: str) -> Tuple[int, int]:
+    """Identify the contents of a written block directory by the inode and
+    modification time of its metadata, which is written last."""
+    path = meta_path(block_dir)
+    if path is None:
+        return None
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def _new_block_dir(blocks_dir: str, name: str) -> str:
+    """A path under ``blocks_dir`` for a new block, which doesn't exist yet."""
+    block_dir, suffix = os.path.join(blocks_dir, name), 0
+    while os.path.exists(block_dir):
+        suffix += 1
+        block_dir = os.path.join(blocks_dir, f"{name}_{suffix}")
+    return block_dir
+
+
+def _block_index_key(index: BlockIndex) -> Hashable:
+    if isinstance(index, slice):
+        return (index.start, index.stop, index.step)
+    return index
+
+
 def _serialize_block_index(index: BlockIndex) -> Union[Dict, str, int]:
     if index is not None and not isinstance(index, (int, str, slice)):
         raise ValueError("Can only serialize `BlockIndex` objects.")
@@ -4,21 +4,26 @@ import os
 import shutil
 from dataclasses import dataclass
 from mmap import mmap
-from typing import Dict, Hashable, Sequence, Tuple, Union
+from typing import BinaryIO, Callable, Dict, Hashable, Sequence, Tuple, Union
 
 import numpy as np
+import pyarrow as pa
 
 from meerkat.block.ref import BlockRef
 from meerkat.columns.abstract import Column
 from meerkat.errors import ConsolidationError
 from meerkat.tools.lazy_loader import LazyLoader
+from meerkat.tools.utils import dumps_manifest, loads_manifest
 
-from .abstract import AbstractBlock, BlockIndex, BlockView
+from .abstract import BlockIndex, BlockView, SelectionBlock, _covers_block_axis
 
 torch = LazyLoader("torch")
 
+# the uncompressed size of the chunks of rows that compressed blocks are written in
+CHUNK_NBYTES = 1 << 20
 
-class NumPyBlock(AbstractBlock):
+
+class NumPyBlock(SelectionBlock):
     @dataclass(eq=True, frozen=True)
     class Signature:
         dtype: np.dtype
@@ -27,23 +32,25 @@ class NumPyBlock(AbstractBlock):
         klass: type
         mmap: Union[bool, int]
 
+    _supports_compression = True
+    _reads_row_ranges = True
+
     def __init__(self, data, *args, **kwargs):
-        super(NumPyBlock, self).__init__(*args, **kwargs)
         if len(data.shape) <= 1:
             raise ValueError(
                 "Cannot create a `NumpyBlock` from data with less than 2 axes."
             )
-        self.data = data
+        super(NumPyBlock, self).__init__(data, *args, **kwargs)
 
     @property
     def signature(self) -> Hashable:
         return self.Signature(
             klass=NumPyBlock,
             # don't want to consolidate any mmaped blocks
-            mmap=id(self) if isinstance(self.data, np.memmap) else False,
-            nrows=self.data.shape[0],
-            shape=self.data.shape[2:],
-            dtype=self.data.dtype,
+            mmap=id(self) if isinstance(self._data, np.memmap) else False,
+            nrows=self.nrows,
+            shape=self._data.shape[2:],
+            dtype=self._data.dtype,
         )
 
     def _get_data(self, index: BlockIndex, materialize: bool = True) -> np.ndarray:
@@ -120,6 +127,70 @@ class NumPyBlock(AbstractBlock):
 
         return BlockRef(block=block, columns=new_columns)
 
+    @classmethod
+    def _write_consolidated(
+        cls, block_refs: Sequence[BlockRef], path: str, compression: str = None
+    ) -> Dict[str, BlockIndex]:
+        signature = block_refs[0].block.signature
+        if signature.dtype.hasobject:
+            # object arrays are pickled by `np.save`, so they can't be streamed
+            return super()._write_consolidated(block_refs, path)
+
+        # lay out the columns along the column axis of the written block
+        offset = 0
+        new_indices = {}
+        columns = {}
+        for block_ref in block_refs:
+            for name, col in block_ref.items():
+                if name in columns:
+                    raise ConsolidationError(
+                        "Cannot consolidate two block refs containing the same column."
+                    )
+                columns[name] = col
+
+                block_index = col._block_index
+                if isinstance(block_index, slice):
+                    width = len(range(*block_index.indices(col._block._data.shape[1])))
+                    new_indices[name] = slice(offset, offset + width, 1)
+                elif isinstance(block_index, int):
+                    width = 1
+                    new_indices[name] = offset
+                offset += width
+
+        os.makedirs(path, exist_ok=True)
+        shape = (signature.nrows, offset, *signature.shape)
+        if compression is not None:
+            # consolidate the columns one chunk of rows at a time
+            def get_rows(start: int, stop: int) -> np.ndarray:
+                rows = np.empty((stop - start, *shape[1:]), dtype=signature.dtype)
+                for name, col in columns.items():
+                    rows[:, new_indices[name]] = col._block.data[
+                        start:stop, col._block_index
+                    ]
+                return rows
+
+            _write_chunks(path, shape, signature.dtype, get_rows, compression)
+            cls._write_meta(path)
+            return new_indices
+
+        # copy each column straight into the file, so the consolidated block is
+        # never held in memory
+        out = np.lib.format.open_memmap(
+            os.path.join(path, "data.npy"),
+            mode="w+",
+            dtype=signature.dtype,
+            shape=shape,
+        )
+        for name, col in columns.items():
+            out[:, new_indices[name]] = col._block.data[:, col._block_index]
+            out.flush()
+        del out
+        cls._write_meta(path)
+        return new_indices
+
+    def _is_consolidated(self, block_ref: BlockRef) -> bool:
+        return _covers_block_axis(block_ref, width=self._data.shape[1])
+
     @staticmethod
     def _convert_index(index):
         if torch.is_tensor(index):
@@ -132,13 +203,24 @@ class NumPyBlock(AbstractBlock):
     ) -> Union[BlockRef, dict]:
         index = self._convert_index(index)
         # TODO: check if they're trying to index more than just the row dimension
-        data = self.data[index]
         if isinstance(index, int):
             # if indexing a single row, we do not return a block manager, just a dict
+            rows = self._pending_rows(slice(index, index + 1)) if index >= 0 else None
+            if rows is not None and rows.nrows == 1:
+                data = rows.data[0]
+            else:
+                data = self._data[self._position(index)]
             return {
                 name: data[col._block_index] for name, col in block_ref.columns.items()
             }
-        block = self.__class__(data)
+
+        # the rows of a block that has yet to be read are read on their own
+        block = self._pending_rows(index)
+        if block is None and isinstance(index, slice) and self.selection is None:
+            # slices are views, so there is nothing to gather
+            block = self.__class__(self._data[index])
+        elif block is None:
+            block = self._select(index)
         columns = {
             name: col._clone(data=block[col._block_index])
             for name, col in block_ref.columns.items()
@@ -146,13 +228,34 @@ class NumPyBlock(AbstractBlock):
         # note that the new block may share memory with the old block
         return BlockRef(block=block, columns=columns)
 
+    @staticmethod
+    def _take(data: np.ndarray, selection: np.ndarray) -> np.ndarray:
+        return data[selection]
+
+    def _checksum(self) -> str:
+        from meerkat.tools.cache import fingerprint
+
+        # a memmap holds the same data as the array read from the same file
+        return fingerprint(np.asarray(self.data))
+
     @property
     def is_mmap(self):
         # important to check if .base is a python mmap object, since a view of a mmap
         # is also a memmap object, but should not be symlinked or copied
         return isinstance(self.data, np.memmap) and isinstance(self.data.base, mmap)
 
-    def _write_data(self, path: str, link: bool = True):
+    def _write_data(self, path: str, link: bool = True, compression: str = None):
+        if compression is not None and not self.data.dtype.hasobject:
+            data = self.data
+            _write_chunks(
+                path,
+                data.shape,
+                data.dtype,
+                lambda start, stop: data[start:stop],
+                compression,
+            )
+            return
+
         path = os.path.join(path, "data.npy")
         if self.is_mmap:
             if link:
@@ -164,10 +267,126 @@ class NumPyBlock(AbstractBlock):
 
     @staticmethod
     def _read_data(
-        path: str, mmap: bool = False, read_inputs: Dict[str, Column] = None
+        path: str,
+        mmap: bool = False,
+        read_inputs: Dict[str, Column] = None,
+        rows: Union[slice, np.ndarray] = None,
     ):
-        data_path = os.path.join(path, "data.npy")
+        """Read the block written to ``path``, or only the ``rows`` of it (a slice
+        or an array of positions), which only decompresses the chunks holding those
+        rows of a compressed block."""
+        if os.path.exists(os.path.join(path, "chunks.json")):
+            return _read_chunks(path, rows=rows)
 
-        if mmap:
-            return np.load(data_path, mmap_mode="r")
+        data_path = os.path.join(path, "data.npy")
+        if mmap or rows is not None:
+            try:
+                data = np.load(data_path, mmap_mode="r")
+            except ValueError:
+                # arrays of python objects are pickled, so can't be memory-mapped
+                data = np.load(data_path, allow_pickle=True)
+            if rows is None:
+                return data
+            return data[rows] if mmap else np.array(data[rows])
         return np.load(data_path, allow_pickle=True)
+
+    def _write_payload(self, f: BinaryIO) -> dict:
+        if self.data.dtype.hasobject:
+            return super()._write_payload(f)
+        data = np.ascontiguousarray(self.data)
+        data.tofile(f)
+        return {
+            "descr": np.lib.format.dtype_to_descr(data.dtype),
+            "shape": list(data.shape),
+        }
+
+    @staticmethod
+    def _read_payload(buffer: memoryview, meta: dict, mmap: bool = False) -> object:
+        if meta.get("pickled", False):
+            return SelectionBlock._read_payload(buffer, meta)
+        dtype = np.lib.format.descr_to_dtype(meta["descr"])
+        data = np.frombuffer(buffer, dtype=dtype).reshape(meta["shape"])
+        return data if mmap else data.copy()
+
+
+def _write_chunks(
+    path: str,
+    shape: Tuple[int],
+    dtype: np.dtype,
+    get_rows: Callable[[int, int], np.ndarray],
+    compression: str,
+):
+    """Write an array to ``path`` in chunks of rows, each compressed with the
+    ``compression`` codec, so that a range of rows can be read by only decompressing
+    the chunks that hold them (see ``_read_chunks``).
+
+    Args:
+        get_rows (Callable[[int, int], np.ndarray]): A function returning the rows
+            of the array from ``start`` to ``stop``.
+    """
+    codec = pa.Codec(compression)
+    row_nbytes = dtype.itemsize * int(np.prod(shape[1:]))
+    chunk_rows = max(1, CHUNK_NBYTES // max(row_nbytes, 1))
+
+    offsets = [0]
+    with open(os.path.join(path, "data.npc"), "wb") as f:
+        for start in range(0, shape[0], chunk_rows):
+            rows = np.ascontiguousarray(
+                get_rows(start, min(start + chunk_rows, shape[0])), dtype=dtype
+            )
+            f.write(codec.compress(pa.py_buffer(rows.reshape(-1).view(np.uint8))))
+            offsets.append(f.tell())
+
+    index = {
+        "descr": np.lib.format.dtype_to_descr(dtype),
+        "shape": list(shape),
+        "compression": compression,
+        "chunk_rows": chunk_rows,
+        "offsets": offsets,
+    }
+    with open(os.path.join(path, "chunks.json"), "w") as f:
+        f.write(dumps_manifest(index))
+
+
+def _read_chunks(path: str, rows: Union[slice, np.ndarray] = None) -> np.ndarray:
+    """Read the ``rows`` (a slice or an array of positions) of an array written with
+    ``_write_chunks``, only decompressing the chunks that hold them."""
+    with open(os.path.join(path, "chunks.json"), "rb") as f:
+        index = loads_manifest(f.read())
+    dtype = np.lib.format.descr_to_dtype(index["descr"])
+    shape, chunk_rows, offsets = index["shape"], index["chunk_rows"], index["offsets"]
+    codec = pa.Codec(index["compression"])
+    row_nbytes = dtype.itemsize * int(np.prod(shape[1:]))
+
+    def read_chunk(f: BinaryIO, chunk: int) -> np.ndarray:
+        f.seek(offsets[chunk])
+        compressed = f.read(offsets[chunk + 1] - offsets[chunk])
+        num_rows = min(chunk_rows, shape[0] - chunk * chunk_rows)
+        return np.frombuffer(
+            codec.decompress(compressed, num_rows * row_nbytes), dtype=dtype
+        ).reshape(num_rows, *shape[1:])
+
+    if rows is not None and not isinstance(rows, slice):
+        # gather the rows from each of the chunks holding any of them in turn
+        rows = np.asarray(rows)
+        out = np.empty((len(rows), *shape[1:]), dtype=dtype)
+        chunks = rows // chunk_rows
+        with open(os.path.join(path, "data.npc"), "rb") as f:
+            for chunk in np.unique(chunks):
+                mask = chunks == chunk
+                out[mask] = read_chunk(f, chunk)[rows[mask] - chunk * chunk_rows]
+        return out
+
+    start, stop, step = (slice(None) if rows is None else rows).indices(shape[0])
+    if step != 1:
+        return _read_chunks(path, slice(start, stop))[::step]
+    stop = max(start, stop)
+
+    out = np.empty((stop - start, *shape[1:]), dtype=dtype)
+    with open(os.path.join(path, "data.npc"), "rb") as f:
+        for chunk in range(start // chunk_rows, -(-stop // chunk_rows)):
+            data = read_chunk(f, chunk)
+            chunk_start = chunk * chunk_rows
+            lo, hi = max(start, chunk_start), min(stop, chunk_start + len(data))
+            out[lo - start : hi - start] = data[lo - chunk_start : hi - chunk_start]
+    return out
@@ -4,6 +4,7 @@ import os
 from dataclasses import dataclass
 from typing import Dict, Hashable, List, Sequence, Tuple, Union
 
+import numpy as np
 import pandas as pd
 
 from meerkat.block.ref import BlockRef
@@ -12,32 +13,38 @@ from meerkat.columns.tensor.numpy import NumPyTensorColumn
 from meerkat.columns.tensor.torch import TorchTensorColumn
 from meerkat.tools.lazy_loader import LazyLoader
 
-from .abstract import AbstractBlock, BlockIndex, BlockView
+from .abstract import BlockIndex, BlockView, SelectionBlock
 
 torch = LazyLoader("torch")
 
 
-class PandasBlock(AbstractBlock):
+class PandasBlock(SelectionBlock):
     @dataclass(eq=True, frozen=True)
     class Signature:
         nrows: int
         klass: type
 
+    _supports_compression = True
+
     def __init__(self, data: pd.DataFrame, *args, **kwargs):
-        super(PandasBlock, self).__init__(*args, **kwargs)
-        self.data = data
+        super(PandasBlock, self).__init__(data, *args, **kwargs)
 
     @property
     def signature(self) -> Hashable:
         return self.Signature(
             klass=PandasBlock,
             # we don't
-            nrows=len(self.data),
+            nrows=self.nrows,
         )
 
     def _get_data(self, index: BlockIndex) -> pd.Series:
         return self.data[index]
 
+    def _checksum(self) -> str:
+        from meerkat.tools.cache import fingerprint
+
+        return fingerprint([(name, self.data[name]) for name in self.data.columns])
+
     def subblock(self, indices: List[BlockIndex]) -> PandasBlock:
         return PandasBlock(data=self.data[indices])
 
@@ -55,7 +62,15 @@ class PandasBlock(AbstractBlock):
         Returns:
             Tuple[PandasBlock, Mapping[str, BlockIndex]]: [description]
         """
-        data = pd.DataFrame({"col": data})
+        if isinstance(data.dtype, np.dtype):
+            # a DataFrame constructed from a 2D array holds it without copying,
+            # unlike one constructed from a dict, so e.g. a memory-mapped column
+            # stays memory-mapped
+            data = pd.DataFrame(
+                data.values[:, None], index=data.index, columns=["col"], copy=False
+            )
+        else:
+            data = pd.DataFrame({"col": data})
         block = cls(data)
         return BlockView(block_index="col", block=block)
 
@@ -85,6 +100,11 @@ class PandasBlock(AbstractBlock):
         }
         return BlockRef(block=block, columns=new_columns)
 
+    def _is_consolidated(self, block_ref: BlockRef) -> bool:
+        return sorted(col._block_index for col in block_ref.values()) == sorted(
+            self._data.columns
+        )
+
     @staticmethod
     def _convert_index(index):
         if torch.is_tensor(index):
@@ -114,17 +134,19 @@ class PandasBlock(AbstractBlock):
     ) -> Union[BlockRef, dict]:
         index = self._convert_index(index)
         # TODO: check if they're trying to index more than just the row dimension
-        data = self.data.iloc[index]
         if isinstance(index, int):
             # if indexing a single row, we do not return a block manager, just a dict
+            data = self._data.iloc[self._position(index)]
             return {
                 name: data[col._block_index] for name, col in block_ref.columns.items()
             }
 
-        # All Pandas Columns should have contiguous indices so that we can perform
-        # comparisons etc.
-        data = data.reset_index(drop=True)
-        block = self.__class__(data)
+        if isinstance(index, slice) and self.selection is None:
+            # All Pandas Columns should have contiguous indices so that we can
+            # perform comparisons etc.
+            block = self.__class__(self._data.iloc[index].reset_index(drop=True))
+        else:
+            block = self._select(index)
 
         columns = {
             name: col._clone(data=block[col._block_index])
@@ -133,8 +155,18 @@ class PandasBlock(AbstractBlock):
         # note that the new block may share memory with the old block
         return BlockRef(block=block, columns=columns)
 
-    def _write_data(self, path: str):
-        self.data.reset_index(drop=True).to_feather(os.path.join(path, "data.feather"))
+    @staticmethod
+    def _take(data: pd.DataFrame, selection: np.ndarray) -> pd.DataFrame:
+        # All Pandas Columns should have contiguous indices so that we can perform
+        # comparisons etc.
+        return data.iloc[selection].reset_index(drop=True)
+
+    def _write_data(self, path: str, compression: str = None):
+        # feather files are compressed with lz4 by default
+        self.data.reset_index(drop=True).to_feather(
+            os.path.join(path, "data.feather"),
+            **({} if compression is None else {"compression": compression}),
+        )
 
     @staticmethod
     def _read_data(
@@ -12,7 +12,7 @@ from meerkat.columns.abstract import Column
 from meerkat.errors import ConsolidationError
 from meerkat.tools.lazy_loader import LazyLoader
 
-from .abstract import AbstractBlock, BlockIndex, BlockView
+from .abstract import AbstractBlock, BlockIndex, BlockView, _covers_block_axis
 
 torch = LazyLoader("torch")
 
@@ -121,6 +121,9 @@ class TorchBlock(AbstractBlock):
 
         return BlockRef(block=block, columns=new_columns)
 
+    def _is_consolidated(self, block_ref: BlockRef) -> bool:
+        return _covers_block_axis(block_ref, width=self.data.shape[1])
+
     @staticmethod
     def _convert_index(index):
         from meerkat.columns.tensor.torch import TorchTensorColumn
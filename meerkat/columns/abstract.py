@@ -14,6 +14,7 @@ from typing import (
     Mapping,
     Optional,
     Sequence,
+    Tuple,
     Type,
     Union,
 )
@@ -23,7 +24,8 @@ import pandas as pd
 import pyarrow as pa
 
 import meerkat.config
-from meerkat.errors import ConversionError
+from meerkat.block.abstract import BlockView
+from meerkat.errors import ConcatError, ConversionError
 from meerkat.interactive.graph.marking import unmarked
 from meerkat.interactive.node import NodeMixin
 from meerkat.mixins.aggregate import AggregateMixin
@@ -67,8 +69,6 @@ class Column(
 ):
     """An abstract class for Meerkat columns."""
 
-    _data: Sequence = None
-
     # Path to a log directory
     logdir: pathlib.Path = pathlib.Path.home() / "meerkat/"
 
@@ -77,6 +77,9 @@ class Column(
 
     _self_identifiable_group: str = "columns"
 
+    # the number of writes to the column, see `DeferredOp._input_version`
+    _version: int = 0
+
     def __init__(
         self,
         data: Sequence = None,
@@ -137,6 +140,52 @@ class Column(
         """
         return False
 
+    def _key_values(self) -> Union[np.ndarray, pd.Series]:
+        """The values of the column as a one-dimensional array, from which the
+        column's key index is built (see ``_get_key_index``). Subclasses that can be
+        used as primary keys implement this."""
+        raise NotImplementedError()
+
+    def _get_key_index(
+        self, rebuild: bool = False
+    ) -> Tuple[pd.Index, Optional[np.ndarray], bool]:
+        """A hash index of the values of the column, with which keys are mapped to
+        their positions in the column in constant time.
+
+        The index is built on first use and kept until the column is written to or
+        its data is replaced. If the values aren't unique, each value maps to its
+        first occurrence.
+
+        Changing the data in place (e.g. ``col.data[0] = 1``) doesn't bump the
+        version of the column, so the positions looked up in a kept index are
+        checked against the values of the column, and the index is rebuilt (with
+        ``rebuild=True``) if they don't match (see ``_keyidx_to_posidx``).
+
+        Returns:
+            Tuple[pd.Index, Optional[np.ndarray], bool]: The index of the unique
+                values, the position in the column of each of them (or None if the
+                values are unique, in which case the positions are the same), and
+                whether the index was just built.
+        """
+        cached = self.__dict__.get("_key_index")
+        if (
+            not rebuild
+            and cached is not None
+            and cached[0] == self._version
+            and cached[1] is self.__dict__.get("_data")
+        ):
+            return (*cached[2], False)
+
+        index, positions = pd.Index(self._key_values()), None
+        if not index.is_unique:
+            first = ~index.duplicated(keep="first")
+            index, positions = index[first], np.flatnonzero(first)
+        # the data is read after building the index, as reading it may replace a
+        # lazy view of it with the data itself
+        data = self.__dict__.get("_data")
+        self._key_index = (self._version, data, (index, positions))
+        return index, positions, True
+
     def _keyidx_to_posidx(self, keyidx: Any) -> int:
         """Get the posidx of the first occurrence of the given keyidx. Raise a
         key error if the keyidx is not found.
@@ -147,7 +196,15 @@ class Column(
         Returns:
             The posidx of the first occurrence of the given keyidx.
         """
-        raise NotImplementedError()
+        index, positions, built = self._get_key_index()
+        posidx = _get_key_loc(index, positions, keyidx)
+        if not built and (posidx is None or not _equals_key(self._get(posidx), keyidx)):
+            # the data may have been changed in place since the index was built
+            index, positions, _ = self._get_key_index(rebuild=True)
+            posidx = _get_key_loc(index, positions, keyidx)
+        if posidx is None:
+            raise KeyError(f"keyidx {keyidx} not found in column.")
+        return posidx
 
     def _keyidxs_to_posidxs(self, keyidxs: Sequence[Any]) -> np.ndarray:
         """Get the posidxs of the given keyidxs. Raise a key error if any of
@@ -159,7 +216,43 @@ class Column(
         Returns:
             The posidxs of the given keyidxs.
         """
-        raise NotImplementedError()
+        if isinstance(keyidxs, Column):
+            keyidxs = keyidxs.to_numpy()
+        elif torch.is_tensor(keyidxs):
+            keyidxs = keyidxs.numpy()
+        elif not isinstance(keyidxs, (np.ndarray, pd.Series)):
+            keyidxs = pd.Index(list(keyidxs))
+
+        index, positions, built = self._get_key_index()
+        posidxs = _get_key_locs(index, positions, keyidxs)
+        if not built and (
+            (posidxs == -1).any()
+            or not _equals_key(self._get(posidxs).to_numpy(), np.asarray(keyidxs))
+        ):
+            # the data may have been changed in place since the index was built
+            index, positions, _ = self._get_key_index(rebuild=True)
+            posidxs = _get_key_locs(index, positions, keyidxs)
+
+        missing = posidxs == -1
+        if missing.any():
+            raise KeyError(
+                f"Key indexes {np.asarray(keyidxs)[missing]} not found in column."
+            )
+        return posidxs
+
+    @property
+    def _data(self):
+        data = self.__dict__.get("_data")
+        if isinstance(data, BlockView):
+            # the column is a view of a lazily read or selected block, so its rows
+            # are read or gathered on first access
+            data = data.data
+            self.__dict__["_data"] = data
+        return data
+
+    @_data.setter
+    def _data(self, value):
+        self.__dict__["_data"] = value
 
     @property
     def data(self):
@@ -238,12 +331,15 @@ class Column(
 
     def _set(self, index, value):
         index = self._translate_index(index)
+        self._on_write()
         if isinstance(index, int):
             self._set_cell(index, value)
         elif isinstance(index, Sequence) or isinstance(index, np.ndarray):
             self._set_batch(index, value)
         else:
             raise ValueError
+        self._version += 1
+        self._on_written()
 
     def __setitem__(self, index, value):
         self._set(index, value)
@@ -275,7 +371,11 @@ class Column(
         return self.full_length()
 
     def full_length(self):
-        if self._data is None:
+        data = self.__dict__.get("_data")
+        if isinstance(data, BlockView):
+            # avoid reading or gathering the rows of a lazy block
+            return data.block.nrows
+        if data is None:
             return 0
         return len(self._data)
 
@@ -504,9 +604,48 @@ class Column(
         )
 
     def append(self, column: Column) -> None:
+        """Append the rows of ``column`` to this column in place.
+
+        Unlike :func:`mk.concat`, which copies every row into a new column, columns
+        that support appending in place keep spare capacity (or a list of chunks)
+        for the rows appended, so appending rows a batch at a time costs amortized
+        time proportional to the number of rows appended.
+
+        Args:
+            column (Column): A column of the same type as this one.
+        """
+        self._check_append(column)
+        self._on_write()
+        self._append(column)
+        self._version += 1
+        self._on_written()
+
+    @classmethod
+    def _can_append(cls) -> bool:
+        """Whether the column implements appending rows in place (see
+        ``_append``)."""
+        return cls._append is not Column._append
+
+    def _check_append(self, column: Column) -> None:
+        """Raise an error if the rows of ``column`` can't be appended to this column
+        in place, before anything is modified."""
+        if type(column) is not type(self):
+            raise ConcatError(
+                f"Cannot append a `{type(column).__name__}` to a "
+                f"`{type(self).__name__}`."
+            )
+        if not self._can_append():
+            raise NotImplementedError(
+                f"`{type(self).__name__}` does not support appending rows in place, "
+                "use `mk.concat` instead."
+            )
+
+    def _append(self, column: Column) -> None:
         # TODO(Sabri): implement a naive `ComposedColumn` for generic append and
         # implement specific ones for ListColumn, NumpyColumn etc.
-        raise NotImplementedError
+        raise NotImplementedError(
+            f"`{type(self).__name__}` does not support appending rows in place."
+        )
 
     @staticmethod
     def concat(columns: Sequence[Column]) -> None:
@@ -751,3 +890,38 @@ def column(data: Sequence, scalar_backend: str = None) -> Column:
         return ScalarColumn(data, backend=scalar_backend)
 
     return column_type(data)
+
+
+def _get_key_loc(
+    index: pd.Index, positions: Optional[np.ndarray], keyidx: Any
+) -> Optional[int]:
+    """The position of ``keyidx`` in a key index (see ``Column._get_key_index``), or
+    None if it isn't in the index."""
+    try:
+        posidx = index.get_loc(keyidx)
+    except (KeyError, TypeError):
+        return None
+    if not isinstance(posidx, (int, np.integer)):
+        # e.g. a slice or a mask, if the key matches several values
+        return None
+    return int(posidx if positions is None else positions[posidx])
+
+
+def _get_key_locs(
+    index: pd.Index, positions: Optional[np.ndarray], keyidxs: Sequence[Any]
+) -> np.ndarray:
+    """The positions of ``keyidxs`` in a key index (see ``Column._get_key_index``),
+    with -1 for those that aren't in the index."""
+    posidxs = index.get_indexer(keyidxs)
+    if positions is None:
+        return posidxs
+    return np.where(posidxs == -1, -1, positions[posidxs])
+
+
+def _equals_key(value: Any, keyidx: Any) -> bool:
+    """Whether the values of a column at the positions looked up in its key index
+    still equal the keys looked up."""
+    try:
+        return bool(np.all(value == keyidx))
+    except (TypeError, ValueError):
+        return False
@@ -14,7 +14,9 @@ from meerkat.block.deferred_block import DeferredBlock, DeferredCellOp, Deferred
 from meerkat.cells.abstract import AbstractCell
 from meerkat.columns.abstract import Column
 from meerkat.errors import ConcatWarning, ImmutableError
+from meerkat.tools.cache import CacheInfo
 from meerkat.tools.lazy_loader import LazyLoader
+from meerkat.tools.profile import span
 
 Image = LazyLoader("PIL.Image")
 
@@ -64,7 +66,13 @@ class DeferredColumn(Column):
         pbar: bool = False,
         num_blocks: int = None,
         blocks_per_window: int = None,
-        batch_size: int = 1,
+        batch_size: Union[int, str] = 1,
+        num_workers: int = 0,
+        executor: str = None,
+        prefetch: int = None,
+        rate_limit: float = None,
+        out: str = None,
+        checkpoint: str = None,
     ):
         from meerkat.ops.map import _materialize
 
@@ -75,6 +83,12 @@ class DeferredColumn(Column):
             num_blocks=num_blocks,
             blocks_per_window=blocks_per_window,
             batch_size=batch_size,
+            num_workers=num_workers,
+            executor=executor,
+            prefetch=prefetch,
+            rate_limit=rate_limit,
+            out=out,
+            checkpoint=checkpoint,
         )
 
     def _set(self, index, value):
@@ -86,6 +100,20 @@ class DeferredColumn(Column):
         version."""
         return self.data.fn
 
+    def cache_info(self) -> CacheInfo:
+        """Report the hit and miss counters and the size in bytes of the in-memory
+        cache of materialized cells.
+
+        The cache is enabled by setting ``mk.config.cache.memory_size`` and is
+        shared by all columns backed by the same deferred block, and by slices of
+        them.
+        """
+        return self.data._cell_cache.info()
+
+    def clear_cache(self):
+        """Remove all materialized cells from the in-memory cache."""
+        self.data._cell_cache.clear()
+
     def _create_cell(self, data: object) -> DeferredCell:
         return DeferredCell(data=data)
 
@@ -103,7 +131,11 @@ class DeferredColumn(Column):
             # support for blocks
             if materialize:
                 # materialize could change the data in unknown ways, cannot clone
-                return self.convert_to_output_type(data=self.collate(data))
+                with span(self.data.fn, "collate", rows=len(index)):
+                    data = self.collate(data)
+                with span(self.data.fn, "convert", rows=len(index)) as s:
+                    s.output = data = self.convert_to_output_type(data=data)
+                return data
             else:
                 return self._clone(data=data)
 
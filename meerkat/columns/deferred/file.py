@@ -4,12 +4,13 @@ import functools
 import io
 import logging
 import os
-import urllib.request
+import threading
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 from ctypes import Union
 from pathlib import Path
 from string import Template
-from typing import IO, Any, Callable, Sequence
+from typing import IO, Any, Callable, Optional, Sequence
 from urllib.parse import urlparse
 
 import dill
@@ -33,6 +34,7 @@ from meerkat.interactive.formatter.audio import DeferredAudioFormatterGroup
 from meerkat.interactive.formatter.base import FormatterGroup
 from meerkat.interactive.formatter.image import DeferredImageFormatterGroup
 from meerkat.interactive.formatter.medimage import MedicalImageFormatterGroup
+from meerkat.tools.download import DownloadCache, DownloadInfo, get_download_cache
 from meerkat.tools.utils import requires
 
 if env.is_package_installed("voxel"):
@@ -73,6 +75,13 @@ FILE_SHARED_DOCS = {
             between machines.
         """
     ),
+    "cache_size": docs.Arg(
+        """
+        cache_size (int, optional): the maximum size in bytes of the files cached
+            in ``cache_dir``. Once it's exceeded, the least recently used files are
+            removed. Defaults to None, in which case the cache is unbounded.
+        """
+    ),
     "downloader": docs.Arg(
         """
         downloader (Union[str, callable], optional):  a callable that accepts at
@@ -105,10 +114,16 @@ class FileLoader:
         downloader: Union[str, Callable] = None,
         fallback_downloader: Callable[[Union[str, IO]], None] = None,
         cache_dir: str = None,
+        cache_size: int = None,
     ):
         """A simple file loader with support for both local paths and remote
         URIs.
 
+        Downloaded files are cached in ``cache_dir`` by a hash of their URI (see
+        :class:`~meerkat.tools.download.DownloadCache`), so each URI is downloaded
+        once. The files of a batch of rows are downloaded concurrently when the
+        batch is materialized (see ``prefetch``).
+
         .. warning::
             In order for the column to be serializable with ``write()``, the
             callables passed to the constructor must be pickleable.
@@ -119,6 +134,7 @@ class FileLoader:
             ${downloader}
             ${fallback_downloader}
             ${cache_dir}
+            ${cache_size}
         """
         self.loader = loader
         self.base_dir = base_dir
@@ -130,6 +146,7 @@ class FileLoader:
             self.downloader = downloader
         self.fallback_downloader = fallback_downloader
         self.cache_dir = cache_dir
+        self.cache_size = cache_size
 
     def __call__(self, filepath: str):
         """
@@ -138,60 +155,20 @@ class FileLoader:
                 filepath. Otherwise, it is interpreted as a URI from which the file can
                 be downloaded.
         """
-        # support including environment varaiables in the base_dir so that DataFrames
-        # can be easily moved between machines
-        if self.base_dir is not None:
-            # need to convert Path objects to strings for Template to work
-            base_dir = str(self.base_dir)
-            base_dir = os.path.expanduser(base_dir)
-
-            try:
-                # we don't use os.expanvars because it raises an error
-                base_dir = Template(base_dir).substitute(os.environ)
-            except KeyError:
-                raise ValueError(
-                    f'`base_dir="{base_dir}"` contains an undefined environment'
-                    "variable."
-                )
-            filepath = os.path.join(base_dir, filepath)
+        filepath = self._resolve(filepath)
 
         if self.downloader is not None:
-            parse = urlparse(filepath)
-
-            if self.cache_dir is not None:
-                # need to convert Path objects to strings for Template to work
-                cache_dir = str(self.cache_dir)
-                cache_dir = os.path.expanduser(cache_dir)
-
-                try:
-                    # we don't use os.expanvars because it raises an error
-                    cache_dir = Template(cache_dir).substitute(os.environ)
-                except KeyError:
-                    raise ValueError(
-                        f'`cache_dir="{cache_dir}"` contains an undefined environment'
-                        "variable."
-                    )
-                dst = os.path.join(cache_dir, parse.netloc + parse.path)
-                os.makedirs(os.path.dirname(dst), exist_ok=True)
+            cache = self._download_cache()
+            if cache is not None:
+                parse = urlparse(filepath)
+                # files used to be cached at their netloc and path
+                dst = os.path.join(cache.cache_dir, parse.netloc + parse.path)
+                if not os.path.exists(dst):
+                    dst = cache.fetch(filepath, self._download)
             else:
                 # if there's no cache_dir, we just download to a temporary directory
                 dst = io.BytesIO()
-
-            if isinstance(dst, io.BytesIO) or not os.path.exists(dst):
-                try:
-                    self.downloader(filepath, dst)
-                except Exception as e:
-                    if self.fallback_downloader is not None:
-                        # if user passes fallback_downloader, then on any
-                        # failed download, we write the default data to the
-                        # destination and continue
-                        warnings.warn(
-                            f"Failed to download {filepath} with error {e}. Falling "
-                            "back to default data."
-                        )
-                        self.fallback_downloader(dst)
-                    else:
-                        raise e
+                self._download(filepath, dst)
 
             filepath = dst
 
@@ -199,6 +176,74 @@ class FileLoader:
 
         return data
 
+    def _resolve(self, filepath: str) -> str:
+        # support including environment varaiables in the base_dir so that DataFrames
+        # can be easily moved between machines
+        if self.base_dir is not None:
+            filepath = os.path.join(_expand_dir(self.base_dir, "base_dir"), filepath)
+        return filepath
+
+    def _download_cache(self) -> Optional[DownloadCache]:
+        if self.cache_dir is None:
+            return None
+        return get_download_cache(
+            _expand_dir(self.cache_dir, "cache_dir"), max_size=self.cache_size
+        )
+
+    def _download(self, uri: str, dst: Union[str, io.BytesIO]):
+        try:
+            self.downloader(uri, dst)
+        except Exception as e:
+            if self.fallback_downloader is not None:
+                # if user passes fallback_downloader, then on any
+                # failed download, we write the default data to the
+                # destination and continue
+                warnings.warn(
+                    f"Failed to download {uri} with error {e}. Falling "
+                    "back to default data."
+                )
+                self.fallback_downloader(dst)
+            else:
+                raise e
+
+    def prefetch(self, filepaths: Sequence[str], num_workers: int = 16):
+        """Download the files at ``filepaths`` into the ``cache_dir`` concurrently,
+        so that loading them doesn't wait on each download in turn.
+
+        This is called with the filepaths of a batch of rows before they're loaded
+        (see ``DeferredOp._apply_rows``). It does nothing if the loader doesn't
+        download files or has no ``cache_dir``. Failed downloads are left to fail
+        again when the file is loaded.
+        """
+        cache = None if self.downloader is None else self._download_cache()
+        if cache is None:
+            return
+        uris = list(
+            dict.fromkeys(self._resolve(filepaths[i]) for i in range(len(filepaths)))
+        )
+        if len(uris) <= 1:
+            return
+
+        def _fetch(uri: str):
+            try:
+                cache.fetch(uri, self._download)
+            except Exception as e:
+                logger.debug(f"Failed to prefetch {uri}: {e}")
+
+        num_workers = min(num_workers, len(uris))
+        if self.downloader is download_url:
+            # size the connection pool to the workers, so that their connections
+            # are kept alive for the next batch
+            _get_session(pool_size=num_workers)
+        with ThreadPoolExecutor(max_workers=num_workers) as pool:
+            list(pool.map(_fetch, uris))
+
+    def cache_info(self) -> Optional[DownloadInfo]:
+        """Report the hit rate, the number of bytes downloaded and the size of the
+        cache of downloaded files, or None if the loader has no ``cache_dir``."""
+        cache = self._download_cache()
+        return None if cache is None else cache.info()
+
     def __eq__(self, other: FileLoader) -> bool:
         return (
             (other.__class__ == self.__class__)
@@ -217,9 +262,11 @@ class FileLoader:
             "downloader": self.downloader,
             "fallback_downloader": self.fallback_downloader,
             "cache_dir": self.cache_dir,
+            "cache_size": self.cache_size,
         }
 
     def _set_state(self, state):
+        state.setdefault("cache_size", None)
         self.__dict__.update(state)
 
     def __setstate__(self, state):
@@ -228,6 +275,8 @@ class FileLoader:
             state["downloader"] = None
         if "fallback_downloader" not in state:
             state["fallback_downloader"] = None
+        if "cache_size" not in state:
+            state["cache_size"] = None
         self._set_state(state)
 
     @staticmethod
@@ -260,6 +309,19 @@ yaml.add_multi_representer(FileLoader, FileLoader.to_yaml)
 yaml.add_constructor("!FileLoader", FileLoader.from_yaml)
 
 
+def _expand_dir(path: str, name: str) -> str:
+    """Expand the user and the environment variables in ``path``."""
+    # need to convert Path objects to strings for Template to work
+    path = os.path.expanduser(str(path))
+    try:
+        # we don't use os.expanvars because it raises an error
+        return Template(path).substitute(os.environ)
+    except KeyError:
+        raise ValueError(
+            f'`{name}="{path}"` contains an undefined environment variable.'
+        )
+
+
 class FileCell(DeferredCell):
     @property
     def base_dir(self):
@@ -293,6 +355,7 @@ class FileColumn(DeferredColumn):
         ${base_dir}
         ${downloader}
         ${cache_dir}
+        ${cache_size}
     """
 
     def __init__(
@@ -303,6 +366,7 @@ class FileColumn(DeferredColumn):
         downloader: Union[callable | str] = None,
         base_dir: str = None,
         cache_dir: str = None,
+        cache_size: int = None,
         formatters: FormatterGroup = None,
         *args,
         **kwargs,
@@ -354,6 +418,7 @@ class FileColumn(DeferredColumn):
                 base_dir=base_dir,
                 downloader=downloader,
                 cache_dir=cache_dir,
+                cache_size=cache_size,
             )
 
         data = DeferredOp(
@@ -373,6 +438,7 @@ class FileColumn(DeferredColumn):
     @loader.setter
     def loader(self, loader: callable):
         self.data.fn.loader = loader
+        self.clear_cache()
 
     @property
     def base_dir(self):
@@ -381,10 +447,22 @@ class FileColumn(DeferredColumn):
     @base_dir.setter
     def base_dir(self, base_dir: str):
         self.data.fn.base_dir = base_dir
+        self.clear_cache()
 
     def _create_cell(self, data: object) -> DeferredCell:
         return FileCell(data=data)
 
+    def prefetch(
+        self, index: Union[slice, Sequence[int]] = None, num_workers: int = 16
+    ):
+        """Download the files of the rows at ``index`` (all of them, by default)
+        into the ``cache_dir`` concurrently, e.g. the rows of the next page of a
+        gallery before they're displayed. See :meth:`FileLoader.prefetch`."""
+        filepaths = self.data.args[0]
+        if index is not None:
+            filepaths = filepaths[index]
+        self.data.fn.prefetch(filepaths, num_workers=num_workers)
+
     @classmethod
     def from_urls(
         cls,
@@ -550,15 +628,49 @@ FILE_TYPES = {
 }
 
 
+# the HTTP session shared by the threads downloading files, with the id of the
+# process that created it and the number of connections it keeps per host
+_session = None
+_session_pid = None
+_session_pool_size = 0
+_session_lock = threading.Lock()
+
+
+def _get_session(pool_size: int = 16):
+    """Get the HTTP session shared by all threads of the process.
+
+    The session keeps up to ``pool_size`` connections to each host alive, so
+    downloads from the same host reuse connections across batches, rather than
+    each opening a new one. The pool is grown if a larger ``pool_size`` is asked
+    for, e.g. by a prefetch with more workers.
+    """
+    global _session, _session_pid, _session_pool_size
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            import requests
+
+            # connections aren't shared with forked processes
+            _session = requests.Session()
+            _session_pid, _session_pool_size = os.getpid(), 0
+        if pool_size > _session_pool_size:
+            from requests.adapters import HTTPAdapter
+
+            adapter = HTTPAdapter(pool_maxsize=pool_size)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+            _session_pool_size = pool_size
+        return _session
+
+
 def download_url(url: str, dst: Union[str, io.BytesIO]):
-    if isinstance(dst, str):
-        return urllib.request.urlretrieve(url=url, filename=dst)
-    else:
-        import requests
-
-        response = requests.get(url)
-        data = response.content
-        dst.write(data)
+    with _get_session().get(url, stream=True) as response:
+        response.raise_for_status()
+        if isinstance(dst, str):
+            with open(dst, "wb") as f:
+                for chunk in response.iter_content(chunk_size=1 << 16):
+                    f.write(chunk)
+            return dst
+        dst.write(response.content)
         dst.seek(0)
         return dst
 
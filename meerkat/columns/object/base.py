@@ -57,6 +57,19 @@ class ObjectColumn(Column):
             return columns[0]._clone(data=data)
         return cls.from_list(data)
 
+    def _append(self, column: ObjectColumn) -> None:
+        # views of the column share its list, so the list is only extended in place
+        # once the column holds a copy of it that no view shares
+        if self.__dict__.get("_appendable_data") is not self._data:
+            self._data = list(self._data)
+            self._appendable_data = self._data
+        self._data.extend(column.data)
+
+    def _view_data(self) -> object:
+        # views share the list, so the next append must copy it
+        self._appendable_data = None
+        return super()._view_data()
+
     def is_equal(self, other: Column) -> bool:
         return (self.__class__ == other.__class__) and self.data == other.data
 
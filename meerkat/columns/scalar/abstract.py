@@ -184,7 +184,7 @@ class ScalarColumn(Column):
 
         if isinstance(data, (np.ndarray, torch.TensorType, pd.Series, List, Tuple)):
             return super().__new__(PandasScalarColumn)
-        elif isinstance(data, pa.Array):
+        elif isinstance(data, (pa.Array, pa.ChunkedArray)):
             return super().__new__(ArrowScalarColumn)
         elif isinstance(data, TensorColumn) and len(data.shape) == 1:
             return super().__new__(PandasScalarColumn)
@@ -233,6 +233,10 @@ class ScalarColumn(Column):
     def sum(self, skipna: bool = True, **kwargs) -> Any:
         return self._dispatch_aggregation_function("sum", skipna=skipna, **kwargs)
 
+    def count(self, **kwargs) -> int:
+        """The number of values in the column that aren't null."""
+        return len(self) - int(self.isnull().sum())
+
     def product(self, skipna: bool = True, **kwargs) -> Any:
         return self._dispatch_aggregation_function("product", skipna=skipna, **kwargs)
 
@@ -3,7 +3,7 @@ from __future__ import annotations
 import os
 import re
 import warnings
-from typing import TYPE_CHECKING, Any, List, Sequence, Set, Union
+from typing import TYPE_CHECKING, List, Sequence, Set, Union
 
 import numpy as np
 import pyarrow as pa
@@ -11,8 +11,9 @@ import pyarrow.compute as pc
 from pandas.core.accessor import CachedAccessor
 
 from meerkat.block.abstract import BlockView
-from meerkat.block.arrow_block import ArrowBlock
+from meerkat.block.arrow_block import ArrowBlock, take_chunked
 from meerkat.errors import ImmutableError
+from meerkat.tools.buffer import append_chunks
 from meerkat.tools.lazy_loader import LazyLoader
 
 from ..abstract import Column
@@ -180,13 +181,21 @@ class ArrowScalarColumn(ScalarColumn):
 
     def _get(self, index, materialize: bool = True):
         index = ArrowBlock._convert_index(index)
+        if isinstance(index, int):
+            # the row of a column that has yet to be read is read on its own
+            pending = self._get_pending(np.array([index]))
+            if pending is not None:
+                return pending._data[0].as_py()
+        pending = self._get_pending(index)
+        if pending is not None:
+            return pending
 
         if isinstance(index, slice) or isinstance(index, int):
             data = self._data[index]
         elif index.dtype == bool:
             data = self._data.filter(pa.array(index))
         else:
-            data = self._data.take(index)
+            data = take_chunked(self._data, index)
 
         if self._is_batch_index(index):
             return self._clone(data=data)
@@ -205,24 +214,8 @@ class ArrowScalarColumn(ScalarColumn):
             warnings.warn(f"Unable to check if column is a valid primary key: {e}")
             return False
 
-    def _keyidx_to_posidx(self, keyidx: Any) -> int:
-        """Get the posidx of the first occurrence of the given keyidx. Raise a
-        key error if the keyidx is not found.
-
-        Args:
-            keyidx: The keyidx to search for.
-
-        Returns:
-            The posidx of the first occurrence of the given keyidx.
-        """
-        posidx = pc.index(self.data, keyidx)
-        if posidx == -1:
-            raise KeyError(f"keyidx {keyidx} not found in column.")
-        return posidx.as_py()
-
-    def _keyidxs_to_posidxs(self, keyidxs: Sequence[Any]) -> np.ndarray:
-        # FIXME: this implementation is very slow. This should be done with indices
-        return np.array([self._keyidx_to_posidx(keyidx) for keyidx in keyidxs])
+    def _key_values(self) -> np.ndarray:
+        return self.data.to_numpy(zero_copy_only=False)
 
     def _repr_cell(self, index) -> object:
         return self.data[index]
@@ -264,17 +257,20 @@ class ArrowScalarColumn(ScalarColumn):
 
     @classmethod
     def concat(cls, columns: Sequence[ArrowScalarColumn]):
-        arrays = []
-        for c in columns:
-            if isinstance(c.data, pa.Array):
-                arrays.append(c.data)
-            elif isinstance(c.data, pa.ChunkedArray):
-                arrays.extend(c.data.chunks)
-            else:
-                raise ValueError(f"Unexpected type {type(c.data)}")
-        data = pa.concat_arrays(arrays)
+        # the chunks of the columns are appended, rather than copied into one array
+        chunks = [chunk for c in columns for chunk in _chunks(c.data)]
+        data = pa.chunked_array(chunks, type=columns[0].data.type)
         return columns[0]._clone(data=data)
 
+    def _append(self, column: ArrowScalarColumn) -> None:
+        # the appended chunks are merged into fewer, longer ones as they accumulate,
+        # see `append_chunks`
+        chunks = _chunks(self.data)
+        for chunk in _chunks(column.data):
+            if len(chunk) > 0:
+                chunks = append_chunks(chunks, chunk)
+        self._set_data(pa.chunked_array(chunks, type=self.data.type))
+
     def to_numpy(self):
         return self.data.to_numpy()
 
@@ -287,6 +283,14 @@ class ArrowScalarColumn(ScalarColumn):
     def to_arrow(self) -> pa.Array:
         return self.data
 
+    @classmethod
+    def get_writer(cls, mmap: bool = False, template: Column = None):
+        if mmap:
+            from meerkat.writers.arrow_writer import ArrowWriter
+
+            return ArrowWriter(output_type=cls, template=template)
+        return super().get_writer(mmap=mmap, template=template)
+
     def equals(self, other: Column) -> bool:
         if other.__class__ != self.__class__:
             return False
@@ -468,3 +472,11 @@ class ArrowScalarColumn(ScalarColumn):
 
     def isnull(self, **kwargs) -> ScalarColumn:
         return self._clone(data=pc.is_null(self.data, nan_is_null=True, **kwargs))
+
+
+def _chunks(data: Union[pa.Array, pa.ChunkedArray]) -> List[pa.Array]:
+    if isinstance(data, pa.Array):
+        return [data]
+    elif isinstance(data, pa.ChunkedArray):
+        return data.chunks
+    raise ValueError(f"Unexpected type {type(data)}")
@@ -33,6 +33,7 @@ from meerkat.block.pandas_block import PandasBlock
 from meerkat.columns.abstract import Column
 from meerkat.interactive.formatter.base import BaseFormatter
 from meerkat.mixins.aggregate import AggregationError
+from meerkat.tools.buffer import append_rows
 from meerkat.tools.lazy_loader import LazyLoader
 
 from .abstract import ScalarColumn, StringMethods
@@ -219,8 +220,16 @@ class PandasScalarColumn(
                 )
         elif isinstance(data, pd.Series):
             # Force the index to be contiguous so that comparisons between different
-            # pandas series columns are always possible.
-            data = data.reset_index(drop=True)
+            # pandas series columns are always possible. Resetting the index copies
+            # the values (e.g. out of a memory-mapped file), so it's skipped if the
+            # index is already contiguous.
+            index = data.index
+            if not (
+                isinstance(index, pd.RangeIndex)
+                and index.start == 0
+                and index.step == 1
+            ):
+                data = data.reset_index(drop=True)
         else:
             data = pd.Series(data)
 
@@ -298,6 +307,20 @@ class PandasScalarColumn(
         data = pd.concat([c.data for c in columns])
         return columns[0]._clone(data=data)
 
+    def _append(self, column: PandasScalarColumn) -> None:
+        values, rows = self.data.values, column.data.values
+        if not isinstance(values, np.ndarray) or not isinstance(rows, np.ndarray):
+            # extension arrays (e.g. categoricals) can't be grown in place
+            self._set_data(pd.concat([self.data, column.data], ignore_index=True))
+            return
+
+        # the rows are copied into the spare capacity of the buffer the column views,
+        # see `append_rows`. A DataFrame constructed from a 2D array holds it without
+        # copying, unlike one constructed from a dict.
+        data = append_rows(values, rows)
+        block = PandasBlock(pd.DataFrame(data[:, None], columns=["col"], copy=False))
+        self._set_data(BlockView(block=block, block_index="col"))
+
     def _write_data(self, path: str) -> None:
         data_path = os.path.join(path, "data.pd")
         self.data.to_pickle(data_path)
@@ -343,20 +366,8 @@ class PandasScalarColumn(
     def _is_valid_primary_key(self):
         return self.data.is_unique
 
-    def _keyidx_to_posidx(self, keyidx: Any) -> int:
-        # TODO(sabri): when we implement indices, we should use them here if we have
-        # one
-        where_result = np.where(self.data == keyidx)
-
-        if len(where_result[0]) == 0:
-            raise KeyError(f"keyidx {keyidx} not found in column.")
-
-        posidx = where_result[0][0]
-        return int(posidx)
-
-    def _keyidxs_to_posidxs(self, keyidxs: Sequence[Any]) -> np.ndarray:
-        # FIXME: this implementation is very slow. This should be done with indices
-        return np.array([self._keyidx_to_posidx(keyidx) for keyidx in keyidxs])
+    def _key_values(self) -> pd.Series:
+        return self.data
 
     def sort(
         self, ascending: Union[bool, List[bool]] = True, kind: str = "quicksort"
@@ -425,6 +436,30 @@ class PandasScalarColumn(
     def to_arrow(self) -> pa.Array:
         return pa.array(self.data.values)
 
+    @classmethod
+    def get_writer(cls, mmap: bool = False, template: Column = None):
+        """Get a writer for the column.
+
+        With ``mmap=True``, numeric values are written to a memory-mapped NumPy
+        file, which backs the ``PandasScalarColumn`` returned. Other values (e.g.
+        strings) are written to an Arrow file, which pandas can't memory-map, so
+        they're returned as a memory-mapped ``ArrowScalarColumn`` instead.
+        """
+        if mmap:
+            if (
+                template is not None
+                and isinstance(template.data.dtype, np.dtype)
+                and template.data.dtype.kind in "biufc"
+            ):
+                from meerkat.writers.numpy_writer import NumpyMemmapWriter
+
+                return NumpyMemmapWriter(output_type=cls, template=template)
+
+            from meerkat.writers.arrow_writer import ArrowWriter
+
+            return ArrowWriter(template=template)
+        return super().get_writer(mmap=mmap, template=template)
+
     def is_equal(self, other: Column) -> bool:
         if other.__class__ != self.__class__:
             return False
@@ -19,6 +19,7 @@ from meerkat.block.abstract import BlockView
 from meerkat.block.numpy_block import NumPyBlock
 from meerkat.columns.abstract import Column
 from meerkat.mixins.aggregate import AggregationError
+from meerkat.tools.buffer import append_rows
 from meerkat.tools.lazy_loader import LazyLoader
 from meerkat.writers.concat_writer import ConcatWriter
 
@@ -132,6 +133,9 @@ class NumPyTensorColumn(
 
     def _get(self, index, materialize: bool = True):
         index = NumPyBlock._convert_index(index)
+        pending = self._get_pending(index)
+        if pending is not None:
+            return pending
         data = self._data[index]
         if self._is_batch_index(index):
             # only create a numpy array column
@@ -185,6 +189,11 @@ class NumPyTensorColumn(
         data = np.concatenate([c.data for c in columns])
         return columns[0]._clone(data=data)
 
+    def _append(self, column: NumPyTensorColumn) -> None:
+        # the rows are copied into the spare capacity of the buffer the column views,
+        # see `append_rows`
+        self._set_data(append_rows(self.data, column.data))
+
     def is_equal(self, other: Column) -> bool:
         if other.__class__ != self.__class__:
             return False
@@ -195,7 +204,7 @@ class NumPyTensorColumn(
         if mmap:
             from meerkat.writers.numpy_writer import NumpyMemmapWriter
 
-            return NumpyMemmapWriter()
+            return NumpyMemmapWriter(template=template, output_type=NumPyTensorColumn)
         else:
             return ConcatWriter(template=template, output_type=NumPyTensorColumn)
 
@@ -239,24 +248,10 @@ class NumPyTensorColumn(
             return False
         return len(np.unique(self.data)) == len(self)
 
-    def _keyidx_to_posidx(self, keyidx: Any) -> int:
-        # TODO(sabri): when we implement indices, we should use them here if we have
-        # one
-        where_result = np.where(self.data == keyidx)
-        if len(where_result[0]) == 0:
-            raise KeyError(f"keyidx {keyidx} not found in column.")
-
-        posidx = where_result[0][0]
-        return int(posidx)
-
-    def _keyidxs_to_posidxs(self, keyidxs: Sequence[Any]) -> np.ndarray:
-        posidxs = np.where(np.isin(self.data, keyidxs))[0]
-
-        diff = np.setdiff1d(keyidxs, self.data[posidxs])
-        if len(diff) > 0:
-            raise KeyError(f"Key indexes {diff} not found in column.")
-
-        return posidxs
+    def _key_values(self) -> np.ndarray:
+        if len(self.shape) != 1:
+            raise ValueError("Can't use multidimensional arrays as keys.")
+        return self.data
 
     def sort(
         self,
@@ -72,7 +72,10 @@ class TorchTensorColumn(
                     "Cannot create `TensorColumn` from a `BlockView` not "
                     "referencing a `TensorBlock`."
                 )
-        elif data is not None and not isinstance(data, TorchTensorColumn):
+        elif isinstance(data, TorchTensorColumn):
+            # e.g. the output of a torch operation on a column
+            data = data.data
+        elif data is not None:
             if isinstance(data, Sequence) and len(data) > 0:
                 # TODO: We need to apply this check and do proper conversion of every
                 # element in the sequence.
@@ -160,7 +163,7 @@ class TorchTensorColumn(
     @classmethod
     def get_writer(cls, mmap: bool = False, template: Column = None):
         if mmap:
-            return NumpyMemmapWriter()
+            return NumpyMemmapWriter(template=template, output_type=TorchTensorColumn)
         else:
             return ConcatWriter(template=template, output_type=TorchTensorColumn)
 
@@ -15,6 +15,7 @@ class MeerkatConfig:
     display: DisplayConfig
     datasets: DatasetsConfig
     system: SystemConfig
+    cache: CacheConfig
 
     @classmethod
     def from_yaml(cls, path: str = None):
@@ -32,6 +33,7 @@ class MeerkatConfig:
             display=DisplayConfig(**config.get("display", {})),
             datasets=DatasetsConfig(**config.get("datasets", {})),
             system=SystemConfig(**config.get("system", {})),
+            cache=CacheConfig(**config.get("cache", {})),
         )
         os.environ[DATASETS_ENV_VARIABLE] = config.datasets.root_dir
 
@@ -53,6 +55,22 @@ class DisplayConfig:
 class SystemConfig:
     use_gpu: bool = True
     ssh_identity_file: str = os.path.join(Path.home(), ".meerkat/ssh/id_rsa")
+    # maximum memory in bytes used by a batch when maps tune their batch size with
+    # ``batch_size="auto"``, None uses half of the available memory up to 1GB
+    batch_memory_budget: int = None
+
+
+@dataclass
+class CacheConfig:
+    # opt-in persistent cache for the results of deferred operations
+    enabled: bool = False
+    cache_dir: str = os.path.join(Path.home(), ".meerkat/cache")
+    # maximum size of the cache on disk in bytes, least recently used results are
+    # evicted once it is exceeded
+    max_size: int = 10 * 2**30
+    # maximum size in bytes of the in-memory cache of cells kept by each deferred
+    # column, 0 disables it
+    memory_size: int = 0
 
 
 class DatasetsConfig:
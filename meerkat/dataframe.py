@@ -6,6 +6,7 @@ import os
 import pathlib
 import shutil
 import warnings
+from functools import partial
 from typing import (
     TYPE_CHECKING,
     Any,
@@ -13,6 +14,7 @@ from typing import (
     Collection,
     Dict,
     Iterable,
+    Iterator,
     List,
     Mapping,
     Optional,
@@ -31,11 +33,12 @@ import pyarrow as pa
 from pandas._libs import lib
 
 import meerkat
+from meerkat.block.container import is_container, read_container, write_container
 from meerkat.block.manager import BlockManager
 from meerkat.columns.abstract import Column
 from meerkat.columns.scalar.abstract import ScalarColumn
 from meerkat.columns.scalar.arrow import ArrowScalarColumn
-from meerkat.errors import ConversionError
+from meerkat.errors import ConcatError, ConversionError
 from meerkat.interactive.graph.marking import is_unmarked_context, unmarked
 from meerkat.interactive.graph.reactivity import reactive
 from meerkat.interactive.graph.store import Store
@@ -50,7 +53,7 @@ from meerkat.mixins.reactifiable import ReactifiableMixin
 from meerkat.provenance import ProvenanceMixin
 from meerkat.row import Row
 from meerkat.tools.lazy_loader import LazyLoader
-from meerkat.tools.utils import convert_to_batch_fn, dump_yaml, load_yaml
+from meerkat.tools.utils import convert_to_batch_fn, dump_meta, load_meta
 
 torch = LazyLoader("torch")
 
@@ -410,15 +413,58 @@ class DataFrame(
         axis: Union[str, int] = "rows",
         suffixes: Tuple[str] = None,
         overwrite: bool = False,
+        inplace: bool = False,
     ) -> DataFrame:
         """Append a batch of data to the dataset.
 
         `example_or_batch` must have the same columns as the dataset
         (regardless of what columns are visible).
+
+        Appending rows in place (i.e. with ``inplace=True``) appends the rows of each
+        column of ``df`` to the column of this DataFrame (see :meth:`Column.append`),
+        rather than copying every row into new columns, so a DataFrame can be grown
+        a batch at a time in amortized time proportional to the number of rows
+        appended. The columns are modified in place, so DataFrames sharing them
+        (e.g. selected from this one with ``df[[...]]``) should not be used after.
+        Columns that don't support appending in place (e.g. deferred columns) are
+        replaced with the concatenation of their rows (see :func:`mk.concat`).
         """
-        return meerkat.concat(
-            [self, df], axis=axis, suffixes=suffixes, overwrite=overwrite
-        )
+        if not inplace:
+            return meerkat.concat(
+                [self, df], axis=axis, suffixes=suffixes, overwrite=overwrite
+            )
+
+        if axis not in (0, "rows"):
+            raise ConcatError(
+                "Can only append DataFrames in place along axis 0 (rows)."
+            )
+        if set(df.columns) != set(self.columns):
+            raise ConcatError(
+                "Can only append DataFrames along axis 0 (rows) if they have the same "
+                "set of columns names."
+            )
+
+        # check every column before appending to any of them, so that an error
+        # doesn't leave the columns with different lengths
+        for name, column in self.items():
+            if type(df[name]) is not type(column):
+                raise ConcatError(
+                    f"Cannot append a `{type(df[name]).__name__}` to column "
+                    f"'{name}' of type `{type(column).__name__}`."
+                )
+
+        mgr = BlockManager()
+        for name, column in self.items():
+            if column._can_append():
+                column.append(df[name])
+            else:
+                column = meerkat.concat([column, df[name]])
+            mgr.add_column(column, name)
+        self._set_data(mgr)
+        if self.has_inode():
+            mod = DataFrameModification(id=self.inode.id, scope=self.columns)
+            mod.add_to_queue()
+        return self
 
     @reactive()
     def head(self, n: int = 5) -> DataFrame:
@@ -527,9 +573,18 @@ class DataFrame(
             df = self._clone(data=self.data[posidx])
             return df
         elif index_type == "row":  # pragma: no cover
-            return self._clone(
-                data=self.data.apply("_get", index=posidx, materialize=materialize)
+            if self._primary_key is None or not _is_unique_index(posidx):
+                return self._clone(
+                    data=self.data.apply("_get", index=posidx, materialize=materialize)
+                )
+            # selecting distinct rows keeps the primary key unique, so we skip
+            # validating it, which would gather the rows of lazily selected blocks
+            df = self._clone(
+                data=self.data.apply("_get", index=posidx, materialize=materialize),
+                _primary_key=None,
             )
+            df._primary_key = self._primary_key
+            return df
 
     # @capture_provenance(capture_args=[])
     @reactive()
@@ -755,24 +810,51 @@ class DataFrame(
         primary_key: str = None,
         backend: str = "pandas",
         *args,
+        columns: Optional[Sequence[str]] = None,
         **kwargs,
     ) -> DataFrame:
         """Create a DataFrame from a csv file. All of the columns will be
         :class:`meerkat.ScalarColumn` with backend Pandas.
 
+        With ``backend="arrow"``, the file is parsed a block at a time with
+        :func:`pyarrow.csv.open_csv` into an Arrow table with a chunk per block, so
+        the rows are read into the columns without being copied through a Pandas
+        DataFrame. The size of the blocks can be set with the ``block_size`` of the
+        ``read_options``.
+
         Args:
             filepath (str): The file path or buffer to load from.
                 Same as :func:`pandas.read_csv`.
+            columns (Optional[Sequence[str]]): The columns to load. Defaults to all
+                of the columns.
             *args: Argument list for :func:`pandas.read_csv`.
-            **kwargs: Keyword arguments forwarded to :func:`pandas.read_csv`.
+            **kwargs: Keyword arguments forwarded to :func:`pandas.read_csv` (or
+                :func:`pyarrow.csv.open_csv` with ``backend="arrow"``).
 
         Returns:
             DataFrame: The constructed dataframe.
         """
         if backend == "pandas":
-            df = cls.from_pandas(pd.read_csv(filepath, *args, **kwargs), index=False)
+            if columns is not None:
+                kwargs["usecols"] = columns
+            df = pd.read_csv(filepath, *args, **kwargs)
+            if columns is not None:
+                # `usecols` doesn't preserve the order of the columns
+                df = df[list(columns)]
+            df = cls.from_pandas(df, index=False)
         elif backend == "arrow":
-            df = cls.from_arrow(pa.csv.read_csv(filepath, *args, **kwargs))
+            import pyarrow.csv
+
+            if columns is not None:
+                convert_options = kwargs.pop("convert_options", None)
+                if convert_options is None:
+                    convert_options = pyarrow.csv.ConvertOptions()
+                convert_options.include_columns = list(columns)
+                kwargs["convert_options"] = convert_options
+            reader = pyarrow.csv.open_csv(filepath, *args, **kwargs)
+            df = cls.from_arrow(reader.read_all())
+        else:
+            raise ValueError(f"Unknown backend '{backend}'.")
         if primary_key is not None:
             df.set_primary_key(primary_key, inplace=True)
         return df
@@ -820,11 +902,31 @@ class DataFrame(
         primary_key: str = None,
         engine: str = "auto",
         columns: Optional[Sequence[str]] = None,
+        backend: str = "pandas",
+        row_groups: Optional[Sequence[int]] = None,
+        filters: Optional[Sequence[Tuple[str, str, Any]]] = None,
+        batch_size: int = 65536,
+        lazy: bool = False,
+        cache_size: int = None,
         **kwargs,
     ) -> DataFrame:
         """Create a DataFrame from a parquet file. All of the columns will be
         :class:`meerkat.ScalarColumn` with backend Pandas.
 
+        With ``backend="arrow"`` (or when ``row_groups`` or ``filters`` are passed),
+        the file is read a record batch at a time into an Arrow table with a chunk
+        per batch, so the rows are read into the columns without being copied
+        through a Pandas DataFrame. Only the row groups in ``row_groups`` are read,
+        less the row groups whose min and max statistics show none of their rows
+        match ``filters``.
+
+        With ``lazy=True``, only the metadata of the file is read up front, and each
+        column is an :class:`ArrowScalarColumn` whose rows are read from the file
+        when they're first accessed. Indexing the rows of a lazily read DataFrame
+        (e.g. ``df[1000:1100]``) only reads the row groups holding those rows, and
+        the decoded row groups are cached in memory, so a few rows of a large file
+        can be browsed without reading all of it.
+
         Args:
             filepath (str): The file path or buffer to load from.
                 Same as :func:`pandas.read_parquet`.
@@ -832,15 +934,63 @@ class DataFrame(
                 Same as :func:`pandas.read_parquet`.
             columns (Optional[Sequence[str]]): The columns to load.
                 Same as :func:`pandas.read_parquet`.
+            backend (str): The backend of the columns, "pandas" or "arrow".
+                Defaults to "pandas".
+            row_groups (Optional[Sequence[int]]): The row groups to read. Defaults
+                to all of the row groups.
+            filters (Optional[Sequence[Tuple[str, str, Any]]]): Only rows matching
+                all of the filters are read. A filter is a tuple of a column name, an
+                op (one of "==", "!=", "<", "<=", ">", ">=", "in" and "not in") and a
+                value, e.g. ``("label", "in", [0, 1])``.
+            batch_size (int): The number of rows read at a time. Defaults to 65536.
+            lazy (bool): Whether to read the rows of the columns from the file when
+                they're first accessed. Can't be used with ``filters``. Defaults to
+                False.
+            cache_size (int): With ``lazy=True``, the maximum size in bytes of the
+                cache of decoded row groups. Defaults to None, in which case 256 MiB
+                is used.
             **kwargs: Keyword arguments forwarded to :func:`pandas.read_parquet`.
 
         Returns:
             DataFrame: The constructed dataframe.
         """
-        df = cls.from_pandas(
-            pd.read_parquet(filepath, engine=engine, columns=columns, **kwargs),
-            index=False,
-        )
+        if backend not in ("pandas", "arrow"):
+            raise ValueError(f"Unknown backend '{backend}'.")
+
+        if lazy:
+            from meerkat.block.arrow_block import ArrowBlock
+            from meerkat.tools.parquet import ParquetSource
+
+            if filters is not None:
+                raise ValueError("Can't filter the rows of a lazily read file.")
+            source = ParquetSource(
+                filepath, row_groups=row_groups, cache_size=cache_size
+            )
+            df = cls.from_batch(
+                {
+                    name: ArrowScalarColumn(ArrowBlock.from_parquet(source, name))
+                    for name in (source.columns if columns is None else columns)
+                }
+            )
+        elif backend == "pandas" and row_groups is None and filters is None:
+            df = cls.from_pandas(
+                pd.read_parquet(filepath, engine=engine, columns=columns, **kwargs),
+                index=False,
+            )
+        else:
+            from meerkat.tools.parquet import read_table
+
+            table = read_table(
+                filepath,
+                columns=columns,
+                row_groups=row_groups,
+                filters=filters,
+                batch_size=batch_size,
+            )
+            if backend == "arrow":
+                df = cls.from_arrow(table)
+            else:
+                df = cls.from_pandas(table.to_pandas(), index=False)
         if primary_key is not None:
             df.set_primary_key(primary_key, inplace=True)
         return df
@@ -853,6 +1003,8 @@ class DataFrame(
         orient: str = "records",
         lines: bool = False,
         backend: str = "pandas",
+        columns: Optional[Sequence[str]] = None,
+        chunksize: Optional[int] = None,
         **kwargs,
     ) -> DataFrame:
         """Load a DataFrame from a json file.
@@ -871,6 +1023,12 @@ class DataFrame(
             lines (bool): Whether the json file is a jsonl file.
                 Same as :func:`pandas.read_json`.
             backend (str): The backend to use for the loading and reuslting columns.
+            columns (Optional[Sequence[str]]): The columns to load. Defaults to all
+                of the columns.
+            chunksize (Optional[int]): With ``lines=True`` and the pandas backend,
+                the file is read this many lines at a time, and each chunk is
+                converted into columns before the next one is read, so only one
+                chunk is held in a Pandas DataFrame at a time.
             **kwargs: Keyword arguments forwarded to :func:`pandas.read_json`.
 
         Returns:
@@ -881,12 +1039,34 @@ class DataFrame(
         if backend == "arrow":
             if lines is False:
                 raise ValueError("Arrow backend only supports lines=True.")
-            df = cls.from_arrow(json.read_json(filepath, **kwargs))
+            table = json.read_json(filepath, **kwargs)
+            if columns is not None:
+                table = table.select(list(columns))
+            df = cls.from_arrow(table)
         elif backend == "pandas":
-            df = cls.from_pandas(
-                pd.read_json(filepath, orient=orient, lines=lines, **kwargs),
-                index=False,
-            )
+            if chunksize is not None and lines:
+                reader = pd.read_json(
+                    filepath, orient=orient, lines=lines, chunksize=chunksize, **kwargs
+                )
+                with reader:
+                    chunks = [
+                        cls.from_pandas(
+                            chunk if columns is None else chunk[list(columns)],
+                            index=False,
+                        )
+                        for chunk in reader
+                    ]
+                if not chunks:
+                    df = cls()
+                else:
+                    df = meerkat.concat(chunks) if len(chunks) > 1 else chunks[0]
+            else:
+                df = pd.read_json(filepath, orient=orient, lines=lines, **kwargs)
+                if columns is not None:
+                    df = df[list(columns)]
+                df = cls.from_pandas(df, index=False)
+        else:
+            raise ValueError(f"Unknown backend '{backend}'.")
         if primary_key is not None:
             df.set_primary_key(primary_key, inplace=True)
         return df
@@ -942,7 +1122,46 @@ class DataFrame(
                 return "arrow"
         return "pandas"
 
-    def to_csv(self, filepath: str, engine: str = "auto"):
+    def _iter_arrow_batches(self, batch_size: int, engine: str) -> Iterator[pa.Table]:
+        """Iterate over the rows of the DataFrame in Arrow tables of at most
+        ``batch_size`` rows, materializing the deferred columns one batch at a time.
+
+        Each batch is converted with ``to_arrow`` or, with the pandas ``engine``,
+        with ``to_pandas``. The batches are cast to the schema of the first one.
+        """
+        schema = None
+        for start in range(0, len(self), batch_size):
+            batch = self._get(slice(start, start + batch_size), materialize=True)
+            if engine == "arrow":
+                table = batch.to_arrow()
+            else:
+                table = pa.Table.from_pandas(batch.to_pandas(), preserve_index=False)
+            if schema is None:
+                schema = table.schema
+            elif table.schema != schema:
+                table = table.cast(schema)
+            yield table
+
+    def _write_arrow_batches(
+        self,
+        open_writer: Callable[[pa.Schema], Any],
+        batch_size: int,
+        engine: str,
+    ):
+        """Write the rows of the DataFrame ``batch_size`` rows at a time with the
+        writer returned by ``open_writer``, which is passed the schema of the
+        batches."""
+        writer = None
+        try:
+            for table in self._iter_arrow_batches(batch_size, engine=engine):
+                if writer is None:
+                    writer = open_writer(table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+
+    def to_csv(self, filepath: str, engine: str = "auto", batch_size: int = None):
         """Save a DataFrame to a csv file.
 
         The engine used to write the csv to disk.
@@ -952,18 +1171,37 @@ class DataFrame(
             engine (str): The library to use to write the csv. One of ["pandas",
                 "arrow", "auto"]. If "auto", then the library will be chosen based on
                 the column types.
+            batch_size (int): If passed, the rows are converted and written this
+                many at a time, and deferred columns are materialized one batch at a
+                time and written, rather than dropped. So exporting the DataFrame
+                only needs memory for one batch of rows. Defaults to None, in which
+                case the whole DataFrame is converted at once.
         """
         if engine == "auto":
             engine = self._choose_engine()
 
-        if engine == "arrow":
+        if batch_size is not None and len(self) > 0:
+            if engine == "arrow":
+                from pyarrow.csv import CSVWriter
+
+                self._write_arrow_batches(
+                    partial(CSVWriter, filepath), batch_size=batch_size, engine=engine
+                )
+            else:
+                with open(filepath, "w", newline="") as f:
+                    for start in range(0, len(self), batch_size):
+                        batch = self._get(
+                            slice(start, start + batch_size), materialize=True
+                        )
+                        batch.to_pandas().to_csv(f, header=start == 0, index=False)
+        elif engine == "arrow":
             from pyarrow.csv import write_csv
 
             write_csv(self.to_arrow(), filepath)
         else:
             self.to_pandas().to_csv(filepath, index=False)
 
-    def to_feather(self, filepath: str, engine: str = "auto"):
+    def to_feather(self, filepath: str, engine: str = "auto", batch_size: int = None):
         """Save a DataFrame to a feather file.
 
         The engine used to write the feather to disk.
@@ -973,18 +1211,33 @@ class DataFrame(
             engine (str): The library to use to write the feather. One of ["pandas",
                 "arrow", "auto"]. If "auto", then the library will be chosen based on
                 the column types.
+            batch_size (int): If passed, the rows are converted and written this
+                many at a time, as record batches of the feather file, and deferred
+                columns are materialized one batch at a time and written, rather
+                than dropped. Defaults to None, in which case the whole DataFrame is
+                converted at once.
         """
         if engine == "auto":
             engine = self._choose_engine()
 
-        if engine == "arrow":
+        if batch_size is not None and len(self) > 0:
+            # feather files are Arrow IPC files, compressed with lz4 by default
+            options = pa.ipc.IpcWriteOptions(
+                compression="lz4" if pa.Codec.is_available("lz4") else None
+            )
+            self._write_arrow_batches(
+                lambda schema: pa.ipc.new_file(filepath, schema, options=options),
+                batch_size=batch_size,
+                engine=engine,
+            )
+        elif engine == "arrow":
             from pyarrow.feather import write_feather
 
             write_feather(self.to_arrow(), filepath)
         else:
             self.to_pandas().to_feather(filepath)
 
-    def to_parquet(self, filepath: str, engine: str = "auto"):
+    def to_parquet(self, filepath: str, engine: str = "auto", batch_size: int = None):
         """Save a DataFrame to a parquet file.
 
         The engine used to write the parquet to disk.
@@ -994,11 +1247,22 @@ class DataFrame(
             engine (str): The library to use to write the parquet. One of ["pandas",
                 "arrow", "auto"]. If "auto", then the library will be chosen based on
                 the column types.
+            batch_size (int): If passed, the rows are converted and written this
+                many at a time, as row groups of the parquet file, and deferred
+                columns are materialized one batch at a time and written, rather
+                than dropped. Defaults to None, in which case the whole DataFrame is
+                converted at once.
         """
         if engine == "auto":
             engine = self._choose_engine()
 
-        if engine == "arrow":
+        if batch_size is not None and len(self) > 0:
+            from pyarrow.parquet import ParquetWriter
+
+            self._write_arrow_batches(
+                partial(ParquetWriter, filepath), batch_size=batch_size, engine=engine
+            )
+        elif engine == "arrow":
             from pyarrow.parquet import write_table
 
             write_table(self.to_arrow(), filepath)
@@ -1500,7 +1764,13 @@ class DataFrame(
         *args,
         **kwargs,
     ) -> DataFrame:
-        """Load a DataFrame stored on disk."""
+        """Load a DataFrame stored on disk.
+
+        Pass ``lazy=True`` to only read the data of a column when it's first
+        accessed, and ``columns`` to read a subset of the columns. See
+        :meth:`BlockManager.read` for all of the options. ``path`` may also be a
+        single file written with ``DataFrame.write(path, single_file=True)``.
+        """
         from meerkat.datasets.utils import download_df, extract_tar_file
 
         # URL
@@ -1524,8 +1794,12 @@ class DataFrame(
             shutil.rmtree(download_dir)
             return df
 
-        # Load the metadata
-        metadata = load_yaml(os.path.join(path, "meta.yaml"))
+        if is_container(path):
+            metadata, data = read_container(path, **kwargs)
+        else:
+            # Load the metadata
+            metadata = load_meta(path)
+            data = None
 
         if "state" in metadata:
             state = metadata["state"]
@@ -1539,7 +1813,9 @@ class DataFrame(
 
         # Load the the manager
         mgr_dir = os.path.join(path, "mgr")
-        if os.path.exists(mgr_dir):
+        if data is not None:
+            pass
+        elif os.path.exists(mgr_dir):
             data = BlockManager.read(mgr_dir, **kwargs)
         else:
             # backwards compatability to pre-manager dataframes
@@ -1548,18 +1824,39 @@ class DataFrame(
                 for name, dtype in metadata["column_dtypes"].items()
             }
 
+        # the primary key was valid when the DataFrame was written, so it isn't
+        # validated again, which would read the primary key column
+        primary_key, df._primary_key = df._primary_key, None
         df._set_data(data)
+        if primary_key in df:
+            df._primary_key = primary_key
 
         return df
 
     def write(
         self,
         path: str,
+        single_file: bool = False,
+        compression: Union[str, Mapping[type, str]] = None,
     ) -> None:
-        """Save a DataFrame to disk."""
-        # Make all the directories to the path
+        """Save a DataFrame to disk.
+
+        Writing a DataFrame back to the path it was written to or read from only
+        writes the blocks of columns that were added or changed since, see
+        :meth:`BlockManager.write`.
+
+        Args:
+            path (str): The path to write the DataFrame to.
+            single_file (bool, optional): Whether to write the DataFrame to a single
+                file at ``path``, rather than a directory of files, which is faster
+                to read from network filesystems. The whole file is rewritten on
+                every write. See :mod:`meerkat.block.container`. Defaults to False.
+            compression (Union[str, Mapping[type, str]], optional): The codec to
+                compress the blocks with, e.g. "zstd" or "lz4", or a mapping from
+                block classes to codecs. Not supported with ``single_file``. See
+                :meth:`BlockManager.write`. Defaults to None.
+        """
         path = os.path.abspath(os.path.expanduser(path))
-        os.makedirs(path, exist_ok=True)
 
         # Get the DataFrame state
         state = self._get_state()
@@ -1572,13 +1869,24 @@ class DataFrame(
             "state": state,
         }
 
+        if single_file:
+            if compression is not None:
+                raise ValueError(
+                    "Compression is not supported when writing to a single file."
+                )
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_container(path, self.data, meta=metadata)
+            return
+
+        # Make all the directories to the path
+        os.makedirs(path, exist_ok=True)
+
         # write the block manager
         mgr_dir = os.path.join(path, "mgr")
-        self.data.write(mgr_dir)
+        self.data.write(mgr_dir, compression=compression)
 
-        # Save the metadata as a yaml file
-        metadata_path = os.path.join(path, "meta.yaml")
-        dump_yaml(metadata, metadata_path)
+        # Save the metadata, replacing it atomically
+        dump_meta(metadata, path)
 
     def to_huggingface(self, repository, commit_message: str = None):
         """Upload a DataFrame to a HuggingFace repository.
@@ -1687,5 +1995,25 @@ def is_listlike(obj) -> bool:
     return is_column or is_sequential
 
 
+def _is_unique_index(index) -> bool:
+    """Whether the row index ``index`` selects each row at most once."""
+    if isinstance(index, slice):
+        return True
+    if isinstance(index, Column):
+        index = index.data
+    if torch.is_tensor(index):
+        index = index.numpy()
+    index = np.asarray(index)
+    if index.dtype == bool:
+        return True
+    # negative indices may refer to the same rows as positive ones, so we don't
+    # try to be clever with them
+    return (
+        index.dtype.kind in "iu"
+        and (len(index) == 0 or index.min() >= 0)
+        and len(np.unique(index)) == len(index)
+    )
+
+
 DataFrame.mark = DataFrame._react
 DataFrame.unmark = DataFrame._no_react
@@ -130,7 +130,7 @@ def rows(
         df = df[start:end]
         posidxs = list(range(start, end))
     elif keyidxs is not None:
-        if key_column is None:
+        if key_column is None or key_column == df.primary_key_name:
             if df.primary_key is None:
                 raise ValueError(
                     "Must provide key_column if keyidxs are provided and no "
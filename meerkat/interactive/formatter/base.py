@@ -7,7 +7,7 @@ from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Type, Union
 import yaml
 
 from meerkat.columns.deferred.base import DeferredCell
-from meerkat.tools.utils import MeerkatDumper, MeerkatLoader
+from meerkat.tools.utils import MeerkatDumper, MeerkatLoader, register_manifest_type
 
 if TYPE_CHECKING:
     from meerkat.interactive.app.src.lib.component.abstract import BaseComponent
@@ -139,7 +139,10 @@ class FormatterGroup(collections.abc.Mapping):
 
         It should not be called directly.
         """
-        data = loader.construct_mapping(node)
+        return FormatterGroup._from_manifest(loader.construct_mapping(node))
+
+    @staticmethod
+    def _from_manifest(data: dict) -> FormatterGroup:
         formatter = data["class"].__new__(data["class"])
         formatter._dict = data["dict"]
         return formatter
@@ -147,6 +150,12 @@ class FormatterGroup(collections.abc.Mapping):
 
 MeerkatDumper.add_multi_representer(FormatterGroup, FormatterGroup.to_yaml)
 MeerkatLoader.add_constructor("!FormatterGroup", FormatterGroup.from_yaml)
+register_manifest_type(
+    FormatterGroup,
+    "!FormatterGroup",
+    encode=lambda group: {"class": type(group), "dict": group._dict},
+    decode=FormatterGroup._from_manifest,
+)
 
 
 def deferred_formatter_group(group: FormatterGroup) -> FormatterGroup:
@@ -278,7 +287,10 @@ class BaseFormatter(ABC):
 
         It should not be called directly.
         """
-        data = loader.construct_mapping(node, deep=True)
+        return BaseFormatter._from_manifest(loader.construct_mapping(node, deep=True))
+
+    @staticmethod
+    def _from_manifest(data: dict) -> BaseFormatter:
         formatter = data["class"].__new__(data["class"])
         formatter._set_state(data["state"])
         return formatter
@@ -324,6 +336,15 @@ class Formatter(BaseFormatter):
 
 MeerkatDumper.add_multi_representer(BaseFormatter, BaseFormatter.to_yaml)
 MeerkatLoader.add_constructor("!Formatter", BaseFormatter.from_yaml)
+register_manifest_type(
+    BaseFormatter,
+    "!Formatter",
+    encode=lambda formatter: {
+        "class": type(formatter),
+        "state": formatter._get_state(),
+    },
+    decode=BaseFormatter._from_manifest,
+)
 
 
 class DeferredFormatter(BaseFormatter):
@@ -8,6 +8,10 @@ class AggregationError(ValueError):
 class AggregateMixin:
     AGGREGATIONS = [
         "mean",
+        "sum",
+        "min",
+        "max",
+        "count",
     ]
 
     def __init__(self, *args, **kwargs):
@@ -17,7 +21,14 @@ class AggregateMixin:
         if isinstance(function, str):
             if function not in self.AGGREGATIONS:
                 raise ValueError(f"{function} is not a valid aggregation")
-            return getattr(self, function)(*args, **kwargs)
+            try:
+                fn = getattr(self, function)
+            except AttributeError:
+                raise AggregationError(
+                    f"Aggregation '{function}' not implemented for column of type "
+                    f"{type(self)}."
+                )
+            return fn(*args, **kwargs)
         else:
             return function(self, *args, **kwargs)
 
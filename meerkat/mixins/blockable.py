@@ -1,4 +1,6 @@
-from meerkat.block.abstract import BlockView
+import numpy as np
+
+from meerkat.block.abstract import BlockView, SelectionBlock
 
 
 class BlockableMixin:
@@ -15,6 +17,11 @@ class BlockableMixin:
         if isinstance(data, BlockView):
             self._block = data.block
             self._block_index = data.block_index
+            if getattr(data.block, "is_pending", False):
+                # the rows of a lazily read or selected block are only read or
+                # gathered once the data of the column is accessed, see
+                # `Column._data`
+                return data
             data = data.data
         else:
             block_view: BlockView = self.block_class.from_column_data(data)
@@ -22,6 +29,35 @@ class BlockableMixin:
             data = block_view.data
         return data
 
+    def _get_pending(self, index):
+        """The rows of the column at ``index``, read on their own if the column is a
+        view of a block whose data has yet to be read (see
+        ``SelectionBlock._pending_rows``). Otherwise, None."""
+        view = self.__dict__.get("_data")
+        if not isinstance(view, BlockView) or not isinstance(
+            index, (slice, np.ndarray)
+        ):
+            return None
+        block = view.block._pending_rows(index)
+        if block is None:
+            return None
+        return self._clone(data=block[self._block_index])
+
+    def _on_write(self):
+        """Called before the data of the column is written to."""
+        block = getattr(self, "_block", None)
+        if isinstance(block, SelectionBlock):
+            # blocks lazily selected from the block shouldn't see the write
+            block._detach_dependents()
+
+    def _on_written(self):
+        """Called after the data of the column is written to."""
+        block = getattr(self, "_block", None)
+        if block is not None:
+            # the block has changed since it was last written to disk, see
+            # `BlockManager.write`
+            block._version += 1
+
     def _pack_block_view(self):
         return BlockView(block_index=self._block_index, block=self._block)
 
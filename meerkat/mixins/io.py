@@ -2,7 +2,7 @@ import os
 
 import dill
 
-from meerkat.tools.utils import dump_yaml, load_yaml, meerkat_dill_load
+from meerkat.tools.utils import dump_meta, load_meta, meerkat_dill_load
 
 
 class ColumnIOMixin:
@@ -19,9 +19,8 @@ class ColumnIOMixin:
         metadata["state"] = state
         self._write_data(path, *args, **kwargs)
 
-        # Save the metadata as a yaml file
-        metadata_path = os.path.join(path, "meta.yaml")
-        dump_yaml(metadata, metadata_path)
+        # Save the metadata
+        dump_meta(metadata, path)
         return metadata
 
     def _get_meta(self):
@@ -45,9 +44,7 @@ class ColumnIOMixin:
         cls, path: str, _data: object = None, _meta: object = None, *args, **kwargs
     ) -> object:
         # Load in the metadata
-        meta = (
-            dict(load_yaml(os.path.join(path, "meta.yaml"))) if _meta is None else _meta
-        )
+        meta = dict(load_meta(path)) if _meta is None else _meta
 
         col_type = meta["dtype"]
         # Load states
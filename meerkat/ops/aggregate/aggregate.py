@@ -1,11 +1,19 @@
+import functools
+import operator
 import warnings
 from typing import Any, Callable, Dict, Union
 
+import numpy as np
+import pandas as pd
+
 import meerkat as mk
 from meerkat.interactive.graph.reactivity import reactive
 
 from ...mixins.aggregate import AggregationError
 
+# the aggregations whose aggregates of batches of rows can be combined
+BATCHED_AGGREGATIONS = ("mean", "sum", "min", "max", "count")
+
 
 @reactive()
 def aggregate(
@@ -14,15 +22,29 @@ def aggregate(
     nuisance: str = "drop",
     accepts_df: bool = False,
     *args,
+    batch_size: int = None,
     **kwargs,
 ) -> Dict[str, Any]:
-    """"""
+    """Aggregate each column of ``data`` with ``function``.
+
+    Args:
+        batch_size (int, optional): The number of rows to aggregate at a time, so
+            that only that many rows of each column are in memory at once (e.g. when
+            the DataFrame was read lazily, see ``DataFrame.read``). Only supported
+            when ``function`` is the name of an aggregation whose aggregates of the
+            batches can be combined: one of "mean", "sum", "min", "max" and
+            "count". Defaults to None, in which case each column is aggregated at
+            once.
+    """
     if nuisance not in ["drop", "raise", "warn"]:
         raise ValueError(f"{nuisance} is not a valid nuisance option")
 
     if accepts_df and not isinstance(function, Callable):
         raise ValueError("Must pass a callable to aggregate if accepts_df is True")
 
+    if batch_size is not None and not isinstance(function, str):
+        raise ValueError("Can only aggregate in batches by the name of an aggregation.")
+
     if accepts_df:
         return {"df": function(data, *args, **kwargs)}
 
@@ -30,7 +52,12 @@ def aggregate(
 
     for name, column in data.items():
         try:
-            result[name] = column.aggregate(function, *args, **kwargs)
+            if batch_size is None:
+                result[name] = column.aggregate(function, *args, **kwargs)
+            else:
+                result[name] = _aggregate_batches(
+                    column, function, batch_size, *args, **kwargs
+                )
         except AggregationError as e:
             if nuisance == "drop":
                 continue
@@ -40,3 +67,48 @@ def aggregate(
                 warnings.warn(str(e))
                 continue
     return result
+
+
+def _aggregate_batches(
+    column: mk.Column, function: str, batch_size: int, *args, **kwargs
+) -> Any:
+    """Aggregate ``column`` with the aggregation named ``function``, by combining the
+    aggregates of its batches of ``batch_size`` rows."""
+    if function not in BATCHED_AGGREGATIONS:
+        raise ValueError(
+            f"Cannot aggregate in batches with '{function}', must be one of "
+            f"{BATCHED_AGGREGATIONS}."
+        )
+
+    aggregates, weights = [], []
+    for start in range(0, len(column), batch_size):
+        batch = column[start : start + batch_size]
+        if function == "mean":
+            # the mean of the batch weighs in proportion to the rows averaged over
+            weight = len(batch)
+            if isinstance(batch, mk.ScalarColumn) and kwargs.get("skipna", True):
+                weight -= int(batch.isnull().sum())
+            if weight == 0:
+                continue
+            weights.append(weight)
+        aggregate = batch.aggregate(function, *args, **kwargs)
+        if isinstance(aggregate, mk.Column):
+            aggregate = aggregate.data
+        if (
+            function in ("min", "max")
+            and np.ndim(aggregate) == 0
+            and pd.isna(aggregate)
+        ):
+            # all of the values of the batch are null
+            continue
+        aggregates.append(aggregate)
+
+    if not aggregates:
+        return column[:0].aggregate(function, *args, **kwargs)
+    if function == "mean":
+        return np.average(np.asarray(aggregates), axis=0, weights=weights)
+    elif function in ("sum", "count"):
+        return functools.reduce(operator.add, aggregates)
+    elif all(np.ndim(aggregate) == 0 for aggregate in aggregates):
+        return min(aggregates) if function == "min" else max(aggregates)
+    return functools.reduce(np.minimum if function == "min" else np.maximum, aggregates)
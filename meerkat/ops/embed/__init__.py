@@ -48,7 +48,7 @@ def embed(
     device: Union[int, str] = "auto",
     mmap_dir: str = None,
     num_workers: int = 0,
-    batch_size: int = 128,
+    batch_size: Union[int, str] = 128,
     pbar: bool = True,
     **kwargs,
 ) -> Union[mk.DataFrame, mk.Column]:
@@ -92,9 +92,13 @@ def embed(
         mmap_dir (str, optional): The path to directory where a memory-mapped file
             containing the embeddings will be written. Defaults to None, in which case
             the embeddings are not memmapped.
-        num_workers (int, optional): Number of worker processes used to load the data
-            from disk. Defaults to 4.
-        batch_size (int, optional): Size of the batches to  used . Defaults to 128.
+        num_workers (int, optional): Number of worker threads used to load and
+            preprocess batches of data concurrently, while the encoder embeds them on
+            the calling thread. Defaults to 0, in which case batches are processed
+            serially.
+        batch_size (Union[int, str], optional): Size of the batches to  used . Pass
+            "auto" to tune it to the throughput of the encoder within a memory
+            budget. Defaults to 128.
         **kwargs: Additional keyword arguments are passed to the encoder. To see
             supported arguments for each encoder, see the encoder documentation (e.g.
             :func:`~domino._embed.clip`).
@@ -157,7 +161,7 @@ def _embed(
     device: int = None,
     mmap_dir: str = None,
     num_workers: int = 0,
-    batch_size: int = 128,
+    batch_size: Union[int, str] = 128,
     pbar: bool = True,
 ):
     def _encode(x):
@@ -184,17 +188,39 @@ def _embed(
             x = x.to(device)
         return x
 
+    if num_workers == 0 or len(embed_input) == 0:
+        with torch.no_grad():
+            return embed_input.map(
+                _encode,
+                pbar=pbar,
+                is_batched_fn=True,
+                batch_size=batch_size,
+                out=mmap_dir,
+            )
+
+    # only loading and preprocessing the inputs runs in the thread pool, the encoder
+    # is called on this thread, where `torch.no_grad` applies
+    from tqdm import tqdm
+
+    from meerkat.ops.map import _iter_batches, _iter_batches_auto, _write_batches
+
+    def iter_batches(data, batch_size):
+        return _iter_batches(
+            data, batch_size=batch_size, executor="thread", num_workers=num_workers
+        )[0]
+
     with torch.no_grad():
-        out = embed_input.map(
-            _encode,
-            pbar=pbar,
-            is_batched_fn=True,
-            batch_size=batch_size,
-            # num_workers=num_workers,
-            # mmap=mmap_dir is not None,
-            # mmap_path=None
-            # if mmap_dir is None
-            # else os.path.join(mmap_dir, "emb_mmap.npy"),
-            # flush_size=128,
+        if batch_size == "auto":
+            # the encoder is timed along with loading the batches, so the batch size
+            # is tuned to the throughput of both
+            outputs = _iter_batches_auto(embed_input, iter_batches, fn=_encode)
+            total = None
+        else:
+            outputs = map(_encode, iter_batches(embed_input, batch_size))
+            total = -(-len(embed_input) // batch_size)
+        outputs = (
+            mk.column(output) for output in tqdm(outputs, total=total, disable=not pbar)
         )
-    return out
+        if mmap_dir is not None:
+            return _write_batches(outputs, out=mmap_dir, length=len(embed_input))
+        return mk.concat(list(outputs))
@@ -1,6 +1,20 @@
+import logging
 import warnings
 from inspect import signature
-from typing import TYPE_CHECKING, Callable, Dict, Mapping, Sequence, Tuple, Type, Union
+from itertools import chain
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterable,
+    Mapping,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
+
+import dill
 
 import meerkat.tools.docs as docs
 from meerkat.block.abstract import BlockView
@@ -9,7 +23,9 @@ if TYPE_CHECKING:
     from meerkat.columns.abstract import Column
     from meerkat.columns.deferred.base import DeferredColumn
     from meerkat.dataframe import DataFrame
+    from meerkat.writers.abstract import AbstractWriter
 
+logger = logging.getLogger(__name__)
 
 _SHARED_DOCS_ = {
     "input_description": docs.DescriptionSection(
@@ -45,7 +61,11 @@ _SHARED_DOCS_ = {
     ),
     "batch_size": docs.Arg(
         """
-        batch_size (int, optional): The size of the batch. Defaults to 1.
+        batch_size (Union[int, str], optional): The size of the batch. Pass "auto"
+            to tune it while materializing: the first batches are timed and their
+            memory usage measured, and the batch size grows while throughput
+            improves within ``mk.config.system.batch_memory_budget`` bytes (by
+            default half of the available memory, up to 1GB). Defaults to 1.
         """
     ),
     "inputs": docs.Arg(
@@ -113,15 +133,93 @@ _SHARED_DOCS_ = {
         pbar (bool): Show a progress bar. Defaults to False.
         """
     ),
+    "num_workers": docs.Arg(
+        """
+        num_workers (int): The number of local workers used to parallelize the
+            computation. If greater than 0 and ``executor`` is None, a process pool
+            is used. Defaults to 0, in which case the computation runs in the main
+            process.
+        """
+    ),
+    "executor": docs.Arg(
+        """
+        executor (str, optional): The local executor used to parallelize the
+            computation. With ``"process"``, the rows are split into contiguous
+            shards that are materialized in a pool of ``num_workers`` processes
+            and concatenated in order. With ``"thread"``, batches are materialized
+            in a pool of ``num_workers`` threads, which is well suited to I/O-bound
+            functions like the loaders of a :class:`FileColumn`. With ``"async"``,
+            the coroutines returned by an ``async def`` function are awaited on a
+            shared event loop, with at most ``num_workers`` in flight at once, so
+            latency-bound calls (e.g. to remote APIs) overlap across rows and
+            batches. Defaults to None. ``async def`` functions can also be used
+            without an executor, in which case only the calls within a batch
+            overlap.
+        """
+    ),
+    "prefetch": docs.Arg(
+        """
+        prefetch (int, optional): With ``executor="thread"``, the maximum number of
+            batches that are in flight at once. Defaults to None, in which case it is
+            twice the number of workers.
+        """
+    ),
+    "rate_limit": docs.Arg(
+        """
+        rate_limit (float, optional): With ``executor="async"``, the maximum number of
+            calls to the function started per second. Defaults to None, in which
+            case calls are only limited by ``num_workers``.
+        """
+    ),
+    "out": docs.Arg(
+        """
+        out (str, optional): A directory to which the output is streamed batch by
+            batch, instead of being collected in memory. Tensor outputs are written
+            to preallocated NumPy memmaps and scalar outputs to Arrow IPC files, one
+            file per output column, and the returned columns are memory-mapped from
+            these files. This makes it possible to compute outputs larger than
+            memory. Defaults to None.
+        """
+    ),
+    "checkpoint": docs.Arg(
+        """
+        checkpoint (str, optional): A work directory to which the materialized
+            batches are persisted as they complete. If the computation is interrupted,
+            rerunning it with the same function, inputs and ``batch_size`` skips the
+            completed batches and resumes from the first incomplete one. Defaults to
+            None.
+        """
+    ),
 }
 
+_EXECUTORS = ("process", "thread", "async")
+
+# the default maximum number of coroutines in flight with ``executor="async"``
+_ASYNC_CONCURRENCY = 16
+
+# the number of shards each worker processes, more shards give better load balancing
+# and progress reporting at the cost of more serialization overhead
+_SHARDS_PER_WORKER = 4
+
+# when streaming to ``out``, the number of bytes written between flushes of the
+# writers, which releases the pages of memory-mapped outputs
+_FLUSH_SIZE = 2**28
+
+# with ``batch_size="auto"``, the size of the first batch, the number of batches used
+# to tune the batch size, the relative improvement in throughput required to keep
+# growing it, and the default cap on the memory used by a batch in bytes
+_AUTO_INITIAL_BATCH_SIZE = 8
+_AUTO_MAX_STEPS = 10
+_AUTO_MIN_SPEEDUP = 0.1
+_AUTO_MEMORY_BUDGET = 2**30
+
 
 @docs.doc(source=_SHARED_DOCS_, data="data", name="defer")
 def defer(
     data: Union["DataFrame", "Column"],
     function: Callable,
     is_batched_fn: bool = False,
-    batch_size: int = 1,
+    batch_size: Union[int, str] = 1,
     inputs: Union[Mapping[str, str], Sequence[str]] = None,
     outputs: Union[Mapping[any, str], Sequence[str]] = None,
     output_type: Union[Mapping[str, Type["Column"]], Type["Column"]] = None,
@@ -365,7 +463,7 @@ def map(
     data: Union["DataFrame", "Column"],
     function: Callable,
     is_batched_fn: bool = False,
-    batch_size: int = 1,
+    batch_size: Union[int, str] = 1,
     inputs: Union[Mapping[str, str], Sequence[str]] = None,
     outputs: Union[Mapping[any, str], Sequence[str]] = None,
     output_type: Union[Mapping[str, Type["Column"]], Type["Column"]] = None,
@@ -374,6 +472,12 @@ def map(
     num_blocks: int = 100,
     blocks_per_window: int = 10,
     pbar: bool = False,
+    num_workers: int = 0,
+    executor: str = None,
+    prefetch: int = None,
+    rate_limit: float = None,
+    out: str = None,
+    checkpoint: str = None,
     **kwargs,
 ):
     """Create a new :class:`Column` or :class:`DataFrame` by applying a
@@ -428,6 +532,12 @@ def map(
         blocks_per_window (int): When using Ray, the number of blocks to process
             in a single Ray task. Defaults to 10.
         pbar (bool): Show a progress bar. Defaults to False.
+        ${num_workers}
+        ${executor}
+        ${prefetch}
+        ${rate_limit}
+        ${out}
+        ${checkpoint}
 
     Returns:
         Union[DataFrame, Column]: A :class:`Column` or a :class:`DataFrame`.
@@ -487,16 +597,28 @@ def map(
         use_ray=use_ray,
         num_blocks=num_blocks,
         blocks_per_window=blocks_per_window,
+        num_workers=num_workers,
+        executor=executor,
+        prefetch=prefetch,
+        rate_limit=rate_limit,
+        out=out,
+        checkpoint=checkpoint,
     )
 
 
 def _materialize(
     data: Union["DataFrame", "Column"],
-    batch_size: int,
+    batch_size: Union[int, str],
     pbar: bool,
     use_ray: bool,
     num_blocks: int,
     blocks_per_window: int,
+    num_workers: int = 0,
+    executor: str = None,
+    prefetch: int = None,
+    rate_limit: float = None,
+    out: str = None,
+    checkpoint: str = None,
 ):
     import logging
 
@@ -511,6 +633,28 @@ def _materialize(
 
     from .concat import concat
 
+    if executor is None and num_workers > 0:
+        executor = "process"
+
+    if executor is not None and executor not in _EXECUTORS:
+        raise ValueError(
+            f"Unsupported executor '{executor}'. Expected one of {_EXECUTORS}."
+        )
+
+    if isinstance(batch_size, str) and batch_size != "auto":
+        raise ValueError(
+            f"Unsupported batch size '{batch_size}'. Expected an int or 'auto'."
+        )
+
+    if use_ray and executor is not None:
+        raise ValueError("Cannot pass an `executor` with `use_ray=True`.")
+
+    if use_ray and out is not None:
+        raise ValueError("Cannot pass `out` with `use_ray=True`.")
+
+    if use_ray and checkpoint is not None:
+        raise ValueError("Cannot pass `checkpoint` with `use_ray=True`.")
+
     if use_ray:
         import ray
 
@@ -611,12 +755,512 @@ def _materialize(
                 f"Unsupported output type {data._output_type} with `use_ray=True`."
             )
 
+    completed, remaining = [], data
+    if checkpoint is not None and len(data) > 0:
+        checkpoint = _Checkpoint(checkpoint, data=data, batch_size=batch_size)
+        completed = checkpoint.iter_completed()
+        if checkpoint.stop > 0:
+            remaining = data._get(
+                slice(checkpoint.stop, len(data), 1), materialize=False
+            )
+
+    if batch_size == "auto":
+        batches = _iter_batches_auto(
+            remaining,
+            iter_batches=lambda data, batch_size: _iter_batches(
+                data,
+                batch_size=batch_size,
+                executor=executor,
+                num_workers=num_workers,
+                prefetch=prefetch,
+                rate_limit=rate_limit,
+            )[0],
+        )
+        # the number of batches isn't known until the batch size is tuned
+        total = None
     else:
-        result = []
-        for batch_start in tqdm(range(0, len(data), batch_size), disable=not pbar):
-            result.append(
-                data._get(
-                    slice(batch_start, batch_start + batch_size, 1), materialize=True
+        batches, total = _iter_batches(
+            remaining,
+            batch_size=batch_size,
+            executor=executor,
+            num_workers=num_workers,
+            prefetch=prefetch,
+            rate_limit=rate_limit,
+        )
+
+    if isinstance(checkpoint, _Checkpoint):
+        if total is not None:
+            total += len(checkpoint)
+        batches = chain(completed, checkpoint.save(batches))
+
+    batches = tqdm(batches, total=total, disable=not pbar)
+    if out is not None and len(data) > 0:
+        return _write_batches(batches, out=out, length=len(data))
+    return concat(list(batches))
+
+
+class _Checkpoint:
+    """Persists the materialized batches of ``data`` to a work directory, so that
+    an interrupted computation can resume from the first incomplete batch.
+
+    The batches are written with :meth:`Column.write` or :meth:`DataFrame.write`,
+    and ``meta.json`` records the row ranges that are complete along with a
+    fingerprint of ``data`` and ``batch_size``. If the fingerprint changes, e.g.
+    because the function was edited, the completed batches are discarded.
+    """
+
+    def __init__(self, path: str, data: Union["DataFrame", "Column"], batch_size: int):
+        import os
+        import shutil
+
+        from meerkat.tools.cache import fingerprint
+        from meerkat.tools.utils import load_meta, meta_path
+
+        self.path = os.path.abspath(os.path.expanduser(path))
+        key = fingerprint((data, batch_size))
+
+        meta = load_meta(self.path) if meta_path(self.path) is not None else None
+        if meta is None or meta["fingerprint"] != key or meta["len"] != len(data):
+            if meta is not None:
+                logger.info(
+                    f"Discarding the checkpoint at {self.path}, since the function "
+                    "or its inputs have changed."
                 )
+            # only remove the files written by the checkpoint
+            shutil.rmtree(os.path.join(self.path, "batches"), ignore_errors=True)
+            meta = {"fingerprint": key, "len": len(data), "batches": []}
+            os.makedirs(os.path.join(self.path, "batches"))
+            self._write_meta(meta)
+        self.meta = meta
+
+    def __len__(self) -> int:
+        return len(self.meta["batches"])
+
+    @property
+    def stop(self) -> int:
+        """The first row that has not been materialized."""
+        batches = self.meta["batches"]
+        return batches[-1]["stop"] if batches else 0
+
+    def iter_completed(self):
+        """Read the completed batches in order."""
+        import os
+
+        from meerkat.columns.abstract import Column
+        from meerkat.dataframe import DataFrame
+
+        for batch in list(self.meta["batches"]):
+            path = os.path.join(self.path, "batches", batch["name"])
+            yield DataFrame.read(path) if batch["dataframe"] else Column.read(path)
+
+    def save(self, batches: Iterable[Union["DataFrame", "Column"]]):
+        """Persist the batches starting at ``stop``, yielding each batch once it has
+        been written."""
+        import os
+        import shutil
+
+        from meerkat.dataframe import DataFrame
+
+        start = self.stop
+        for batch in batches:
+            stop = start + len(batch)
+            name = f"{start}-{stop}"
+            path = os.path.join(self.path, "batches", name)
+
+            # write to a temporary directory and rename it, so that an interrupted
+            # write never leaves a partial batch behind
+            tmp_path = f"{path}.tmp"
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            batch.write(tmp_path)
+            shutil.rmtree(path, ignore_errors=True)
+            os.rename(tmp_path, path)
+
+            self.meta["batches"].append(
+                {
+                    "name": name,
+                    "start": start,
+                    "stop": stop,
+                    "dataframe": isinstance(batch, DataFrame),
+                }
             )
-        return concat(result)
+            self._write_meta(self.meta)
+            yield batch
+            start = stop
+
+    def _write_meta(self, meta: dict):
+        from meerkat.tools.utils import dump_meta
+
+        dump_meta(meta, self.path)
+
+
+def _iter_batches(
+    data: Union["DataFrame", "Column"],
+    batch_size: int,
+    executor: str = None,
+    num_workers: int = 0,
+    prefetch: int = None,
+    rate_limit: float = None,
+) -> Tuple[Iterable[Union["DataFrame", "Column"]], int]:
+    """Return an iterator over the materialized batches of ``data`` with
+    ``executor``, and the number of items it yields."""
+    if executor == "process" and len(data) > 0:
+        shard_size = _get_shard_size(
+            len(data), batch_size=batch_size, num_workers=num_workers
+        )
+        batches = _iter_shards_with_process_pool(
+            data,
+            batch_size=batch_size,
+            shard_size=shard_size,
+            num_workers=num_workers,
+        )
+        return batches, -(-len(data) // shard_size)
+
+    if executor == "thread":
+        batches = _iter_batches_with_thread_pool(
+            data,
+            batch_size=batch_size,
+            num_workers=num_workers,
+            prefetch=prefetch,
+        )
+    elif executor == "async":
+        batches = _iter_batches_with_event_loop(
+            data,
+            batch_size=batch_size,
+            num_workers=num_workers,
+            prefetch=prefetch,
+            rate_limit=rate_limit,
+        )
+    else:
+        batches = (
+            data._get(slice(batch_start, batch_start + batch_size, 1), materialize=True)
+            for batch_start in range(0, len(data), batch_size)
+        )
+    return batches, -(-len(data) // batch_size)
+
+
+class _BatchSizeTuner:
+    """Searches for the batch size that maximizes throughput (rows per second)
+    while keeping the memory used by a batch within ``memory_budget`` bytes.
+
+    The batch size doubles while throughput keeps improving and the memory used per
+    row, extrapolated to the next batch size, fits the budget. It settles on the
+    fastest batch size seen once throughput stops improving, and shrinks to fit the
+    budget if a batch exceeds it.
+    """
+
+    def __init__(self, batch_size: int = None, memory_budget: int = None):
+        self.batch_size = _AUTO_INITIAL_BATCH_SIZE if batch_size is None else batch_size
+        self.memory_budget = (
+            _get_memory_budget() if memory_budget is None else memory_budget
+        )
+        self.done = False
+        self._best_throughput = 0.0
+        self._best_batch_size = self.batch_size
+        self._steps = 0
+
+    def update(self, batch_size: int, elapsed: float, memory: int):
+        """Record that a batch of ``batch_size`` rows took ``elapsed`` seconds and
+        used ``memory`` bytes, and pick the size of the next batch."""
+        self._steps += 1
+        max_batch_size = max(1, int(self.memory_budget // max(memory / batch_size, 1)))
+        throughput = batch_size / max(elapsed, 1e-9)
+
+        if batch_size > max_batch_size:
+            # over budget, so shrink to the largest batch that fits
+            self.batch_size = min(self._best_batch_size, max_batch_size)
+            self.done = True
+        elif throughput > self._best_throughput * (1 + _AUTO_MIN_SPEEDUP):
+            self._best_throughput = throughput
+            self._best_batch_size = batch_size
+            self.batch_size = min(2 * batch_size, max_batch_size)
+            self.done = self.batch_size == batch_size
+        else:
+            self.batch_size = self._best_batch_size
+            self.done = True
+
+        if self._steps >= _AUTO_MAX_STEPS:
+            self.done = True
+
+
+def _iter_batches_auto(
+    data: Union["DataFrame", "Column"],
+    iter_batches: Callable[
+        [Union["DataFrame", "Column"], int], Iterable[Union["DataFrame", "Column"]]
+    ],
+    fn: Callable = None,
+):
+    """Yield the materialized batches of ``data`` in order, tuning the batch size.
+
+    The first batches are materialized serially and timed by a
+    :class:`_BatchSizeTuner`. Once it settles, the remaining rows are passed to
+    ``iter_batches`` with the tuned batch size.
+
+    If ``fn`` is given, it's called on each batch (on the calling thread) and its
+    outputs are yielded instead. The call is part of the timed step, so the batch
+    size is tuned to the throughput of ``fn`` too, e.g. of an encoder that runs
+    after the batches are loaded.
+    """
+    import time
+
+    tuner = _BatchSizeTuner()
+    start = 0
+    while start < len(data) and not tuner.done:
+        batch_size = min(tuner.batch_size, len(data) - start)
+        rss, peak_rss = _get_rss()
+        tic = time.perf_counter()
+        batch = data._get(slice(start, start + batch_size, 1), materialize=True)
+        if fn is not None:
+            batch = fn(batch)
+        elapsed = time.perf_counter() - tic
+        rss_after, peak_rss_after = _get_rss()
+
+        # the peak only moves if the batch pushed the process past its previous
+        # high-water mark, in which case it bounds the transient memory of the batch
+        memory = rss_after - rss
+        if peak_rss_after > peak_rss:
+            memory = max(memory, peak_rss_after - rss)
+        tuner.update(batch_size, elapsed=elapsed, memory=memory)
+        start += batch_size
+        yield batch
+
+    logger.info(f"Tuned the batch size to {tuner.batch_size}.")
+    if start < len(data):
+        batches = iter_batches(
+            data._get(slice(start, len(data), 1), materialize=False),
+            tuner.batch_size,
+        )
+        yield from (batches if fn is None else (fn(batch) for batch in batches))
+
+
+def _get_rss() -> Tuple[int, int]:
+    """Return the current and peak resident set size of the process in bytes, or
+    zeros where they can't be measured."""
+    import os
+    import sys
+
+    try:
+        import resource
+    except ImportError:  # e.g. on Windows
+        return 0, 0
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ``ru_maxrss`` is in bytes on macOS and in kilobytes elsewhere
+    peak = peak if sys.platform == "darwin" else peak * 1024
+    try:
+        with open("/proc/self/statm") as f:
+            current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        current = peak
+    return current, peak
+
+
+def _get_memory_budget() -> int:
+    import meerkat as mk
+
+    if mk.config.system.batch_memory_budget is not None:
+        return mk.config.system.batch_memory_budget
+
+    try:
+        import os
+
+        available = os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        available = 2 * _AUTO_MEMORY_BUDGET
+    return min(available // 2, _AUTO_MEMORY_BUDGET)
+
+
+def _get_shard_size(length: int, batch_size: int, num_workers: int) -> int:
+    import os
+
+    if num_workers <= 0:
+        num_workers = os.cpu_count()
+
+    num_batches = -(-length // batch_size)
+    num_shards = min(num_batches, num_workers * _SHARDS_PER_WORKER)
+    return -(-num_batches // num_shards) * batch_size
+
+
+def _iter_shards_with_process_pool(
+    data: Union["DataFrame", "Column"],
+    batch_size: int,
+    shard_size: int,
+    num_workers: int,
+):
+    """Yield the materialized shards of ``data`` in order, while the shards are
+    materialized in a local process pool.
+
+    The shards are contiguous row ranges aligned to ``batch_size``, so each worker
+    calls the function on exactly the same batches as the serial path would.
+    """
+    import os
+    from concurrent.futures import ProcessPoolExecutor
+    from itertools import repeat
+
+    if num_workers <= 0:
+        num_workers = os.cpu_count()
+
+    # slice the inputs in the parent so that each worker only receives its shard
+    shards = [
+        _dumps(data._get(slice(start, start + shard_size, 1), materialize=False))
+        for start in range(0, len(data), shard_size)
+    ]
+    with ProcessPoolExecutor(max_workers=min(num_workers, len(shards))) as pool:
+        for out in pool.map(_materialize_shard, shards, repeat(batch_size)):
+            yield dill.loads(out)
+
+
+def _write_batches(
+    batches: Iterable[Union["DataFrame", "Column"]], out: str, length: int
+):
+    """Stream materialized batches into memory-mapped writers, one per output
+    column, under the directory ``out``."""
+    import os
+
+    from meerkat.dataframe import DataFrame
+    from meerkat.tools.cache import nbytes
+
+    writers = None
+    unflushed = 0
+    for batch in batches:
+        is_dataframe = isinstance(batch, DataFrame)
+        columns = batch if is_dataframe else {"data": batch}
+        if writers is None:
+            writers = {
+                name: _open_writer(
+                    col, path=os.path.join(out, str(name)), length=length
+                )
+                for name, col in columns.items()
+            }
+
+        for name, writer in writers.items():
+            writer.write(columns[name])
+            unflushed += nbytes(columns[name].data)
+
+        # intermittently flush
+        if unflushed >= _FLUSH_SIZE:
+            for writer in writers.values():
+                writer.flush()
+            unflushed = 0
+
+    outputs = {name: writer.finalize() for name, writer in writers.items()}
+    # cloning the last batch keeps the state of the dataframe (e.g. its primary key)
+    return batch._clone(data=outputs) if is_dataframe else outputs["data"]
+
+
+def _open_writer(col: "Column", path: str, length: int) -> "AbstractWriter":
+    """Open a memory-mapped writer at ``path`` for ``length`` rows like those of
+    ``col``, whose output has the same type as ``col``.
+
+    Columns that can't be memory-mapped (e.g. an ``ObjectColumn``) fall back to a
+    writer that concatenates the batches in memory.
+    """
+    import numpy as np
+
+    # Assumes first dimension of output is the batch dimension.
+    sample = np.asarray(col.data[:1])
+    try:
+        writer = type(col).get_writer(mmap=True, template=col)
+        writer.open(path, dtype=sample.dtype, shape=(length, *sample.shape[1:]))
+    except ValueError as e:
+        logger.warning(
+            f"Writing the outputs of type `{type(col).__name__}` to memory, since "
+            f"they can't be memory-mapped: {e}"
+        )
+        writer = type(col).get_writer(mmap=False, template=col)
+        writer.open()
+    return writer
+
+
+def _iter_batches_with_thread_pool(
+    data: Union["DataFrame", "Column"],
+    batch_size: int,
+    num_workers: int = 0,
+    prefetch: int = None,
+):
+    """Yield the materialized batches of ``data`` in order, while up to
+    ``prefetch`` batches are materialized ahead in a thread pool."""
+    import os
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+
+    if num_workers <= 0:
+        # same default as ``ThreadPoolExecutor``
+        num_workers = min(32, os.cpu_count() + 4)
+    if prefetch is None:
+        prefetch = 2 * num_workers
+    prefetch = max(prefetch, 1)
+
+    with ThreadPoolExecutor(max_workers=num_workers) as pool:
+        pending = deque()
+        try:
+            for batch_start in range(0, len(data), batch_size):
+                pending.append(
+                    pool.submit(
+                        data._get,
+                        slice(batch_start, batch_start + batch_size, 1),
+                        materialize=True,
+                    )
+                )
+                if len(pending) >= prefetch:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # do not run batches that will never be consumed
+            for future in pending:
+                future.cancel()
+
+
+def _iter_batches_with_event_loop(
+    data: Union["DataFrame", "Column"],
+    batch_size: int,
+    num_workers: int = 0,
+    prefetch: int = None,
+    rate_limit: float = None,
+):
+    """Yield the materialized batches of ``data`` in order, while the coroutines of
+    an ``async def`` function are awaited on a shared event loop.
+
+    Batches are materialized ahead in a thread pool, and each thread blocks on the
+    coroutines of its batch, so up to ``num_workers`` calls are in flight across
+    batches.
+    """
+    from meerkat.tools.aio import AsyncRunner
+
+    if num_workers <= 0:
+        num_workers = _ASYNC_CONCURRENCY
+    if prefetch is None:
+        # enough batches in flight to keep all of the workers busy
+        prefetch = 2 * -(-num_workers // batch_size)
+
+    with AsyncRunner(concurrency=num_workers, rate_limit=rate_limit):
+        yield from _iter_batches_with_thread_pool(
+            data,
+            batch_size=batch_size,
+            num_workers=max(prefetch, 1),
+            prefetch=prefetch,
+        )
+
+
+def _materialize_shard(shard: bytes, batch_size: int) -> bytes:
+    """Materialize a single shard in a worker process."""
+    data = dill.loads(shard)
+    return _dumps(
+        _materialize(
+            data,
+            batch_size=batch_size,
+            pbar=False,
+            use_ray=False,
+            num_blocks=None,
+            blocks_per_window=None,
+        )
+    )
+
+
+def _dumps(obj: object) -> bytes:
+    # classes must be pickled by reference: some meerkat modules are shadowed by
+    # attributes of the same name on the package (e.g. ``meerkat.provenance``), which
+    # makes dill fall back to pickling their classes by value
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", dill.PicklingWarning)
+        return dill.dumps(obj, byref=True)
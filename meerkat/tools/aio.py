@@ -0,0 +1,137 @@
+"""Running the coroutines returned by ``async def`` functions in deferred
+operations."""
+from __future__ import annotations
+
+import asyncio
+import inspect
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, List, Sequence
+
+
+class AsyncRunner:
+    """An event loop running in a background thread, on which the coroutines of
+    deferred operations are awaited while the runner is active.
+
+    Coroutines submitted from any thread share the loop, so calls from different
+    batches overlap.
+
+    Args:
+        concurrency (int, optional): The maximum number of coroutines awaited at
+            once. Defaults to None, in which case it is unbounded.
+        rate_limit (float, optional): The maximum number of coroutines started per
+            second. Defaults to None, in which case it is unbounded.
+    """
+
+    def __init__(self, concurrency: int = None, rate_limit: float = None):
+        self.concurrency = concurrency
+        self.rate_limit = rate_limit
+        self.loop: asyncio.AbstractEventLoop = None
+        self._thread: threading.Thread = None
+
+    def __enter__(self) -> AsyncRunner:
+        global _active_runner
+
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+        # the synchronization primitives must be created on the loop's thread
+        asyncio.run_coroutine_threadsafe(self._setup(), self.loop).result()
+
+        self._previous, _active_runner = _active_runner, self
+        return self
+
+    def __exit__(self, *args):
+        global _active_runner
+
+        _active_runner = self._previous
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+    async def _setup(self):
+        self._semaphore = (
+            asyncio.Semaphore(self.concurrency) if self.concurrency else None
+        )
+        self._next_start = self.loop.time()
+
+    def run(self, awaitables: Sequence[Awaitable]) -> List[Any]:
+        """Await ``awaitables`` on the loop, blocking until all are done.
+
+        Returns:
+            List[Any]: The results, in the same order as ``awaitables``.
+        """
+        return asyncio.run_coroutine_threadsafe(
+            self._gather(awaitables), self.loop
+        ).result()
+
+    async def _gather(self, awaitables: Sequence[Awaitable]) -> List[Any]:
+        return await asyncio.gather(
+            *[self._limit(awaitable) for awaitable in awaitables]
+        )
+
+    async def _limit(self, awaitable: Awaitable):
+        if self._semaphore is None:
+            await self._wait_for_rate_limit()
+            return await awaitable
+
+        async with self._semaphore:
+            await self._wait_for_rate_limit()
+            return await awaitable
+
+    async def _wait_for_rate_limit(self):
+        if not self.rate_limit:
+            return
+        # reserve the next start time before sleeping, the loop is single-threaded so
+        # no lock is needed
+        now = self.loop.time()
+        start = max(now, self._next_start)
+        self._next_start = start + 1 / self.rate_limit
+        await asyncio.sleep(start - now)
+
+
+_active_runner: AsyncRunner = None
+
+
+def run_awaitables(awaitables: Sequence[Awaitable]) -> List[Any]:
+    """Await ``awaitables`` concurrently and return their results in order.
+
+    The awaitables run on the active :class:`AsyncRunner` if there is one, and
+    otherwise on a new event loop.
+    """
+    if _active_runner is not None:
+        return _active_runner.run(awaitables)
+
+    async def _gather():
+        return await asyncio.gather(*awaitables)
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(_gather())
+
+    # an event loop is already running in this thread (e.g. in a notebook), so we
+    # can't block on a new one here
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, _gather()).result()
+
+
+def resolve(output: Any) -> Any:
+    """Await ``output`` if it is awaitable, e.g. if it was returned by an ``async
+    def`` function."""
+    if inspect.isawaitable(output):
+        return run_awaitables([output])[0]
+    return output
+
+
+def resolve_all(outputs: List[Any]) -> List[Any]:
+    """Await the awaitable outputs of a row-wise function concurrently."""
+    positions = [i for i, output in enumerate(outputs) if inspect.isawaitable(output)]
+    if not positions:
+        return outputs
+
+    outputs = list(outputs)
+    results = run_awaitables([outputs[i] for i in positions])
+    for i, result in zip(positions, results):
+        outputs[i] = result
+    return outputs
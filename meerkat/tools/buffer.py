@@ -0,0 +1,92 @@
+"""Buffers that rows can be appended to in amortized time proportional to the
+number of rows appended."""
+from __future__ import annotations
+
+import weakref
+from typing import Dict, List
+
+import numpy as np
+import pyarrow as pa
+
+# the least number of rows a buffer is allocated with
+MIN_CAPACITY = 16
+
+
+class _Buffer:
+    """An array with spare capacity, of which the first ``size`` rows are in use."""
+
+    __slots__ = ("array", "size", "__weakref__")
+
+    def __init__(self, array: np.ndarray, size: int):
+        self.array = array
+        self.size = size
+
+
+# maps the ids of the arrays backing buffers to the buffers
+_buffers: Dict[int, _Buffer] = {}
+
+
+def append_rows(data: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """Return an array of the rows of ``data`` followed by ``rows``.
+
+    The returned array is a view of the first rows of a buffer with spare capacity.
+    If ``data`` is such a view of all the rows in use of a buffer, ``rows`` are
+    copied into its spare capacity, so only ``data`` is not copied. Otherwise, the
+    rows are copied into a new buffer with twice the capacity they need, so
+    appending rows to the returned array over and over costs amortized time
+    proportional to the number of rows appended.
+
+    Note that ``data`` keeps viewing the same rows, but shares memory with the
+    returned array, as with slices of arrays.
+    """
+    rows = np.asarray(rows)
+    if rows.shape[1:] != data.shape[1:]:
+        raise ValueError(
+            f"Cannot append rows of shape {rows.shape[1:]} to rows of shape "
+            f"{data.shape[1:]}."
+        )
+    dtype = np.result_type(data.dtype, rows.dtype)
+    size = len(data) + len(rows)
+
+    buffer = _buffer_of(data)
+    if buffer is None or buffer.array.dtype != dtype or len(buffer.array) < size:
+        array = np.empty((max(2 * size, MIN_CAPACITY), *data.shape[1:]), dtype=dtype)
+        array[: len(data)] = data
+        buffer = _Buffer(array, len(data))
+        _buffers[id(array)] = buffer
+        weakref.finalize(array, _buffers.pop, id(array), None)
+
+    buffer.array[buffer.size : size] = rows
+    buffer.size = size
+    return buffer.array[:size]
+
+
+def _buffer_of(data: np.ndarray) -> _Buffer:
+    """The buffer of which ``data`` is a view of all the rows in use, if any."""
+    base = data if data.base is None else data.base
+    buffer = _buffers.get(id(base))
+    if (
+        buffer is None
+        or buffer.array is not base
+        or buffer.size != len(data)
+        or data.strides != base.strides
+        or data.__array_interface__["data"][0] != base.__array_interface__["data"][0]
+    ):
+        return None
+    return buffer
+
+
+def append_chunks(chunks: List[pa.Array], chunk: pa.Array) -> List[pa.Array]:
+    """Return ``chunks`` with ``chunk`` appended, merging the trailing chunks
+    while the chunk before them is no longer than they are.
+
+    This keeps the chunks ordered by decreasing length, so there are at most
+    logarithmically many of them and each row is copied at most logarithmically many
+    times, however many small chunks are appended.
+    """
+    chunks = list(chunks)
+    tail = [chunk]
+    while chunks and len(chunks[-1]) <= sum(len(c) for c in tail):
+        tail.insert(0, chunks.pop())
+    chunks.append(tail[0] if len(tail) == 1 else pa.concat_arrays(tail))
+    return chunks
@@ -0,0 +1,534 @@
+"""Content-addressed caching of the results of deferred operations."""
+from __future__ import annotations
+
+import functools
+import hashlib
+import logging
+import os
+import shutil
+import sys
+import threading
+import types
+import uuid
+import warnings
+from collections import OrderedDict, namedtuple
+from typing import Any, Dict, Hashable, Tuple
+
+import dill
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from meerkat.tools.lazy_loader import LazyLoader
+from meerkat.tools.utils import dump_yaml, load_yaml
+
+torch = LazyLoader("torch")
+
+logger = logging.getLogger(__name__)
+
+
+def fingerprint(obj: Any) -> str:
+    """Compute a stable fingerprint of an object.
+
+    Unlike ``hash``, the fingerprint is consistent across Python sessions.
+    Functions are fingerprinted by their code, defaults, closure and the globals
+    they reference, so that editing a function invalidates its fingerprint. Columns,
+    dataframes and arrays are fingerprinted by their contents.
+
+    Args:
+        obj (Any): The object to fingerprint.
+
+    Returns:
+        str: A hexadecimal digest.
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    _update(hasher, obj, seen=set())
+    return hasher.hexdigest()
+
+
+def _update(hasher, obj: Any, seen: set):
+    from meerkat.block.deferred_block import DeferredCellOp, DeferredOp
+    from meerkat.columns.abstract import Column
+    from meerkat.columns.deferred.base import DeferredColumn
+    from meerkat.dataframe import DataFrame
+
+    hasher.update(f"<{type(obj).__module__}.{type(obj).__qualname__}>".encode())
+
+    if obj is None or isinstance(obj, (bool, int, float, complex, str, bytes)):
+        hasher.update(repr(obj).encode())
+        return
+
+    if isinstance(obj, types.ModuleType):
+        # avoid attribute access, which would import lazily loaded modules
+        hasher.update(obj.__name__.encode())
+        return
+
+    if isinstance(obj, (type, types.BuiltinFunctionType)):
+        hasher.update(f"{obj.__module__}.{obj.__qualname__}".encode())
+        return
+
+    if isinstance(obj, np.ndarray):
+        hasher.update(f"{obj.dtype.str}{obj.shape}".encode())
+        if obj.dtype.hasobject:
+            _update(hasher, obj.tolist(), seen)
+        else:
+            hasher.update(np.ascontiguousarray(obj).view(np.uint8).data)
+        return
+
+    if isinstance(obj, np.generic):
+        hasher.update(f"{obj.dtype.str}{obj!r}".encode())
+        return
+
+    if torch.is_tensor(obj):
+        _update(hasher, obj.detach().cpu().numpy(), seen)
+        return
+
+    if isinstance(obj, pd.Series):
+        hasher.update(str(obj.dtype).encode())
+        try:
+            hashes = pd.util.hash_pandas_object(obj, index=False).values
+        except TypeError:
+            # unhashable objects in the series
+            _update(hasher, obj.tolist(), seen)
+        else:
+            hasher.update(hashes.tobytes())
+        return
+
+    if isinstance(obj, (pa.Array, pa.ChunkedArray)):
+        hasher.update(str(obj.type).encode())
+        chunks = obj.chunks if isinstance(obj, pa.ChunkedArray) else [obj]
+        for chunk in chunks:
+            hasher.update(f"{chunk.offset},{len(chunk)}".encode())
+            for buffer in chunk.buffers():
+                if buffer is not None:
+                    hasher.update(buffer)
+        return
+
+    # guard against cycles for all container types below
+    if id(obj) in seen:
+        hasher.update(b"<cycle>")
+        return
+    seen = seen | {id(obj)}
+
+    if isinstance(obj, (list, tuple)):
+        hasher.update(str(len(obj)).encode())
+        for value in obj:
+            _update(hasher, value, seen)
+    elif isinstance(obj, dict):
+        for key in sorted(obj, key=repr):
+            _update(hasher, key, seen)
+            _update(hasher, obj[key], seen)
+    elif isinstance(obj, DataFrame):
+        _update(hasher, obj.primary_key_name, seen)
+        _update(hasher, [(name, obj[name]) for name in obj.columns], seen)
+    elif isinstance(obj, DeferredColumn):
+        _update(hasher, obj.data, seen)
+    elif isinstance(obj, Column):
+        _update(hasher, obj.data, seen)
+    elif isinstance(obj, (DeferredOp, DeferredCellOp)):
+        if isinstance(obj, DeferredOp):
+            # the fingerprint of `fn` is computed once per op, not for every batch
+            _update(hasher, obj._fingerprint_fn(), seen)
+        else:
+            _update(hasher, obj.fn, seen)
+        _update(hasher, obj.args, seen)
+        _update(hasher, obj.kwargs, seen)
+        _update(hasher, obj.is_batched_fn, seen)
+        _update(hasher, obj.return_index, seen)
+        _update(hasher, getattr(obj, "return_format", None), seen)
+        _update(hasher, getattr(obj, "materialize_inputs", None), seen)
+    elif isinstance(obj, types.FunctionType):
+        _update(hasher, obj.__qualname__, seen)
+        _update(hasher, obj.__code__, seen)
+        _update(hasher, obj.__defaults__, seen)
+        _update(hasher, obj.__kwdefaults__, seen)
+        _update(
+            hasher,
+            [cell.cell_contents for cell in (obj.__closure__ or ())],
+            seen,
+        )
+        # include the globals referenced by the function, so that changing a helper
+        # or a constant defined elsewhere in a notebook invalidates the fingerprint
+        _update(
+            hasher,
+            {
+                name: obj.__globals__[name]
+                for name in _referenced_names(obj.__code__)
+                if name in obj.__globals__
+            },
+            seen,
+        )
+    elif isinstance(obj, types.CodeType):
+        hasher.update(obj.co_code)
+        _update(hasher, obj.co_consts, seen)
+        _update(hasher, obj.co_names, seen)
+    elif isinstance(obj, types.MethodType):
+        _update(hasher, obj.__func__, seen)
+        _update(hasher, obj.__self__, seen)
+    elif isinstance(obj, functools.partial):
+        _update(hasher, obj.func, seen)
+        _update(hasher, obj.args, seen)
+        _update(hasher, obj.keywords, seen)
+    elif hasattr(obj, "__dict__"):
+        # e.g. callable objects like `FileLoader`
+        _update(hasher, vars(obj), seen)
+    else:
+        try:
+            hasher.update(dill.dumps(obj))
+        except Exception:
+            hasher.update(repr(obj).encode())
+
+
+def _referenced_names(code: types.CodeType) -> set:
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= _referenced_names(const)
+    return names
+
+
+class DiskCache:
+    """A size-bounded, content-addressed cache on disk.
+
+    Each entry is a directory holding the value's arrays as NumPy or Arrow files,
+    along with a ``meta.yaml`` describing how to reassemble them. Writes are atomic,
+    so concurrent processes can share a cache directory. Once the total size of the
+    entries exceeds ``max_size``, the least recently used entries are evicted.
+
+    Args:
+        cache_dir (str): The directory in which entries are stored.
+        max_size (int): The maximum size of the cache in bytes.
+    """
+
+    def __init__(self, cache_dir: str, max_size: int):
+        self.cache_dir = os.path.expanduser(cache_dir)
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        # maps keys to (size, last access time), lazily built from the cache dir
+        self._index: Dict[str, Tuple[int, float]] = None
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(os.path.join(self._path(key), "meta.yaml"))
+
+    def __getitem__(self, key: str) -> Any:
+        path = self._path(key)
+        try:
+            meta = load_yaml(os.path.join(path, "meta.yaml"))
+            value = _read_value(path, meta["value"])
+            # mark the entry as recently used
+            os.utime(path)
+            mtime = os.path.getmtime(path)
+        except FileNotFoundError:
+            # the entry may have been evicted by another process while being read
+            raise KeyError(key)
+
+        with self._lock:
+            if self._index is not None and key in self._index:
+                self._index[key] = (self._index[key][0], mtime)
+        return value
+
+    def __setitem__(self, key: str, value: Any):
+        path = self._path(key)
+        # write to a temporary directory and rename it, so that readers never see a
+        # partially written entry
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        os.makedirs(tmp_path)
+        try:
+            meta = {"value": _write_value(tmp_path, value, name="value")}
+            dump_yaml(meta, os.path.join(tmp_path, "meta.yaml"))
+            try:
+                os.rename(tmp_path, path)
+            except OSError:
+                # another process wrote the same entry in the meantime
+                shutil.rmtree(tmp_path, ignore_errors=True)
+                return
+        except Exception:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+        with self._lock:
+            index = self._get_index()
+            index[key] = (_dir_size(path), os.path.getmtime(path))
+            self._evict(index)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._get_index())
+
+    @property
+    def size(self) -> int:
+        """The total size of the cache entries in bytes."""
+        with self._lock:
+            return sum(size for size, _ in self._get_index().values())
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        with self._lock:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            self._index = None
+
+    def _get_index(self) -> Dict[str, Tuple[int, float]]:
+        if self._index is None:
+            self._index = {}
+            if os.path.isdir(self.cache_dir):
+                for prefix in os.listdir(self.cache_dir):
+                    prefix_dir = os.path.join(self.cache_dir, prefix)
+                    if not os.path.isdir(prefix_dir):
+                        continue
+                    for key in os.listdir(prefix_dir):
+                        path = os.path.join(prefix_dir, key)
+                        if key.endswith(".tmp") or not os.path.isdir(path):
+                            continue
+                        self._index[key] = (_dir_size(path), os.path.getmtime(path))
+        return self._index
+
+    def _evict(self, index: Dict[str, Tuple[int, float]]):
+        total = sum(size for size, _ in index.values())
+        if total <= self.max_size:
+            return
+        for key, (size, _) in sorted(index.items(), key=lambda item: item[1][1]):
+            if total <= self.max_size:
+                break
+            shutil.rmtree(self._path(key), ignore_errors=True)
+            del index[key]
+            total -= size
+            logger.debug(f"Evicted cache entry {key} ({size} bytes).")
+
+
+def _dir_size(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(path, name))
+        for name in os.listdir(path)
+        if os.path.isfile(os.path.join(path, name))
+    )
+
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "size", "max_size", "length"])
+
+
+class MemoryCache:
+    """A size-bounded, least recently used cache in memory.
+
+    Values are stored by reference and their size is estimated with
+    :func:`nbytes`. Once the total size of the entries exceeds ``max_size``, the
+    least recently used entries are evicted.
+
+    Args:
+        max_size (int, optional): The maximum size of the cache in bytes. Defaults to
+            None, in which case ``mk.config.cache.memory_size`` is used. A size of 0
+            disables the cache.
+    """
+
+    def __init__(self, max_size: int = None):
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, Tuple[Any, int]] = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def max_size(self) -> int:
+        if self._max_size is None:
+            from meerkat.config import config
+
+            return config.cache.memory_size
+        return self._max_size
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __getitem__(self, key: Hashable) -> Any:
+        with self._lock:
+            try:
+                value, _ = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                raise
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def __setitem__(self, key: Hashable, value: Any):
+        size = nbytes(value)
+        max_size = self.max_size
+        with self._lock:
+            if key in self._entries:
+                self.size -= self._entries.pop(key)[1]
+            if size > max_size:
+                # the value would evict everything else, so we don't store it
+                return
+            self._entries[key] = (value, size)
+            self.size += size
+            while self.size > max_size:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __getstate__(self):
+        # entries are not pickled, so that shipping an op to a worker stays cheap
+        return {"_max_size": self._max_size}
+
+    def __setstate__(self, state: dict):
+        self.__init__(max_size=state["_max_size"])
+
+    def info(self) -> CacheInfo:
+        """Report the hit and miss counters and the current size of the cache."""
+        return CacheInfo(
+            hits=self.hits,
+            misses=self.misses,
+            size=self.size,
+            max_size=self.max_size,
+            length=len(self._entries),
+        )
+
+    def clear(self):
+        """Remove all entries from the cache and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
+
+
+def nbytes(obj: Any) -> int:
+    """Estimate the number of bytes held by an object."""
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    elif isinstance(obj, (str, bytes)):
+        return len(obj)
+    elif isinstance(obj, (list, tuple)):
+        return sum(nbytes(item) for item in obj)
+    elif isinstance(obj, dict):
+        return sum(nbytes(value) for value in obj.values())
+    elif isinstance(obj, pd.Series):
+        return int(obj.memory_usage(deep=True))
+    elif isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    elif isinstance(obj, (pa.Array, pa.ChunkedArray, pa.Table)):
+        return obj.nbytes
+    elif _is_torch_tensor(obj):
+        return obj.element_size() * obj.nelement()
+    elif _is_pil_image(obj):
+        return obj.width * obj.height * len(obj.getbands())
+    return sys.getsizeof(obj)
+
+
+def _is_torch_tensor(obj: Any) -> bool:
+    return type(obj).__module__.startswith("torch") and torch.is_tensor(obj)
+
+
+def _is_pil_image(obj: Any) -> bool:
+    return type(obj).__module__.startswith("PIL") and hasattr(obj, "getbands")
+
+
+_PYTHON_SCALARS = (bool, int, float, str)
+
+
+def _write_value(path: str, value: Any, name: str) -> dict:
+    """Write ``value`` to files in ``path`` and return a spec for reading it."""
+    if isinstance(value, np.ndarray) and not value.dtype.hasobject:
+        np.save(os.path.join(path, f"{name}.npy"), value)
+        return {"format": "numpy", "file": f"{name}.npy"}
+
+    if torch.is_tensor(value):
+        np.save(os.path.join(path, f"{name}.npy"), value.detach().cpu().numpy())
+        return {"format": "torch", "file": f"{name}.npy"}
+
+    if isinstance(value, (pa.Array, pa.ChunkedArray)):
+        _write_arrow(os.path.join(path, f"{name}.arrow"), value)
+        return {"format": "arrow", "file": f"{name}.arrow"}
+
+    if isinstance(value, list) and len(value) > 0:
+        # only use arrow for lists of python scalars of a single type, since
+        # arrow does not round trip other types (e.g. numpy scalars) exactly
+        value_type = type(value[0])
+        if value_type in _PYTHON_SCALARS and all(type(v) is value_type for v in value):
+            _write_arrow(os.path.join(path, f"{name}.arrow"), pa.array(value))
+            return {"format": "list", "file": f"{name}.arrow"}
+
+    if isinstance(value, dict):
+        return {
+            "format": "dict",
+            "items": [
+                [key, _write_value(path, v, name=f"{name}.{idx}")]
+                for idx, (key, v) in enumerate(value.items())
+            ],
+        }
+
+    if isinstance(value, tuple):
+        return {
+            "format": "tuple",
+            "items": [
+                _write_value(path, v, name=f"{name}.{idx}")
+                for idx, v in enumerate(value)
+            ],
+        }
+
+    with open(os.path.join(path, f"{name}.dill"), "wb") as f:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", dill.PicklingWarning)
+            dill.dump(value, f, byref=True)
+    return {"format": "dill", "file": f"{name}.dill"}
+
+
+def _read_value(path: str, spec: dict) -> Any:
+    fmt = spec["format"]
+    if fmt == "numpy":
+        return np.load(os.path.join(path, spec["file"]))
+    elif fmt == "torch":
+        return torch.from_numpy(np.load(os.path.join(path, spec["file"])))
+    elif fmt == "arrow":
+        return _read_arrow(os.path.join(path, spec["file"]))
+    elif fmt == "list":
+        return _read_arrow(os.path.join(path, spec["file"])).to_pylist()
+    elif fmt == "dict":
+        return {key: _read_value(path, item) for key, item in spec["items"]}
+    elif fmt == "tuple":
+        return tuple(_read_value(path, item) for item in spec["items"])
+    elif fmt == "dill":
+        with open(os.path.join(path, spec["file"]), "rb") as f:
+            return dill.load(f)
+    raise ValueError(f"Unrecognized cache entry format '{fmt}'.")
+
+
+def _write_arrow(path: str, array: pa.Array):
+    table = pa.table({"value": array})
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def _read_arrow(path: str) -> pa.ChunkedArray:
+    table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    column = table["value"]
+    return column.chunk(0) if column.num_chunks == 1 else column
+
+
+def get_deferred_cache() -> DiskCache:
+    """Get the cache used for deferred operations, as configured in
+    ``mk.config.cache``."""
+    from meerkat.config import config
+
+    global _deferred_cache
+    if (
+        _deferred_cache is None
+        or _deferred_cache.cache_dir != os.path.expanduser(config.cache.cache_dir)
+        or _deferred_cache.max_size != config.cache.max_size
+    ):
+        _deferred_cache = DiskCache(
+            cache_dir=config.cache.cache_dir, max_size=config.cache.max_size
+        )
+    return _deferred_cache
+
+
+_deferred_cache: DiskCache = None
@@ -0,0 +1,192 @@
+"""Downloading remote files into a size-bounded cache on disk."""
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import uuid
+from collections import OrderedDict, namedtuple
+from typing import Any, Callable, Dict
+from urllib.parse import urlparse
+
+DownloadInfo = namedtuple(
+    "DownloadInfo", ["hits", "misses", "bytes_fetched", "size", "max_size", "length"]
+)
+
+
+class DownloadCache:
+    """A size-bounded, least recently used cache of downloaded files on disk.
+
+    Files are cached at a path derived from a hash of their URI, so each URI is only
+    downloaded once, however many rows (or columns) refer to it. Files are
+    downloaded to a temporary file that is renamed once the download completes, so
+    a failed or interrupted download never leaves a partial file in the cache.
+    Concurrent fetches of the same URI wait for a single download.
+
+    Once the total size of the cached files exceeds ``max_size``, the least
+    recently used files are removed. The recency of a file is its modification
+    time, which is updated on every hit, so it carries over between sessions.
+
+    Args:
+        cache_dir (str): The directory the files are cached in.
+        max_size (int, optional): The maximum size of the cached files in bytes.
+            Defaults to None, in which case the cache is unbounded.
+    """
+
+    def __init__(self, cache_dir: str, max_size: int = None):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        # the sizes of the cached files, least recently used first
+        self._entries: OrderedDict[str, int] = None
+        # the downloads in progress, which other fetches of the same file wait for
+        self._pending: Dict[str, threading.Event] = {}
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.bytes_fetched = 0
+
+    def path(self, uri: str) -> str:
+        """The path ``uri`` is cached at."""
+        digest = hashlib.blake2b(uri.encode(), digest_size=16).hexdigest()
+        # the extension is kept for loaders that infer the format from it
+        ext = os.path.splitext(urlparse(uri).path)[1]
+        return os.path.join(self.cache_dir, digest[:2], digest + ext)
+
+    def fetch(self, uri: str, download: Callable[[str, str], Any]) -> str:
+        """Return the path of the cached file of ``uri``, calling
+        ``download(uri, dst)`` to download it to ``dst`` if it isn't cached."""
+        path = self.path(uri)
+        while True:
+            with self._lock:
+                self._scan()
+                if path in self._entries or os.path.exists(path):
+                    # the file may have been cached by another process
+                    self._touch(path)
+                    self.hits += 1
+                    return path
+                event = self._pending.get(path)
+                if event is None:
+                    self._pending[path] = threading.Event()
+                    self.misses += 1
+                    break
+            # another thread is downloading the file, if it fails we try ourselves
+            event.wait()
+
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # the temporary file keeps the extension, for downloaders that infer the
+            # format to write from it
+            tmp = os.path.join(
+                os.path.dirname(path), f".{uuid.uuid4().hex}.{os.path.basename(path)}"
+            )
+            try:
+                download(uri, tmp)
+                os.replace(tmp, path)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+            size = os.path.getsize(path)
+            with self._lock:
+                self._add(path, size)
+                self.bytes_fetched += size
+                self._evict(keep=path)
+        finally:
+            with self._lock:
+                self._pending.pop(path).set()
+        return path
+
+    def _scan(self):
+        """Index the files already in the cache directory, on first use."""
+        if self._entries is not None:
+            return
+        entries = []
+        if os.path.isdir(self.cache_dir):
+            for shard in os.scandir(self.cache_dir):
+                # files are sharded by the first two hex digits of their hash
+                if not shard.is_dir() or len(shard.name) != 2:
+                    continue
+                for entry in os.scandir(shard.path):
+                    # temporary files of downloads in progress are hidden
+                    if entry.is_file() and not entry.name.startswith("."):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, entry.path, stat.st_size))
+        self._entries = OrderedDict()
+        self.size = 0
+        for _, path, size in sorted(entries):
+            self._add(path, size)
+
+    def _add(self, path: str, size: int):
+        if path in self._entries:
+            self.size -= self._entries.pop(path)
+        self._entries[path] = size
+        self.size += size
+
+    def _touch(self, path: str):
+        if path not in self._entries:
+            self._add(path, os.path.getsize(path))
+        self._entries.move_to_end(path)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _evict(self, keep: str = None):
+        if self.max_size is None:
+            return
+        while self.size > self.max_size and len(self._entries) > 1:
+            path, size = next(iter(self._entries.items()))
+            if path == keep:
+                break
+            del self._entries[path]
+            self.size -= size
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def info(self) -> DownloadInfo:
+        """Report the hit and miss counters, the number of bytes downloaded and
+        the current size of the cache."""
+        with self._lock:
+            self._scan()
+            return DownloadInfo(
+                hits=self.hits,
+                misses=self.misses,
+                bytes_fetched=self.bytes_fetched,
+                size=self.size,
+                max_size=self.max_size,
+                length=len(self._entries),
+            )
+
+    def clear(self):
+        """Remove all files from the cache and reset the counters."""
+        with self._lock:
+            self._scan()
+            for path in self._entries:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._entries.clear()
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
+            self.bytes_fetched = 0
+
+
+_caches: Dict[str, DownloadCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_download_cache(cache_dir: str, max_size: int = None) -> DownloadCache:
+    """Get the cache of the files downloaded to ``cache_dir``, which is shared by
+    all the loaders that download to it."""
+    cache_dir = os.path.abspath(cache_dir)
+    with _caches_lock:
+        cache = _caches.get(cache_dir)
+        if cache is None:
+            cache = _caches[cache_dir] = DownloadCache(cache_dir, max_size=max_size)
+        elif max_size is not None:
+            cache.max_size = max_size
+        return cache
@@ -0,0 +1,291 @@
+"""Reading Parquet files a row group at a time."""
+from __future__ import annotations
+
+from typing import Any, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+# a predicate on the values of a column, e.g. ("label", ">=", 3)
+Filter = Tuple[str, str, Any]
+
+OPS = ("==", "=", "!=", "<", "<=", ">", ">=", "in", "not in")
+
+# the default maximum size in bytes of the cache of decoded row groups of a
+# `ParquetSource`, independent of the cache of deferred cells
+DEFAULT_CACHE_SIZE = 256 * 2**20
+
+
+def select_row_groups(
+    metadata: pq.FileMetaData,
+    row_groups: Optional[Sequence[int]] = None,
+    filters: Optional[Sequence[Filter]] = None,
+) -> List[int]:
+    """The row groups of ``row_groups`` (all of them, by default) that may hold
+    rows matching all of ``filters``.
+
+    A row group is skipped if the min and max statistics of a filtered column show
+    none of its values can match the filter, so the row group needn't be read.
+    """
+    if row_groups is None:
+        row_groups = range(metadata.num_row_groups)
+    if not filters:
+        return list(row_groups)
+
+    columns = {}
+    if metadata.num_row_groups > 0:
+        row_group = metadata.row_group(0)
+        columns = {
+            row_group.column(i).path_in_schema: i for i in range(row_group.num_columns)
+        }
+    for column, op, _ in filters:
+        if op not in OPS:
+            raise ValueError(f"Unsupported filter op '{op}', must be one of {OPS}.")
+
+    selected = []
+    for i in row_groups:
+        row_group = metadata.row_group(i)
+        if all(
+            _may_match(row_group.column(columns[column]).statistics, op, value)
+            for column, op, value in filters
+            if column in columns
+        ):
+            selected.append(i)
+    return selected
+
+
+def _may_match(statistics: Optional[pq.Statistics], op: str, value: Any) -> bool:
+    """Whether a column chunk with ``statistics`` may hold values matching
+    ``op`` ``value``."""
+    if statistics is None or not statistics.has_min_max:
+        return True
+    lo, hi = statistics.min, statistics.max
+    try:
+        if op in ("==", "="):
+            return lo <= value <= hi
+        elif op == "<":
+            return lo < value
+        elif op == "<=":
+            return lo <= value
+        elif op == ">":
+            return hi > value
+        elif op == ">=":
+            return hi >= value
+        elif op == "in":
+            return any(lo <= v <= hi for v in value)
+    except TypeError:
+        # the statistics aren't comparable to the value (e.g. timestamps)
+        pass
+    return True
+
+
+def filter_mask(batch: pa.RecordBatch, filters: Sequence[Filter]) -> pa.Array:
+    """A boolean mask of the rows of ``batch`` matching all of ``filters``."""
+    mask = None
+    for column, op, value in filters:
+        values = batch.column(batch.schema.get_field_index(column))
+        if op in ("==", "="):
+            match = pc.equal(values, value)
+        elif op == "!=":
+            match = pc.not_equal(values, value)
+        elif op == "<":
+            match = pc.less(values, value)
+        elif op == "<=":
+            match = pc.less_equal(values, value)
+        elif op == ">":
+            match = pc.greater(values, value)
+        elif op == ">=":
+            match = pc.greater_equal(values, value)
+        elif op in ("in", "not in"):
+            match = pc.is_in(values, value_set=pa.array(list(value), type=values.type))
+            if op == "not in":
+                match = pc.invert(match)
+        else:
+            raise ValueError(f"Unsupported filter op '{op}', must be one of {OPS}.")
+        mask = match if mask is None else pc.and_kleene(mask, match)
+    return mask
+
+
+def iter_batches(
+    file: pq.ParquetFile,
+    columns: Optional[Sequence[str]] = None,
+    row_groups: Optional[Sequence[int]] = None,
+    filters: Optional[Sequence[Filter]] = None,
+    batch_size: int = 65536,
+) -> Iterator[pa.RecordBatch]:
+    """Iterate over the rows of ``file`` in record batches of at most
+    ``batch_size`` rows.
+
+    Only the row groups that may match ``filters`` (see ``select_row_groups``) and
+    the columns in ``columns`` (all of them, by default) are read. Rows that don't
+    match ``filters`` are dropped from the batches.
+    """
+    row_groups = select_row_groups(file.metadata, row_groups, filters)
+    if not row_groups:
+        return
+
+    read_columns = columns
+    if columns is not None and filters:
+        # the filtered columns are read too, then dropped once the rows are filtered
+        read_columns = list(columns) + [c for c, _, _ in filters if c not in columns]
+    for batch in file.iter_batches(
+        batch_size=batch_size, row_groups=row_groups, columns=read_columns
+    ):
+        if filters:
+            batch = batch.filter(filter_mask(batch, filters))
+        if columns is not None and read_columns != columns:
+            batch = pa.RecordBatch.from_arrays(
+                [batch.column(batch.schema.get_field_index(c)) for c in columns],
+                names=list(columns),
+            )
+        yield batch
+
+
+def read_table(
+    filepath: str,
+    columns: Optional[Sequence[str]] = None,
+    row_groups: Optional[Sequence[int]] = None,
+    filters: Optional[Sequence[Filter]] = None,
+    batch_size: int = 65536,
+) -> pa.Table:
+    """Read the rows of a Parquet file matching ``filters`` into a table with a
+    chunk per record batch (see ``iter_batches``)."""
+    file = pq.ParquetFile(filepath)
+    schema = file.schema_arrow
+    if columns is None:
+        # the index written by pandas isn't read, as with `DataFrame.from_pandas`
+        # with `index=False`
+        columns = [c for c in schema.names if not c.startswith("__index_level_")]
+    schema = pa.schema([schema.field(c) for c in columns])
+    batches = [
+        pa.RecordBatch.from_arrays(batch.columns, schema=schema)
+        for batch in iter_batches(
+            file,
+            columns=columns,
+            row_groups=row_groups,
+            filters=filters,
+            batch_size=batch_size,
+        )
+    ]
+    return pa.Table.from_batches(batches, schema=schema)
+
+
+class ParquetSource:
+    """The columns of a Parquet file, read a row group at a time on demand.
+
+    Reading rows of the file only reads and decodes the row groups that hold them,
+    and only the requested columns of those. The decoded row groups are kept in a
+    least recently used cache (see :class:`~meerkat.tools.cache.MemoryCache`), so
+    reading nearby rows again (e.g. scrolling through a table) doesn't decode the
+    row groups again.
+
+    Args:
+        path (str): The path of the Parquet file.
+        row_groups (Optional[Sequence[int]]): The row groups of the file that make
+            up the rows of the source. Defaults to all of the row groups.
+        cache_size (int, optional): The maximum size of the cache of decoded row
+            groups in bytes. Defaults to None, in which case ``DEFAULT_CACHE_SIZE``
+            (256 MiB) is used. A size of 0 disables the cache.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        row_groups: Optional[Sequence[int]] = None,
+        cache_size: int = None,
+    ):
+        from meerkat.tools.cache import MemoryCache
+
+        self.path = path
+        metadata = self.file.metadata
+        if row_groups is None:
+            row_groups = range(metadata.num_row_groups)
+        self.row_groups = list(row_groups)
+        # the position of the first row of each row group, and the number of rows
+        self.offsets = np.cumsum(
+            [0] + [metadata.row_group(i).num_rows for i in self.row_groups]
+        )
+        self.cache = MemoryCache(
+            max_size=DEFAULT_CACHE_SIZE if cache_size is None else cache_size
+        )
+
+    @property
+    def file(self) -> pq.ParquetFile:
+        if self.__dict__.get("_file") is None:
+            self._file = pq.ParquetFile(self.path)
+        return self._file
+
+    @property
+    def num_rows(self) -> int:
+        return int(self.offsets[-1])
+
+    @property
+    def columns(self) -> List[str]:
+        """The names of the columns, less the index written by pandas."""
+        return [
+            c
+            for c in self.file.schema_arrow.names
+            if not c.startswith("__index_level_")
+        ]
+
+    def read(
+        self, columns: Sequence[str], rows: Union[slice, np.ndarray] = None
+    ) -> pa.Table:
+        """Read the ``columns`` of the source, or only the ``rows`` of them (a slice
+        with a step of 1 or an array of non-negative positions)."""
+        if rows is None:
+            groups = np.arange(len(self.row_groups))
+        elif isinstance(rows, slice):
+            groups = np.arange(
+                np.searchsorted(self.offsets, rows.start, side="right") - 1,
+                np.searchsorted(self.offsets, rows.stop, side="left"),
+            )
+        else:
+            group_of_rows = np.searchsorted(self.offsets, rows, side="right") - 1
+            groups = np.unique(group_of_rows)
+
+        tables = [self._read_row_group(int(group), columns) for group in groups]
+        if tables:
+            # the chunks of the row groups are kept, rather than copied
+            table = pa.concat_tables(tables)
+        else:
+            table = pa.schema(
+                [self.file.schema_arrow.field(c) for c in columns]
+            ).empty_table()
+        if rows is None:
+            return table
+
+        # the offsets of the row groups that were read in ``table``
+        read_offsets = np.cumsum([0, *np.diff(self.offsets)[groups]])
+        if isinstance(rows, slice):
+            start = rows.start - self.offsets[groups[0]] if len(groups) else 0
+            return table.slice(start, rows.stop - rows.start)
+        positions = (
+            rows
+            - self.offsets[group_of_rows]
+            + read_offsets[np.searchsorted(groups, group_of_rows)]
+        )
+        return table.take(positions)
+
+    def _read_row_group(self, group: int, columns: Sequence[str]) -> pa.Table:
+        """Read the ``columns`` of the ``group``-th row group of the source,
+        decoding only the columns that aren't cached."""
+        arrays = {}
+        for column in columns:
+            key = (group, column)
+            try:
+                arrays[column] = self.cache[key]
+            except KeyError:
+                table = self.file.read_row_group(
+                    self.row_groups[group], columns=[column]
+                )
+                arrays[column] = self.cache[key] = table.column(0)
+        return pa.table(arrays)
+
+    def __getstate__(self):
+        # the open file can't be pickled, it's reopened on first use
+        state = self.__dict__.copy()
+        state.pop("_file", None)
+        return state
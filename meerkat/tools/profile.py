@@ -0,0 +1,240 @@
+"""Profiling the execution of deferred operations."""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List
+
+# the phases of materializing a deferred operation, in the order they run
+PHASES = ("index", "fn", "collate", "convert")
+
+
+class Profiler:
+    """Context manager recording where time goes when deferred operations are
+    materialized.
+
+    While the profiler is active, every deferred operation records the wall time of
+    each phase of its execution:
+
+    *   ``"index"``: indexing (and materializing) the inputs of the function.
+    *   ``"fn"``: calling the function, including awaiting ``async def`` functions.
+    *   ``"collate"``: collating the outputs of the function into a batch.
+    *   ``"convert"``: converting the batch into the output column type.
+
+    Phases nest, e.g. the ``"index"`` phase of an operation includes the phases of
+    the deferred operations it takes as inputs. Operations materialized in worker
+    processes (i.e. with ``executor="process"``) are not recorded. When no profiler
+    is active, the instrumentation costs a single global lookup per phase.
+
+    Example:
+    ```python
+    import meerkat as mk
+    with mk.profile() as profiler:
+        df.map(fn)
+    profiler.to_df()
+    profiler.to_chrome_trace("trace.json")
+    ```
+
+    Args:
+        record_bytes (bool, optional): Whether to estimate the number of bytes
+            produced by the ``"fn"`` and ``"convert"`` phases. Defaults to True.
+    """
+
+    def __init__(self, record_bytes: bool = True):
+        self.record_bytes = record_bytes
+        self.events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._start = None
+
+    def __enter__(self) -> Profiler:
+        global _active_profiler
+
+        self._start = time.perf_counter()
+        self._previous, _active_profiler = _active_profiler, self
+        return self
+
+    def __exit__(self, *args):
+        global _active_profiler
+
+        _active_profiler = self._previous
+
+    def record(
+        self,
+        fn: Callable,
+        phase: str,
+        start: float,
+        end: float,
+        rows: int = None,
+        nbytes: int = None,
+    ):
+        """Record that ``phase`` of the operation applying ``fn`` ran from
+        ``start`` to ``end``, as measured by :func:`time.perf_counter`."""
+        event = {
+            "op": _op_name(fn),
+            "op_id": _op_key(fn),
+            "phase": phase,
+            "start": start,
+            "duration": end - start,
+            "rows": rows,
+            "bytes": nbytes,
+            "thread": threading.get_ident(),
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def to_df(self):
+        """Summarize the recorded events with one row per operation and phase.
+
+        Returns:
+            DataFrame: A DataFrame with columns ``op``, ``phase``, ``calls``,
+                ``rows``, ``bytes``, ``time`` (in seconds) and ``rows_per_sec``.
+        """
+        import meerkat as mk
+
+        groups = defaultdict(lambda: {"calls": 0, "rows": 0, "bytes": 0, "time": 0.0})
+        names = {}
+        for event in self.events:
+            key = (event["op_id"], event["phase"])
+            names[key] = event["op"]
+            group = groups[key]
+            group["calls"] += 1
+            group["rows"] += event["rows"] or 0
+            group["bytes"] += event["bytes"] or 0
+            group["time"] += event["duration"]
+
+        # operations in the order they first ran
+        order = {}
+        for event in self.events:
+            order.setdefault(event["op_id"], len(order))
+        keys = sorted(groups, key=lambda key: (order[key[0]], PHASES.index(key[1])))
+        return mk.DataFrame(
+            {
+                "op": [names[key] for key in keys],
+                "phase": [key[1] for key in keys],
+                "calls": [groups[key]["calls"] for key in keys],
+                "rows": [groups[key]["rows"] for key in keys],
+                "bytes": [groups[key]["bytes"] for key in keys],
+                "time": [groups[key]["time"] for key in keys],
+                "rows_per_sec": [
+                    groups[key]["rows"] / groups[key]["time"]
+                    if groups[key]["time"] > 0 and groups[key]["rows"] > 0
+                    else float("nan")
+                    for key in keys
+                ],
+            }
+        )
+
+    def to_chrome_trace(self, path: str = None) -> Dict[str, Any]:
+        """Export the recorded events in the Chrome trace event format, which can be
+        opened in ``chrome://tracing`` or Perfetto.
+
+        Args:
+            path (str, optional): A path to write the trace to as JSON. Defaults to
+                None.
+
+        Returns:
+            Dict[str, Any]: The trace.
+        """
+        pid = os.getpid()
+        trace = {
+            "traceEvents": [
+                {
+                    "name": f"{event['op']}.{event['phase']}",
+                    "cat": event["phase"],
+                    "ph": "X",
+                    # timestamps are in microseconds
+                    "ts": (event["start"] - self._start) * 1e6,
+                    "dur": event["duration"] * 1e6,
+                    "pid": pid,
+                    "tid": event["thread"],
+                    "args": {
+                        key: event[key]
+                        for key in ("rows", "bytes")
+                        if event[key] is not None
+                    },
+                }
+                for event in self.events
+            ],
+            "displayTimeUnit": "ms",
+        }
+        if path is not None:
+            with open(path, "w") as f:
+                json.dump(trace, f)
+        return trace
+
+
+_active_profiler: Profiler = None
+
+
+class _Span:
+    __slots__ = ("profiler", "fn", "phase", "rows", "output", "start")
+
+    def __init__(self, profiler: Profiler, fn: Callable, phase: str, rows: int):
+        self.profiler = profiler
+        self.fn = fn
+        self.phase = phase
+        self.rows = rows
+        self.output = None
+
+    def __enter__(self) -> _Span:
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        end = time.perf_counter()
+        nbytes = None
+        if self.output is not None and self.profiler.record_bytes:
+            from meerkat.columns.abstract import Column
+            from meerkat.tools.cache import nbytes as _nbytes
+
+            output = self.output
+            nbytes = _nbytes(output.data if isinstance(output, Column) else output)
+        self.profiler.record(
+            self.fn, self.phase, self.start, end, rows=self.rows, nbytes=nbytes
+        )
+
+
+class _NullSpan:
+    """The span returned when profiling is disabled, which records nothing."""
+
+    __slots__ = ("output",)
+
+    def __enter__(self) -> _NullSpan:
+        return self
+
+    def __exit__(self, *args):
+        self.output = None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(fn: Callable, phase: str, rows: int = None):
+    """Time ``phase`` of the operation applying ``fn`` on the active profiler.
+
+    Setting ``output`` on the returned span records the number of bytes it holds.
+    """
+    if _active_profiler is None:
+        return _NULL_SPAN
+    return _Span(_active_profiler, fn, phase, rows)
+
+
+def _op_name(fn: Callable) -> str:
+    from meerkat.block.deferred_block import _FusedFn
+
+    if isinstance(fn, _FusedFn):
+        return f"fused({', '.join(_op_name(op.fn) for op in fn.stage.ops())})"
+    return getattr(fn, "__qualname__", type(fn).__qualname__)
+
+
+def _op_key(fn: Callable) -> Any:
+    from meerkat.block.deferred_block import _FusedFn
+
+    # a fused function is created for every batch, so it is identified by the
+    # functions it fuses
+    if isinstance(fn, _FusedFn):
+        return tuple(id(op.fn) for op in fn.stage.ops())
+    return id(fn)
@@ -1,4 +1,8 @@
+import base64
+import importlib
 import inspect
+import io
+import os
 import sys
 import types
 import typing
@@ -7,11 +11,12 @@ import weakref
 from collections import defaultdict
 from collections.abc import Mapping
 from functools import reduce, wraps
-from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
 
 import dill
 import numpy as np
 import pandas as pd
+import ujson
 import yaml
 from yaml.constructor import ConstructorError
 
@@ -285,6 +290,7 @@ MeerkatLoader.add_constructor(
     "!PickledObject", MeerkatLoader._pickled_object_constructor
 )
 MeerkatLoader.add_constructor("!Lambda", MeerkatLoader._function_constructor)
+MeerkatLoader.add_constructor("!NestedFunction", MeerkatLoader._function_constructor)
 
 
 def dump_yaml(obj: Any, path: str, **kwargs):
@@ -297,6 +303,143 @@ def load_yaml(path: str, **kwargs):
         return yaml.load(f, Loader=MeerkatLoader, **kwargs)
 
 
+# The metadata of written DataFrames, block managers, blocks and columns is stored in
+# a JSON manifest, which is much faster to parse than YAML. Values that JSON can't
+# represent are encoded as objects with a single tag key (e.g. ``{"!tuple": [...]}``)
+# for tuples, classes and functions (referenced by name), types registered with
+# `register_manifest_type`, and anything else (pickled with dill).
+META_FILENAME = "meta.json"
+# the YAML metadata written by earlier versions
+LEGACY_META_FILENAME = "meta.yaml"
+
+_MANIFEST_TYPES: Dict[type, Tuple[str, Callable[[Any], Any]]] = {}
+_MANIFEST_DECODERS: Dict[str, Callable[[Any], Any]] = {}
+
+
+def register_manifest_type(
+    klass: type, tag: str, encode: Callable[[Any], Any], decode: Callable[[Any], Any]
+):
+    """Encode instances of ``klass`` (and its subclasses) in manifests with
+    ``encode``, which returns a value that can be encoded, rather than pickling
+    them. ``decode`` returns the instance from the decoded value."""
+    _MANIFEST_TYPES[klass] = (tag, encode)
+    _MANIFEST_DECODERS[tag] = decode
+
+
+def _encode_manifest(obj: Any) -> Any:
+    if obj is None or type(obj) in (bool, str, int):
+        return obj
+    if type(obj) is float:
+        return obj if np.isfinite(obj) else {"!float": repr(obj)}
+    if type(obj) is list:
+        return [_encode_manifest(value) for value in obj]
+    if type(obj) is tuple:
+        return {"!tuple": [_encode_manifest(value) for value in obj]}
+    if type(obj) is dict:
+        if all(type(key) is str for key in obj) and not (
+            len(obj) == 1 and next(iter(obj)).startswith("!")
+        ):
+            return {key: _encode_manifest(value) for key, value in obj.items()}
+        return {
+            "!dict": [
+                [_encode_manifest(key), _encode_manifest(value)]
+                for key, value in obj.items()
+            ]
+        }
+    for klass in type(obj).__mro__:
+        if klass in _MANIFEST_TYPES:
+            tag, encode = _MANIFEST_TYPES[klass]
+            return {tag: _encode_manifest(encode(obj))}
+    if isinstance(obj, (type, types.FunctionType, types.BuiltinFunctionType)):
+        name = f"{obj.__module__}:{obj.__qualname__}"
+        if "<" not in name and _load_name(name) is obj:
+            return {"!name": name}
+    return {"!pickle": base64.b64encode(dill.dumps(obj)).decode()}
+
+
+def _decode_manifest(obj: Any) -> Any:
+    if type(obj) is list:
+        return [_decode_manifest(value) for value in obj]
+    if type(obj) is not dict:
+        return obj
+    if len(obj) == 1:
+        tag, value = next(iter(obj.items()))
+        if tag == "!name":
+            return _load_name(value)
+        elif tag == "!pickle":
+            return MeerkatUnpickler(io.BytesIO(base64.b64decode(value))).load()
+        elif tag == "!tuple":
+            return tuple(_decode_manifest(value))
+        elif tag == "!dict":
+            return {
+                _decode_manifest(key): _decode_manifest(value) for key, value in value
+            }
+        elif tag == "!float":
+            return float(value)
+        elif tag in _MANIFEST_DECODERS:
+            return _MANIFEST_DECODERS[tag](_decode_manifest(value))
+    return {key: _decode_manifest(value) for key, value in obj.items()}
+
+
+def _load_name(name: str) -> Any:
+    """Load the object named ``name``, of the form ``module:qualname``."""
+    for old, new in BACKWARDS_COMPAT_REPLACEMENTS:
+        if old in name:
+            name = name.replace(old, new)
+    module_name, qualname = name.split(":")
+    try:
+        return reduce(
+            getattr, qualname.split("."), importlib.import_module(module_name)
+        )
+    except (ImportError, AttributeError):
+        return None
+
+
+def dumps_manifest(obj: Any) -> str:
+    """Encode ``obj`` as a JSON manifest."""
+    return ujson.dumps(_encode_manifest(obj), ensure_ascii=False)
+
+
+def loads_manifest(manifest: Union[str, bytes]) -> Any:
+    """Decode a JSON manifest encoded with ``dumps_manifest``."""
+    return _decode_manifest(ujson.loads(manifest))
+
+
+def dump_meta(obj: Any, path: str):
+    """Write the metadata ``obj`` to the manifest in the directory ``path``.
+
+    The manifest is replaced atomically, and YAML metadata written by earlier
+    versions is removed.
+    """
+    meta_path = os.path.join(path, META_FILENAME)
+    with open(f"{meta_path}.tmp", "w") as f:
+        f.write(dumps_manifest(obj))
+    os.replace(f"{meta_path}.tmp", meta_path)
+
+    legacy_path = os.path.join(path, LEGACY_META_FILENAME)
+    if os.path.exists(legacy_path):
+        os.remove(legacy_path)
+
+
+def load_meta(path: str) -> Any:
+    """Load the metadata written to the directory ``path`` with ``dump_meta``, or as
+    YAML by earlier versions."""
+    meta_path = os.path.join(path, META_FILENAME)
+    if not os.path.exists(meta_path):
+        return load_yaml(os.path.join(path, LEGACY_META_FILENAME))
+    with open(meta_path, "rb") as f:
+        return loads_manifest(f.read())
+
+
+def meta_path(path: str) -> Optional[str]:
+    """The path of the metadata written to the directory ``path``, or None if there
+    is none."""
+    for name in (META_FILENAME, LEGACY_META_FILENAME):
+        if os.path.exists(os.path.join(path, name)):
+            return os.path.join(path, name)
+    return None
+
+
 class MeerkatUnpickler(dill.Unpickler):
     def find_class(self, module, name):
         try:
@@ -0,0 +1,78 @@
+import os
+from pathlib import Path
+
+import pyarrow as pa
+
+from meerkat.columns.abstract import Column
+from meerkat.writers.abstract import AbstractWriter
+
+
+class ArrowWriter(AbstractWriter):
+    """Stream arrays into an Arrow IPC file, which is memory-mapped once
+    finalized.
+
+    The output is always an ``ArrowScalarColumn``, since other column types (e.g.
+    a ``PandasScalarColumn``) would read the whole file into memory.
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        output_type: type = None,
+        template: Column = None,
+        *args,
+        **kwargs,
+    ):
+        super(ArrowWriter, self).__init__(*args, **kwargs)
+
+        self.file = None
+        self.writer = None
+        self.schema = None
+        self.path = path
+        if path is not None:
+            self.open(path=path)
+
+        self.output_type = output_type
+        self.template = template
+
+    def open(self, path: str, *args, **kwargs) -> None:
+        # Make all dirs to path
+        os.makedirs(str(Path(path).absolute().parent), exist_ok=True)
+
+        self.file = pa.OSFile(path, "wb")
+        self.path = path
+        # the schema of the file is inferred from the first write
+        self.writer = None
+
+    def write(self, data, **kwargs) -> None:
+        if isinstance(data, Column):
+            data = data.data
+        if not isinstance(data, (pa.Array, pa.ChunkedArray)):
+            data = pa.array(data)
+
+        table = pa.table({"data": data})
+        if self.writer is None:
+            self.schema = table.schema
+            self.writer = pa.ipc.new_file(self.file, self.schema)
+        self.writer.write_table(table.cast(self.schema))
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self, *args, **kwargs) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        self.file.close()
+
+    def finalize(self, *args, **kwargs) -> Column:
+        from meerkat.columns.scalar.arrow import ArrowScalarColumn
+
+        self.close()
+        # the table references the memory-mapped file, so it isn't read into memory
+        data = pa.ipc.open_file(pa.memory_map(self.path)).read_all()["data"]
+        if isinstance(self.template, ArrowScalarColumn):
+            return self.template._clone(data=data)
+        output_type = self.output_type
+        if output_type is None or not issubclass(output_type, ArrowScalarColumn):
+            output_type = ArrowScalarColumn
+        return output_type(data)
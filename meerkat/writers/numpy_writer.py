@@ -57,6 +57,8 @@ class NumpyMemmapWriter(AbstractWriter):
         self.shape = shape
 
     def write(self, arr, **kwargs) -> None:
+        if isinstance(arr, Column):
+            arr = arr.data
         self.file[self._pointer : self._pointer + len(arr)] = arr
         self._pointer += len(arr)
 
@@ -69,13 +71,10 @@ class NumpyMemmapWriter(AbstractWriter):
 
     def finalize(self, *args, **kwargs) -> Column:
         self.flush()
-        data = self.file
+        # the output type converts the memmap, e.g. into a tensor sharing its memory
+        data = self.output_type(self.file)
         if self.template is not None:
-            if isinstance(data, Column):
-                data = data.data
-            data = self.template._clone(data=data)
-        else:
-            data = self.output_type(data)
+            data = self.template._clone(data=data.data)
 
         return data
 
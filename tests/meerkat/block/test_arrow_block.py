@@ -1,9 +1,12 @@
+import os
+
 import numpy as np
 import pyarrow as pa
 import pytest
 
+from meerkat.block import arrow_block
 from meerkat.block.abstract import BlockView
-from meerkat.block.arrow_block import ArrowBlock
+from meerkat.block.arrow_block import ArrowBlock, take_chunked
 from meerkat.block.ref import BlockRef
 from meerkat.columns.scalar.arrow import ArrowScalarColumn
 from meerkat.errors import ConsolidationError
@@ -97,3 +100,54 @@ def test_io(tmpdir):
 
     assert isinstance(block, ArrowBlock)
     assert block.data.equals(new_block.data)
+
+
+@pytest.mark.parametrize("mmap", [False, True])
+def test_io_rows(tmpdir, monkeypatch, mmap):
+    # write the table in record batches of 4 rows
+    monkeypatch.setattr(arrow_block, "RECORD_BATCH_NBYTES", 4 * 8)
+    table = pa.Table.from_pydict({"a": np.arange(10)})
+    path = os.path.join(tmpdir, "data.arrow")
+    ArrowBlock._write_table(path, table)
+
+    assert ArrowBlock._read_table(path, mmap=mmap).equals(table)
+    for rows in [slice(0, 10), slice(3, 9), slice(4, 8), slice(10, 10)]:
+        out = ArrowBlock._read_table(path, mmap=mmap, rows=rows)
+        assert out.equals(table.slice(rows.start, rows.stop - rows.start))
+    rows = np.array([9, 0, 5, 5, 1])
+    out = ArrowBlock._read_table(path, mmap=mmap, rows=rows)
+    assert out["a"].to_pylist() == [9, 0, 5, 5, 1]
+    # the offsets of the record batches are not part of the schema that's read
+    assert out.schema.metadata is None
+
+
+def test_io_stream(tmpdir):
+    # tables used to be written as IPC streams
+    table = pa.Table.from_pydict({"a": [1, 2, 3], "b": ["4", "5", "6"]})
+    path = os.path.join(tmpdir, "data.arrow")
+    with open(path, "wb") as f:
+        ArrowBlock._write_stream(f, table)
+
+    assert ArrowBlock._read_table(path).equals(table)
+    assert ArrowBlock._read_table(path, rows=slice(1, 3)).equals(table.slice(1, 2))
+    assert ArrowBlock._read_table(path, rows=np.array([2, 0]))["a"].to_pylist() == [
+        3,
+        1,
+    ]
+
+
+def test_take_chunked():
+    table = pa.concat_tables(
+        [pa.Table.from_pydict({"a": np.arange(i, i + 10)}) for i in (0, 10, 20)]
+    )
+    selection = np.array([1, 2, 15, 16, 29, 27])
+    out = take_chunked(table, selection)
+    assert out["a"].to_pylist() == list(selection)
+    # one chunk per run of rows in the same chunk
+    assert len(out.to_batches()) == 3
+
+    # selections that jump between chunks at every row are taken with `take`
+    selection = np.random.permutation(30)
+    out = take_chunked(table, selection)
+    assert out["a"].to_pylist() == list(selection)
+    assert take_chunked(table["a"], selection).to_pylist() == list(selection)
@@ -75,3 +75,40 @@ def test_consolidate_same_index():
 
     for i in range(len(block_views)):
         assert (block_ref[str(i)]().data == cols[i][str(i)]().data).all()
+
+
+@product_parametrize(params={"batched": [True, False]})
+def test_fuse(batched: bool):
+    inp = TensorColumn(np.arange(8))
+    first = inp.defer(lambda x: x + 1, is_batched_fn=batched)
+    second = first.defer(lambda x: x * 2, is_batched_fn=not batched)
+    third = DeferredColumn(
+        DeferredOp(
+            args=[second, inp],
+            kwargs={"z": first},
+            fn=lambda x, y, z: x - y + z,
+            is_batched_fn=False,
+            batch_size=1,
+        )
+    )
+
+    fused = third.data.fuse()
+    assert fused is not third.data
+    # the leaves of the fused op are the inputs that aren't deferred
+    assert len(fused.args) == 1 and fused.args[0] is inp
+
+    expected = (np.arange(8) + 1) * 2 - np.arange(8) + np.arange(8) + 1
+    assert (np.array(fused._get(np.arange(8))) == expected).all()
+    assert (third(batch_size=3).data == expected).all()
+
+
+def test_fuse_indexed_inputs():
+    inp = TensorColumn(np.arange(8))
+    first = inp.defer(lambda x: x + 1)
+    second = first.defer(lambda x: x * 2)
+
+    op = second.data
+    assert op.fuse({id(first): first._get(np.arange(8))}) is op
+    # nothing to fuse if none of the inputs are deferred
+    assert first.data.fuse() is first.data
+    assert (second().data == (np.arange(8) + 1) * 2).all()
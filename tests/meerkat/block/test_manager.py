@@ -6,8 +6,10 @@ import pytest
 import torch
 
 import meerkat as mk
+from meerkat.block import arrow_block, numpy_block
 from meerkat.block.manager import BlockManager
-from meerkat.tools.utils import load_yaml
+from meerkat.block.numpy_block import NumPyBlock
+from meerkat.tools.utils import dump_meta, dump_yaml, load_meta
 
 from ...utils import product_parametrize
 
@@ -138,6 +140,75 @@ def test_apply_get_multiple(num_blocks, consolidated):
                 ) == isinstance(slc, slice)
 
 
+@pytest.mark.parametrize("consolidated", [True, False])
+def test_apply_get_lazy_selection(consolidated):
+    mgr = BlockManager()
+    mgr.add_column(mk.TensorColumn(np.arange(10)), "np")
+    mgr.add_column(mk.TensorColumn(np.arange(10) * 2), "np2")
+    mgr.add_column(mk.PandasScalarColumn(np.arange(10) * 3), "pd")
+    mgr.add_column(mk.ArrowScalarColumn(np.arange(10) * 4), "arrow")
+    if consolidated:
+        mgr.consolidate()
+
+    expected = np.arange(10)
+    for index in [
+        np.array([True, False] * 5),
+        np.array([4, 0, 2, 3]),
+        slice(1, 4, 1),
+        np.array([-1, 0]),
+    ]:
+        mgr = mgr.apply(method_name="_get", index=index)
+        expected = expected[index]
+        # the rows are not gathered until the data of a column is accessed
+        for name in ["np", "pd", "arrow"]:
+            assert mgr[name]._block.selection is not None
+        assert mgr.nrows == len(expected)
+
+    assert (mgr["np"].data == expected).all()
+    assert (mgr["np2"].data == expected * 2).all()
+    assert (mgr["pd"].data == expected * 3).all()
+    assert (mgr["arrow"].to_numpy() == expected * 4).all()
+    assert mgr["np"]._block.selection is None
+
+    # single rows are read from the underlying data of the block
+    mgr = mgr.apply(method_name="_get", index=np.array([1, 0]))
+    assert mgr.apply(method_name="_get", index=0) == {
+        "np": expected[1],
+        "np2": expected[1] * 2,
+        "pd": expected[1] * 3,
+        "arrow": expected[1] * 4,
+    }
+
+
+@pytest.mark.parametrize("consolidated", [True, False])
+def test_apply_get_lazy_selection_write(consolidated):
+    mgr = BlockManager()
+    mgr.add_column(mk.TensorColumn(np.arange(10)), "np")
+    mgr.add_column(mk.TensorColumn(np.arange(10) * 2), "np2")
+    mgr.add_column(mk.PandasScalarColumn(np.arange(10) * 3), "pd")
+    if consolidated:
+        mgr.consolidate()
+
+    selected = mgr.apply(method_name="_get", index=np.array([0, 1, 2]))
+    chained = selected.apply(method_name="_get", index=np.array([0, 1]))
+    assert selected["np"]._block.selection is not None
+
+    # writing to the source gathers the rows of the lazy selections first
+    mgr["np"][0] = 99
+    mgr["pd"][0] = 99
+    # only the blocks selected from the written block are gathered
+    assert (selected["np2"]._block.selection is None) == consolidated
+    assert (selected["np"].data == [0, 1, 2]).all()
+    assert (selected["pd"].data == [0, 3, 6]).all()
+    assert (chained["np"].data == [0, 1]).all()
+    assert mgr["np"][0] == 99
+
+    # writing to a selection does not write to the source
+    selected = mgr.apply(method_name="_get", index=np.array([0, 1, 2]))
+    selected["np2"][1] = -1
+    assert mgr["np2"][1] == 2
+
+
 @pytest.mark.parametrize(
     "num_blocks, consolidated",
     product([1, 2, 3], [True, False]),
@@ -368,10 +439,10 @@ def test_io(tmpdir):
     col1 = mk.TensorColumn(data=np.arange(10) * 100)
     mgr.add_column(col1, "col1")
     mgr.remove("col9")
-    assert "col9" in load_yaml(os.path.join(tmpdir, "meta.yaml"))["columns"]
+    assert "col9" in load_meta(tmpdir)["columns"]
     mgr.write(tmpdir)
     # make sure the old column was removed
-    assert "col9" not in load_yaml(os.path.join(tmpdir, "meta.yaml"))["columns"]
+    assert "col9" not in load_meta(tmpdir)["columns"]
     new_mgr = BlockManager.read(tmpdir)
     assert len(new_mgr._block_refs) == 3
 
@@ -382,6 +453,334 @@ def test_io(tmpdir):
         assert mgr[f"col{idx}"].data == new_mgr[f"col{idx}"].data
 
 
+def test_io_streamed_consolidation(tmpdir):
+    mgr = BlockManager()
+    mgr.add_column(mk.TensorColumn(np.arange(10)), "b")
+    mgr.add_column(mk.ScalarColumn(np.arange(10) * 3), "c")
+    mgr.add_column(mk.TensorColumn(np.arange(10) * 2), "a")
+    blocks = {name: mgr.get_block_ref(name).block for name in mgr.keys()}
+
+    mgr.write(os.path.join(tmpdir, "test"))
+    # the blocks of the manager are not consolidated in memory
+    assert {name: mgr.get_block_ref(name).block for name in mgr.keys()} == blocks
+    assert list(mgr.keys()) == ["b", "c", "a"]
+
+    meta = load_meta(os.path.join(tmpdir, "test"))
+    assert list(meta["columns"]) == ["b", "c", "a"]
+
+    new_mgr = BlockManager.read(os.path.join(tmpdir, "test"))
+    assert list(new_mgr.keys()) == ["b", "c", "a"]
+    assert new_mgr.get_block_ref("a").block is new_mgr.get_block_ref("b").block
+    assert new_mgr.get_block_ref("a").block.data.shape == (10, 2)
+    for name in ["a", "b"]:
+        assert (mgr[name] == new_mgr[name]).all()
+
+
+def test_io_consolidated_block(tmpdir):
+    data_path = os.path.join(tmpdir, "data.npy")
+    np.save(data_path, np.stack([np.arange(10), np.arange(10) * 2], axis=1))
+    block = NumPyBlock(np.load(data_path, mmap_mode="r"))
+    assert block.is_mmap
+
+    mgr = BlockManager()
+    mgr.add_column(mk.TensorColumn(block[0]), "a")
+    mgr.add_column(mk.TensorColumn(block[1]), "b")
+    mgr.write(os.path.join(tmpdir, "test"))
+
+    # a block that is already consolidated is written as is, so an mmapped block is
+    # symlinked rather than copied
+    assert mgr.get_block_ref("a").block is block
+    meta = load_meta(os.path.join(tmpdir, "test"))
+    assert meta["columns"]["a"]["block"]["mmap"]
+    block_dir = os.path.join(tmpdir, "test", meta["columns"]["a"]["block"]["block_dir"])
+    assert os.path.islink(os.path.join(block_dir, "data.npy"))
+
+    new_mgr = BlockManager.read(os.path.join(tmpdir, "test"))
+    for name in ["a", "b"]:
+        assert (mgr[name] == new_mgr[name]).all()
+
+
+def test_io_object_dtype(tmpdir):
+    mgr = BlockManager()
+    mgr.add_column(mk.TensorColumn(np.array(["x", None] * 5, dtype=object)), "a")
+    mgr.add_column(mk.TensorColumn(np.array([1, "y"] * 5, dtype=object)), "b")
+    mgr.write(os.path.join(tmpdir, "test"))
+
+    new_mgr = BlockManager.read(os.path.join(tmpdir, "test"))
+    assert new_mgr.get_block_ref("a").block is new_mgr.get_block_ref("b").block
+    for name in ["a", "b"]:
+        assert list(mgr[name].data) == list(new_mgr[name].data)
+
+
+def test_io_legacy_yaml(tmpdir):
+    path = os.path.join(tmpdir, "test")
+    mgr = BlockManager()
+    mgr.add_column(mk.TensorColumn(np.arange(10)), "a")
+    mgr.add_column(mk.ObjectColumn(list(range(10))), "b")
+    mgr.write(path)
+
+    # rewrite the metadata as YAML, as written by earlier versions
+    for root, _, files in os.walk(path):
+        if "meta.json" in files:
+            dump_yaml(load_meta(root), os.path.join(root, "meta.yaml"), sort_keys=False)
+            os.remove(os.path.join(root, "meta.json"))
+
+    new_mgr = BlockManager.read(path)
+    assert (new_mgr["a"] == mgr["a"]).all()
+    assert new_mgr["b"].data == mgr["b"].data
+
+    # writing back replaces the YAML metadata
+    new_mgr.write(path)
+    assert os.path.exists(os.path.join(path, "meta.json"))
+    assert not os.path.exists(os.path.join(path, "meta.yaml"))
+    assert (BlockManager.read(path)["a"] == mgr["a"]).all()
+
+
+def _block_dirs(path):
+    meta = load_meta(path)
+    return {
+        name: col_meta["block"]["block_dir"]
+        for name, col_meta in meta["columns"].items()
+        if "block" in col_meta
+    }
+
+
+def test_io_incremental(tmpdir):
+    path = os.path.join(tmpdir, "test")
+    mgr = BlockManager()
+    mgr.add_column(mk.TensorColumn(np.arange(10)), "a")
+    mgr.add_column(mk.TensorColumn(np.arange(10) * 2), "b")
+    mgr.add_column(mk.ScalarColumn(np.arange(10) * 3), "c")
+    mgr.add_column(mk.ObjectColumn(list(range(10))), "d")
+    mgr.write(path)
+    block_dirs = _block_dirs(path)
+    stat = os.stat(os.path.join(path, block_dirs["a"], "data.npy"))
+
+    # adding a column only writes the new column
+    mgr.add_column(mk.TensorColumn(np.arange(10) * 4), "e")
+    mgr.write(path)
+    new_block_dirs = _block_dirs(path)
+    assert {name: new_block_dirs[name] for name in block_dirs} == block_dirs
+    assert new_block_dirs["e"] not in block_dirs.values()
+    new_stat = os.stat(os.path.join(path, block_dirs["a"], "data.npy"))
+    assert (new_stat.st_ino, new_stat.st_mtime_ns) == (stat.st_ino, stat.st_mtime_ns)
+    assert not os.path.exists(os.path.join(path, "meta.json.tmp"))
+
+    # writing to a column rewrites its block
+    mgr["c"][0] = 100
+    mgr.write(path)
+    block_dirs, new_block_dirs = new_block_dirs, _block_dirs(path)
+    assert new_block_dirs["c"] != block_dirs["c"]
+    assert new_block_dirs["a"] == block_dirs["a"]
+
+    # removing a column rewrites the columns that were written with it, and the
+    # blocks that are no longer referenced are removed
+    mgr.remove("b")
+    mgr.write(path)
+    block_dirs, new_block_dirs = new_block_dirs, _block_dirs(path)
+    assert new_block_dirs["a"] != block_dirs["a"]
+    assert new_block_dirs["e"] == block_dirs["e"]
+    assert sorted(os.listdir(os.path.join(path, "blocks"))) == sorted(
+        {os.path.basename(block_dir) for block_dir in new_block_dirs.values()}
+    )
+
+    new_mgr = BlockManager.read(path)
+    assert list(new_mgr.keys()) == ["a", "c", "d", "e"]
+    for name in ["a", "c", "e"]:
+        assert (mgr[name] == new_mgr[name]).all()
+    assert new_mgr["c"][0] == 100
+    assert new_mgr["d"].data == mgr["d"].data
+
+
+@pytest.mark.parametrize("mmap", [False, True])
+def test_io_incremental_read(tmpdir, mmap):
+    path = os.path.join(tmpdir, "test")
+    mgr = BlockManager()
+    mgr.add_column(mk.TensorColumn(np.arange(10)), "a")
+    mgr.add_column(mk.TensorColumn(np.arange(10) * 2), "b")
+    mgr.add_column(mk.ArrowScalarColumn(np.arange(10) * 3), "c")
+    mgr.add_column(mk.TensorColumn(np.arange(10)).defer(lambda x: x + 1), "d")
+    mgr.write(path)
+    if mmap:
+        meta = load_meta(path)
+        meta["columns"]["a"]["block"]["mmap"] = meta["columns"]["b"]["block"][
+            "mmap"
+        ] = True
+        dump_meta(meta, path)
+    block_dirs = _block_dirs(path)
+
+    # the blocks that were read are not written again
+    new_mgr = BlockManager.read(path)
+    new_mgr.add_column(mk.TensorColumn(np.arange(10) * 4), "e")
+    new_mgr.write(path)
+    new_block_dirs = _block_dirs(path)
+    for name in ["a", "b", "c"]:
+        assert new_block_dirs[name] == block_dirs[name]
+    assert load_meta(path)["columns"]["a"]["block"]["mmap"] == (mmap)
+
+    # but are written if they are read from another path
+    other_path = os.path.join(tmpdir, "other")
+    new_mgr.write(other_path)
+    other_block_dirs = _block_dirs(other_path)
+    assert os.path.exists(os.path.join(other_path, other_block_dirs["a"], "meta.json"))
+    assert (BlockManager.read(other_path)["a"] == mgr["a"]).all()
+
+    new_mgr = BlockManager.read(path)
+    assert list(new_mgr.keys()) == ["a", "b", "c", "d", "e"]
+    for name in ["a", "b"]:
+        assert (mgr[name] == new_mgr[name]).all()
+    assert (new_mgr["d"]() == np.arange(10) + 1).all()
+    assert (new_mgr["e"] == np.arange(10) * 4).all()
+
+
+@pytest.mark.parametrize("read", [False, True])
+def test_io_incremental_inplace(tmpdir, read):
+    path = os.path.join(tmpdir, "test")
+    mgr = BlockManager()
+    mgr.add_column(mk.TensorColumn(np.arange(10)), "a")
+    mgr.add_column(mk.PandasScalarColumn(np.arange(10)), "b")
+    mgr.add_column(mk.TensorColumn(torch.arange(10)), "c")
+    mgr.add_column(mk.TensorColumn(np.arange(10) * 2), "d")
+    mgr.write(path)
+    block_dirs = _block_dirs(path)
+    if read:
+        mgr = BlockManager.read(path)
+
+    # changes made in place through the data of the columns don't bump their
+    # version, but are still written
+    mgr["a"].data[0] = 42
+    mgr["b"].data.iloc[1] = 43
+    np.add(mgr["d"].data, 1, out=mgr["d"].data)
+    mgr["c"].data[2] = 44
+    mgr.write(path)
+
+    new_mgr = BlockManager.read(path)
+    assert new_mgr["a"][0] == 42
+    assert new_mgr["b"][1] == 43
+    assert new_mgr["c"][2] == 44
+    assert (new_mgr["d"] == np.arange(10) * 2 + 1).all()
+    new_block_dirs = _block_dirs(path)
+    assert all(new_block_dirs[name] != block_dirs[name] for name in "abcd")
+
+    # blocks that weren't changed are still kept
+    new_mgr.write(path)
+    assert _block_dirs(path) == new_block_dirs
+
+
+@pytest.mark.parametrize("mmap", [None, False])
+def test_io_lazy(tmpdir, mmap):
+    path = os.path.join(tmpdir, "test")
+    mgr = BlockManager()
+    mgr.add_column(mk.TensorColumn(np.arange(10)), "a")
+    mgr.add_column(mk.TensorColumn(np.arange(10) * 2), "b")
+    mgr.add_column(mk.PandasScalarColumn(np.arange(10) * 3), "c")
+    mgr.add_column(mk.ArrowScalarColumn(np.arange(10) * 4), "d")
+    mgr.add_column(mk.TensorColumn(torch.arange(10) * 5), "e")
+    mgr.add_column(mgr["a"].defer(lambda x: x + 1), "f")
+    mgr.add_column(mk.TensorColumn(np.array(["x"] * 10, dtype=object)), "g")
+    mgr.write(path)
+
+    new_mgr = BlockManager.read(path, lazy=True, mmap=mmap)
+    blocks = {name: new_mgr.get_block_ref(name).block for name in "abcd"}
+    # the number of rows is known without reading any blocks
+    assert new_mgr.nrows == 10
+    assert all(block.is_pending for block in blocks.values())
+
+    # the blocks are read when a column in them is first accessed
+    assert (new_mgr["c"].data == np.arange(10) * 3).all()
+    assert not blocks["c"].is_pending
+    assert blocks["a"].is_pending and blocks["d"].is_pending
+    # deferred columns only read the rows of their inputs in each batch
+    assert (new_mgr["f"]() == np.arange(10) + 1).all()
+    assert blocks["a"].is_pending
+
+    # NumPy blocks are memory-mapped by default
+    assert isinstance(new_mgr["a"].data, np.memmap) == (mmap is None)
+    # object arrays are read into memory
+    assert list(new_mgr["g"].data) == ["x"] * 10
+    for name in "abcde":
+        assert (mgr[name] == new_mgr[name]).all()
+
+
+@pytest.mark.parametrize("compression", ["zstd", "lz4"])
+def test_io_compression(tmpdir, compression, monkeypatch):
+    # write NumPy blocks in chunks of 3 rows
+    monkeypatch.setattr(numpy_block, "CHUNK_NBYTES", 3 * 2 * 8)
+    path = os.path.join(tmpdir, "test")
+    mgr = BlockManager()
+    mgr.add_column(mk.TensorColumn(np.arange(10)), "a")
+    mgr.add_column(mk.TensorColumn(np.arange(10) * 2), "b")
+    mgr.add_column(mk.PandasScalarColumn(np.arange(10) * 3), "c")
+    mgr.add_column(mk.ArrowScalarColumn(np.arange(10) * 4), "d")
+    mgr.add_column(mk.TensorColumn(np.array(["x"] * 10, dtype=object)), "e")
+    mgr.write(path, compression=compression)
+    block_dirs = _block_dirs(path)
+    assert os.path.exists(os.path.join(path, block_dirs["a"], "data.npc"))
+    assert load_meta(path)["columns"]["a"]["block"]["compression"] == compression
+
+    new_mgr = BlockManager.read(path)
+    for name in "abcde":
+        assert list(mgr[name]) == list(new_mgr[name])
+
+    # a range of rows of a lazily read block only reads the chunks holding them
+    new_mgr = BlockManager.read(path, lazy=True)
+    rows = new_mgr.apply(method_name="_get", index=slice(4, 8))
+    assert new_mgr.get_block_ref("a").block.is_pending
+    assert (rows["a"].data == np.arange(4, 8)).all()
+    assert (rows["b"].data == np.arange(4, 8) * 2).all()
+    assert new_mgr["a"][9] == 9
+
+    # blocks are rewritten when the compression changes
+    new_mgr.write(path)
+    new_block_dirs = _block_dirs(path)
+    assert new_block_dirs["a"] != block_dirs["a"]
+    assert os.path.exists(os.path.join(path, new_block_dirs["a"], "data.npy"))
+    assert (BlockManager.read(path)["a"] == mgr["a"]).all()
+
+
+@pytest.mark.parametrize("compression", [None, "zstd"])
+def test_io_rows(tmpdir, compression, monkeypatch):
+    # write NumPy blocks in chunks and Arrow blocks in record batches of 3 rows
+    monkeypatch.setattr(numpy_block, "CHUNK_NBYTES", 3 * 2 * 8)
+    monkeypatch.setattr(arrow_block, "RECORD_BATCH_NBYTES", 3 * 8)
+    path = os.path.join(tmpdir, "test")
+    mgr = BlockManager()
+    mgr.add_column(mk.TensorColumn(np.arange(10)), "a")
+    mgr.add_column(mk.TensorColumn(np.arange(10) * 2), "b")
+    mgr.add_column(mk.ArrowScalarColumn(np.arange(10) * 3), "c")
+    mgr.write(path, compression=compression)
+
+    new_mgr = BlockManager.read(path, lazy=True)
+    blocks = {name: new_mgr.get_block_ref(name).block for name in "ac"}
+    indices = [
+        slice(4, 8),
+        np.array([9, 1, -2, 1]),
+        np.arange(10) % 3 == 0,
+    ]
+    for index in indices:
+        rows = new_mgr.apply(method_name="_get", index=index)
+        expected = np.arange(10)[index]
+        # the rows are only read once they're accessed
+        assert rows.get_block_ref("a").block.is_pending
+        assert (rows["a"].data == expected).all()
+        assert (rows["b"].data == expected * 2).all()
+        assert rows["c"].data.to_pylist() == list(expected * 3)
+
+        # indexing a column of a block that has yet to be read only reads its rows
+        assert (new_mgr["a"][index].data == expected).all()
+        assert new_mgr["c"][index].data.to_pylist() == list(expected * 3)
+
+    # rows of rows are read by composing the indices
+    rows = new_mgr.apply(method_name="_get", index=slice(2, 9))
+    rows = rows.apply(method_name="_get", index=np.array([0, 6, 3]))
+    assert (rows["a"].data == [2, 8, 5]).all()
+    assert rows["c"].data.to_pylist() == [6, 24, 15]
+    assert all(block.is_pending for block in blocks.values())
+
+    with pytest.raises(IndexError):
+        new_mgr.apply(method_name="_get", index=np.array([10]))
+
+
 def test_io_no_overwrite(tmpdir):
     new_dir = os.path.join(tmpdir, "test")
     os.mkdir(new_dir)
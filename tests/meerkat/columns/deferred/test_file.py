@@ -128,43 +128,159 @@ def test_change_base_dir(testbed):
     assert (col[[1, 3, 5]]().values == testbed.get_data([1, 3, 5])).all()
 
 
-def test_downloader(monkeypatch, tmpdir):
-    import urllib
+@pytest.fixture
+def http_server():
+    """A local HTTP server that serves a small image at every path, and records
+    the paths it's asked for and the connections they're asked on."""
+    import io
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    buffer = io.BytesIO()
+    Image.fromarray(np.ones((4, 4, 3)).astype(np.uint8)).save(buffer, format="PNG")
+    body = buffer.getvalue()
+    requests = []
+    connections = set()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            requests.append(self.path)
+            connections.add(self.client_address)
+            if self.path.startswith("/missing"):
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    server.requests = requests
+    server.connections = connections
+    server.body = body
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_downloader(http_server, tmpdir):
+    downloader = FileLoader(
+        loader=Image.open, downloader="url", cache_dir=os.path.join(tmpdir, "cache")
+    )
 
-    ims = []
+    out = downloader(f"{http_server.url}/dir/2.png")
+    assert np.array(out).shape == (4, 4, 3)
+    path = downloader._download_cache().path(f"{http_server.url}/dir/2.png")
+    assert os.path.exists(path) and path.endswith(".png")
 
-    def patched_urlretrieve(url, filename):
-        img_array = np.ones((4, 4, 3)).astype(np.uint8)
-        im = Image.fromarray(img_array)
-        ims.append(im)
-        im.save(filename)
+    out = downloader(f"{http_server.url}/dir/2.png")
+    assert http_server.requests == ["/dir/2.png"]
+
+    out = downloader(f"{http_server.url}/dir/3.png")
+    assert http_server.requests == ["/dir/2.png", "/dir/3.png"]
 
-    monkeypatch.setattr(urllib.request, "urlretrieve", patched_urlretrieve)
+    info = downloader.cache_info()
+    assert (info.hits, info.misses, info.length) == (1, 2, 2)
+    assert info.bytes_fetched == 2 * len(http_server.body)
+
+
+def test_downloader_callable(tmpdir):
+    uris = []
+
+    def download(uri, dst):
+        uris.append(uri)
+        Image.fromarray(np.ones((4, 4, 3)).astype(np.uint8)).save(dst, format="PNG")
 
     downloader = FileLoader(
-        loader=Image.open, downloader="url", cache_dir=os.path.join(tmpdir, "cache")
+        loader=Image.open, downloader=download, cache_dir=os.path.join(tmpdir, "cache")
+    )
+    out = downloader("https://test.com/dir/2.png")
+    assert np.array(out).shape == (4, 4, 3)
+    assert os.path.exists(
+        downloader._download_cache().path("https://test.com/dir/2.png")
     )
 
-    out = downloader("https://test.com/dir/2.jpg")
+    downloader("https://test.com/dir/2.png")
+    downloader("https://test.com/dir/3.png")
+    assert uris == ["https://test.com/dir/2.png", "https://test.com/dir/3.png"]
 
-    assert os.path.exists(os.path.join(tmpdir, "cache", "test.com/dir/2.jpg"))
-    assert (np.array(out) == np.array(ims[0])).all()
 
-    out = downloader("https://test.com/dir/2.jpg")
-    assert len(ims) == 1
+def test_downloader_legacy_cache(http_server, tmpdir):
+    cache_dir = os.path.join(tmpdir, "cache")
+    downloader = FileLoader(loader=Image.open, downloader="url", cache_dir=cache_dir)
+
+    # files used to be cached at their netloc and path, and are still found there
+    netloc = http_server.url.split("://")[1]
+    os.makedirs(os.path.join(cache_dir, netloc, "dir"))
+    Image.fromarray(np.zeros((2, 2, 3)).astype(np.uint8)).save(
+        os.path.join(cache_dir, netloc, "dir", "2.png")
+    )
+    out = downloader(f"{http_server.url}/dir/2.png")
+    assert np.array(out).shape == (2, 2, 3)
+    assert http_server.requests == []
+
+
+def test_downloader_no_cache(http_server):
+    downloader = FileLoader(loader=Image.open, downloader="url")
+    out = downloader(f"{http_server.url}/dir/2.png")
+    assert np.array(out).shape == (4, 4, 3)
+    assert downloader.cache_info() is None
+
+
+def test_downloader_cache_size(http_server, tmpdir):
+    size = len(http_server.body)
+    downloader = FileLoader(
+        loader=Image.open,
+        downloader="url",
+        cache_dir=os.path.join(tmpdir, "cache"),
+        cache_size=2 * size,
+    )
+    for name in ["1", "2", "1", "3"]:
+        downloader(f"{http_server.url}/{name}.png")
+    info = downloader.cache_info()
+    assert info.length == 2 and info.size == 2 * size
+
+    # "2" was the least recently used, so it was evicted
+    downloader(f"{http_server.url}/1.png")
+    downloader(f"{http_server.url}/2.png")
+    assert http_server.requests == ["/1.png", "/2.png", "/3.png", "/2.png"]
 
-    out = downloader("https://test.com/dir/3.jpg")
-    assert len(ims) == 2
 
+def test_prefetch(http_server, tmpdir):
+    urls = [f"{http_server.url}/{i % 8}.png" for i in range(16)]
+    col = FileColumn(urls, type="image", cache_dir=os.path.join(tmpdir, "cache"))
 
-def test_fallback_download(monkeypatch, tmpdir):
-    import urllib
+    col.prefetch(slice(0, 4))
+    assert sorted(http_server.requests) == [f"/{i}.png" for i in range(4)]
 
-    def patched_urlretrieve(url, filename):
-        raise urllib.error.HTTPError(url, 404, "Not found", None, None)
+    # materializing a batch downloads its files concurrently, each one once
+    out = col[4:16](batch_size=12)
+    assert len(out) == 12
+    assert sorted(http_server.requests) == [f"/{i}.png" for i in range(8)]
+    assert col.data.fn.cache_info().misses == 8
+
+
+def test_prefetch_reuses_connections(http_server, tmpdir):
+    urls = [f"{http_server.url}/{i}.png" for i in range(16)]
+    loader = FileLoader(
+        loader=Image.open, downloader="url", cache_dir=os.path.join(tmpdir, "cache")
+    )
+    for start in range(0, 16, 4):
+        loader.prefetch(urls[start : start + 4], num_workers=4)
+    assert len(http_server.requests) == 16
+    # the connections of the first batch are kept alive for the next ones
+    assert len(http_server.connections) <= 4
 
-    monkeypatch.setattr(urllib.request, "urlretrieve", patched_urlretrieve)
 
+def test_fallback_download(http_server, tmpdir):
     ims = []
 
     def fallback(filename):
@@ -180,16 +296,18 @@ def test_fallback_download(monkeypatch, tmpdir):
         cache_dir=os.path.join(tmpdir, "cache"),
     )
     with pytest.warns(UserWarning):
-        out = downloader("https://test.com/dir/2.jpg")
+        out = downloader(f"{http_server.url}/missing/2.jpg")
 
-    assert os.path.exists(os.path.join(tmpdir, "cache", "test.com/dir/2.jpg"))
     assert (np.array(out) == np.array(ims[0])).all()
+    # the fallback data is cached in place of the file
+    path = downloader._download_cache().path(f"{http_server.url}/missing/2.jpg")
+    assert os.path.exists(path)
 
-    out = downloader("https://test.com/dir/2.jpg")
+    out = downloader(f"{http_server.url}/missing/2.jpg")
     assert len(ims) == 1
 
     with pytest.warns(UserWarning):
-        out = downloader("https://test.com/dir/3.jpg")
+        out = downloader(f"{http_server.url}/missing/3.jpg")
     assert len(ims) == 2
 
 
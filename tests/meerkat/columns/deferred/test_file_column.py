@@ -178,71 +178,6 @@ def test_file_types(file_type: str, tmpdir):
     col.formatters["base"].encode(col[0])
 
 
-def test_downloader(monkeypatch, tmpdir):
-    import urllib
-
-    ims = []
-
-    def patched_urlretrieve(url, filename):
-        img_array = np.ones((4, 4, 3)).astype(np.uint8)
-        im = Image.fromarray(img_array)
-        ims.append(im)
-        im.save(filename)
-
-    monkeypatch.setattr(urllib.request, "urlretrieve", patched_urlretrieve)
-
-    downloader = FileLoader(
-        loader=Image.open, downloader="url", cache_dir=os.path.join(tmpdir, "cache")
-    )
-
-    out = downloader("https://test.com/dir/2.jpg")
-
-    assert os.path.exists(os.path.join(tmpdir, "cache", "test.com/dir/2.jpg"))
-    assert (np.array(out) == np.array(ims[0])).all()
-
-    out = downloader("https://test.com/dir/2.jpg")
-    assert len(ims) == 1
-
-    out = downloader("https://test.com/dir/3.jpg")
-    assert len(ims) == 2
-
-
-def test_fallback_download(monkeypatch, tmpdir):
-    import urllib
-
-    def patched_urlretrieve(url, filename):
-        raise urllib.error.HTTPError(url, 404, "Not found", None, None)
-
-    monkeypatch.setattr(urllib.request, "urlretrieve", patched_urlretrieve)
-
-    ims = []
-
-    def fallback(filename):
-        img_array = np.ones((4, 4, 3)).astype(np.uint8)
-        im = Image.fromarray(img_array)
-        ims.append(im)
-        im.save(filename)
-
-    downloader = FileLoader(
-        loader=Image.open,
-        downloader="url",
-        fallback_downloader=fallback,
-        cache_dir=os.path.join(tmpdir, "cache"),
-    )
-    with pytest.warns(UserWarning):
-        out = downloader("https://test.com/dir/2.jpg")
-
-    assert os.path.exists(os.path.join(tmpdir, "cache", "test.com/dir/2.jpg"))
-    assert (np.array(out) == np.array(ims[0])).all()
-
-    out = downloader("https://test.com/dir/2.jpg")
-    assert len(ims) == 1
-
-    with pytest.warns(UserWarning):
-        out = downloader("https://test.com/dir/3.jpg")
-    assert len(ims) == 2
-
-
 def test_serialize_downloader(tmpdir):
     downloader = FileLoader(
         loader=Image.open,
@@ -169,3 +169,20 @@ def test_to_pandas(testbed):
 def test_repr_pandas(testbed):
     series = testbed.col.to_pandas()
     assert isinstance(series, pd.Series)
+
+
+def test_concat_chunked():
+    cols = [ArrowScalarColumn([f"s{i}" for i in range(j, j + 10)]) for j in (0, 10, 20)]
+    out = ArrowScalarColumn.concat(cols)
+    # the arrays of the columns are appended as chunks, rather than copied
+    assert isinstance(out.data, pa.ChunkedArray)
+    assert out.data.num_chunks == 3
+
+    # indexing gathers the rows from each chunk without combining them
+    index = np.array([3, 4, 12, 29, 28])
+    assert out[index].data.to_pylist() == [f"s{i}" for i in index]
+    assert out[index].data.num_chunks == 3
+    assert out[np.arange(30) % 2 == 0].data.to_pylist() == [
+        f"s{i}" for i in range(0, 30, 2)
+    ]
+    assert out[5:25].data.num_chunks == 3
@@ -120,3 +120,62 @@ def test_embed_text(simple_encoder):
         simple_text_transform(df["text"][0]).to(torch.float32).mean()
         == df["_simple_encoder(text)"][0].mean()
     )
+
+
+@pytest.mark.parametrize("mmap", [False, True])
+def test_embed_num_workers(tmpdir: str, mmap: bool):
+    import threading
+
+    image_testbed = ImageColumnTestBed(tmpdir=tmpdir)
+    calls = []
+
+    def encode(batch: torch.Tensor):
+        calls.append((threading.get_ident(), torch.is_grad_enabled()))
+        return simple_encode(batch)
+
+    out = embed(
+        data=image_testbed.col,
+        encoder=Encoder(encode=encode, preprocess=simple_image_transform),
+        modality="image",
+        batch_size=4,
+        num_workers=2,
+        mmap_dir=os.path.join(tmpdir, "mmap") if mmap else None,
+    )
+
+    # the encoder is called on the calling thread, without gradients
+    assert calls == [(threading.get_ident(), False)] * 4
+    assert len(out) == 16
+    for idx in range(16):
+        assert (
+            simple_image_transform(image_testbed.col[idx]()).mean() == out[idx].mean()
+        )
+
+
+def test_embed_num_workers_auto(tmpdir: str, monkeypatch):
+    import time
+
+    from meerkat.ops.map import _BatchSizeTuner
+
+    image_testbed = ImageColumnTestBed(tmpdir=tmpdir)
+    update, timings = _BatchSizeTuner.update, []
+
+    def _update(self, batch_size: int, elapsed: float, memory: int):
+        timings.append(elapsed)
+        return update(self, batch_size, elapsed=elapsed, memory=memory)
+
+    monkeypatch.setattr(_BatchSizeTuner, "update", _update)
+
+    def encode(batch: torch.Tensor):
+        time.sleep(0.05)
+        return simple_encode(batch)
+
+    out = embed(
+        data=image_testbed.col,
+        encoder=Encoder(encode=encode, preprocess=simple_image_transform),
+        modality="image",
+        batch_size="auto",
+        num_workers=2,
+    )
+    assert len(out) == 16
+    # the encoder is timed along with loading the batches
+    assert timings and all(elapsed >= 0.05 for elapsed in timings)
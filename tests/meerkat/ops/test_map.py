@@ -1,6 +1,17 @@
+import os
+import time
+
+import numpy as np
 import pytest
 
-from meerkat import DeferredColumn
+from meerkat import (
+    ArrowScalarColumn,
+    DeferredColumn,
+    NumPyTensorColumn,
+    ObjectColumn,
+    PandasScalarColumn,
+    TorchTensorColumn,
+)
 from meerkat.dataframe import DataFrame
 
 from ...utils import product_parametrize
@@ -142,3 +153,282 @@ def test_map_return_multiple(
     assert isinstance(result, DataFrame)
     for key, map_spec in map_specs.items():
         assert result[key].is_equal(map_spec["expected_result"])
+
+
+@product_parametrize(
+    params={
+        "batched": [True, False],
+        "materialize": [True, False],
+        "executor": ["process", "thread"],
+    }
+)
+def test_map_executor(
+    column_testbed: AbstractColumnTestBed,
+    batched: bool,
+    materialize: bool,
+    executor: str,
+):
+    """`map`, sharded across a local executor."""
+    if not (isinstance(column_testbed.col, DeferredColumn) or materialize):
+        # skip columns for which materialize has no effect
+        return
+
+    col = column_testbed.col
+
+    map_spec = column_testbed.get_map_spec(batched=batched, materialize=materialize)
+
+    def func(x):
+        out = map_spec["fn"](x)
+        return out
+
+    result = col.map(
+        func,
+        batch_size=3,
+        is_batched_fn=batched,
+        materialize=materialize,
+        output_type=map_spec.get("output_type", None),
+        executor=executor,
+        num_workers=2,
+    )
+    assert result.is_equal(map_spec["expected_result"])
+
+
+def test_map_executor_dataframe():
+    df = DataFrame({"a": np.arange(20), "b": np.arange(20) * 2})
+
+    result = df.map(
+        lambda a, b: {"sum": a + b, "diff": b - a}, num_workers=2, batch_size=3
+    )
+    assert isinstance(result, DataFrame)
+    assert (result["sum"] == np.arange(20) * 3).all()
+    assert (result["diff"] == np.arange(20)).all()
+
+
+def test_materialize_executor_invalid():
+    col = DataFrame({"a": np.arange(4)})["a"].defer(lambda x: x + 1)
+    with pytest.raises(ValueError, match="Unsupported executor"):
+        col(executor="fiber")
+
+
+def test_materialize_thread_executor_order():
+    delays = np.random.RandomState(0).rand(16) * 0.01
+
+    def fn(delay):
+        time.sleep(delay)
+        return delay
+
+    col = DataFrame({"a": delays})["a"].defer(fn)
+    result = col(executor="thread", num_workers=4, prefetch=2, batch_size=3)
+    assert (result.to_numpy() == delays).all()
+
+
+@pytest.mark.parametrize("executor", [None, "thread"])
+def test_map_out(tmpdir, monkeypatch, executor: str):
+    import meerkat.ops.map
+
+    # flush after every batch
+    monkeypatch.setattr(meerkat.ops.map, "_FLUSH_SIZE", 1)
+    df = DataFrame({"a": np.arange(20)})
+
+    result = df.map(
+        lambda a: {"emb": np.ones(4) * a, "name": str(a)},
+        batch_size=3,
+        out=str(tmpdir),
+        executor=executor,
+        num_workers=2 if executor else 0,
+    )
+    assert isinstance(result, DataFrame)
+    assert isinstance(result["emb"].data, np.memmap)
+    assert (result["emb"].data == np.arange(20)[:, None]).all()
+    assert result["name"].to_pandas().tolist() == [str(a) for a in range(20)]
+    assert os.path.exists(os.path.join(tmpdir, "emb"))
+
+
+def test_materialize_out(tmpdir):
+    col = DataFrame({"a": np.arange(10)})["a"].defer(
+        lambda a: a * 2, is_batched_fn=True
+    )
+    result = col(batch_size=4, out=str(tmpdir))
+    # the output has the same type as without `out`
+    assert isinstance(result, PandasScalarColumn)
+    assert result.to_pandas().tolist() == list(np.arange(10) * 2)
+
+    # and is memory-mapped, rather than read into memory
+    mmap = np.load(os.path.join(tmpdir, "data"), mmap_mode="r+")
+    mmap[0] = -1
+    mmap.flush()
+    assert result[0] == -1
+
+
+def test_materialize_out_str(tmpdir):
+    col = PandasScalarColumn([str(i) for i in range(10)]).defer(
+        lambda a: a.data + "!", is_batched_fn=True
+    )
+    result = col(batch_size=4, out=str(tmpdir))
+    # pandas can't memory-map strings, so they're returned in a memory-mapped
+    # arrow column
+    assert isinstance(result, ArrowScalarColumn)
+    assert result.to_pandas().tolist() == [f"{i}!" for i in range(10)]
+
+
+@pytest.mark.parametrize(
+    "column_type",
+    [PandasScalarColumn, ArrowScalarColumn, NumPyTensorColumn, TorchTensorColumn],
+)
+def test_materialize_out_type(tmpdir, column_type):
+    col = column_type(np.arange(10)).defer(lambda a: a * 2, is_batched_fn=True)
+    expected = col(batch_size=4)
+    result = col(batch_size=4, out=str(tmpdir))
+    assert type(result) is type(expected)
+    assert list(result.to_numpy()) == list(expected.to_numpy())
+
+
+def test_map_out_object(tmpdir):
+    df = DataFrame({"a": np.arange(10)})
+    result = df.map(
+        lambda a: {"obj": {"a": a}, "emb": np.ones(2) * a},
+        batch_size=3,
+        out=str(tmpdir),
+    )
+    # outputs that can't be memory-mapped are concatenated in memory instead
+    assert isinstance(result["obj"], ObjectColumn)
+    assert list(result["obj"]) == [{"a": a} for a in range(10)]
+    assert isinstance(result["emb"].data, np.memmap)
+
+
+def test_map_checkpoint(tmpdir):
+    checkpoint = os.path.join(tmpdir, "checkpoint")
+    calls_path = os.path.join(tmpdir, "calls")
+    df = DataFrame({"a": np.arange(20)})
+
+    def fn(a):
+        with open(calls_path, "a") as f:
+            f.write(f"{a}\n")
+        if a == 13 and not os.path.exists(os.path.join(tmpdir, "fixed")):
+            raise RuntimeError("interrupted")
+        return {"double": a * 2, "name": str(a)}
+
+    def computed_rows():
+        with open(calls_path) as f:
+            rows = {int(line) for line in f}
+        os.remove(calls_path)
+        return rows
+
+    with pytest.raises(RuntimeError, match="interrupted"):
+        df.map(fn, batch_size=4, checkpoint=checkpoint)
+    assert computed_rows() == set(range(14))
+    assert os.path.exists(os.path.join(checkpoint, "meta.json"))
+
+    open(os.path.join(tmpdir, "fixed"), "w").close()
+    result = df.map(fn, batch_size=4, checkpoint=checkpoint)
+    # resumes from the first incomplete batch, `map` also calls the function on the
+    # first row to infer its outputs
+    assert computed_rows() == {0, *range(12, 20)}
+    assert (result["double"] == np.arange(20) * 2).all()
+    assert list(result["name"]) == [str(a) for a in range(20)]
+
+    # a completed checkpoint is reused entirely
+    result = df.map(fn, batch_size=4, checkpoint=checkpoint)
+    assert computed_rows() == {0}
+    assert (result["double"] == np.arange(20) * 2).all()
+
+    # changing the batch size invalidates the checkpoint
+    df.map(fn, batch_size=5, checkpoint=checkpoint)
+    assert computed_rows() == set(range(20))
+
+
+@pytest.mark.parametrize("executor", [None, "thread"])
+def test_map_auto_batch_size(executor: str):
+    df = DataFrame({"a": np.arange(1000)})
+    batch_sizes = []
+
+    def fn(a):
+        batch_sizes.append(len(a))
+        # a fixed overhead per call, so larger batches have higher throughput
+        time.sleep(0.005)
+        return a * 2
+
+    result = df.map(fn, is_batched_fn=True, batch_size="auto", executor=executor)
+    assert (result == np.arange(1000) * 2).all()
+    # tuning starts from small batches and grows them
+    assert 8 in batch_sizes
+    assert max(batch_sizes) > 8
+
+
+def test_batch_size_tuner():
+    from meerkat.ops.map import _BatchSizeTuner
+
+    tuner = _BatchSizeTuner(batch_size=8, memory_budget=1000)
+    tuner.update(8, elapsed=1.0, memory=80)
+    assert tuner.batch_size == 16 and not tuner.done
+    # throughput stops improving, so it settles on the fastest batch size
+    tuner.update(16, elapsed=2.0, memory=160)
+    assert tuner.batch_size == 8 and tuner.done
+
+    # the batch size is capped by the memory budget
+    tuner = _BatchSizeTuner(batch_size=8, memory_budget=1000)
+    tuner.update(8, elapsed=1.0, memory=800)
+    assert tuner.batch_size == 10 and not tuner.done
+    tuner.update(10, elapsed=0.5, memory=1000)
+    assert tuner.batch_size == 10 and tuner.done
+
+    # and shrinks if a batch exceeds it
+    tuner = _BatchSizeTuner(batch_size=8, memory_budget=1000)
+    tuner.update(8, elapsed=1.0, memory=4000)
+    assert tuner.batch_size == 2 and tuner.done
+
+
+def test_materialize_batch_size_invalid():
+    col = DataFrame({"a": np.arange(4)})["a"].defer(lambda x: x + 1)
+    with pytest.raises(ValueError, match="Unsupported batch size"):
+        col(batch_size="large")
+
+
+class _StubServer:
+    """Simulates a latency-bound remote API, tracking the concurrent requests."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.start_times = []
+
+    async def __call__(self, a):
+        import asyncio
+
+        self.start_times.append(time.monotonic())
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        # later rows respond faster, results must still be assembled in order
+        await asyncio.sleep(self.latency * (1 - a / 100))
+        self.in_flight -= 1
+        return a * 2
+
+
+@pytest.mark.parametrize("executor", [None, "async"])
+def test_map_async(executor: str):
+    server = _StubServer(latency=0.05)
+    df = DataFrame({"a": np.arange(40)})
+
+    result = df["a"].map(
+        server,
+        batch_size=4,
+        executor=executor,
+        num_workers=8 if executor else 0,
+    )
+    assert (result == np.arange(40) * 2).all()
+    if executor is None:
+        # only the calls within a batch overlap
+        assert server.max_in_flight == 4
+    else:
+        assert server.max_in_flight == 8
+
+
+def test_map_async_rate_limit():
+    server = _StubServer(latency=0.0)
+    col = DataFrame({"a": np.arange(10)})["a"].defer(server)
+    server.start_times.clear()
+
+    result = col(executor="async", num_workers=4, rate_limit=50)
+    assert (result == np.arange(10) * 2).all()
+    assert server.start_times[-1] - server.start_times[0] >= 9 / 50 * 0.9
@@ -26,6 +26,7 @@ from meerkat.columns.tensor.abstract import TensorColumn
 from meerkat.columns.tensor.numpy import NumPyTensorColumn
 from meerkat.columns.tensor.torch import TorchTensorColumn
 from meerkat.dataframe import DataFrame
+from meerkat.errors import ConcatError
 from meerkat.interactive.graph.operation import Operation
 from meerkat.interactive.graph.reactivity import is_unmarked_context
 from meerkat.interactive.node import NodeMixin
@@ -711,17 +712,23 @@ def test_rename():
     assert df["b"]._data is b._data
 
 
-@product_parametrize(params={"move": [True, False]})
-def test_io(testbed, tmp_path, move):
+@product_parametrize(
+    params={
+        "move": [True, False],
+        "lazy": [True, False],
+        "single_file": [True, False],
+    }
+)
+def test_io(testbed, tmp_path, move, lazy, single_file):
     """`map`, mixed dataframe, return multiple, `is_batched_fn=True`"""
     df = testbed.df
     path = os.path.join(tmp_path, "test")
-    df.write(path)
+    df.write(path, single_file=single_file)
     if move:
         new_path = os.path.join(tmp_path, "new_test")
         os.rename(path, new_path)
         path = new_path
-    new_df = DataFrame.read(path)
+    new_df = DataFrame.read(path, lazy=lazy)
 
     assert isinstance(new_df, DataFrame)
     assert df.columns == new_df.columns
@@ -737,6 +744,77 @@ def test_io(testbed, tmp_path, move):
             assert False
 
 
+def test_io_single_file_columns(tmp_path):
+    df = DataFrame(
+        {
+            "a": np.arange(10),
+            "b": np.random.rand(10, 3),
+            "c": ObjectColumn([{"x": i} for i in range(10)]),
+        }
+    )
+    # a deferred column whose input is not in the dataframe
+    df["d"] = df["a"][::-1].defer(lambda x: x * 2)
+    path = os.path.join(tmp_path, "test.mk")
+    df.write(path, single_file=True)
+    assert os.path.isfile(path)
+
+    new_df = DataFrame.read(path, columns=["b", "d"])
+    assert new_df.columns == ["b", "d"]
+    assert (new_df["b"] == df["b"]).all()
+    assert new_df["d"]().is_equal(df["d"]())
+
+    # rewriting replaces the file
+    df["e"] = np.zeros(10)
+    df.write(path, single_file=True)
+    assert DataFrame.read(path).columns == ["a", "b", "c", "d", "e"]
+
+
+def test_io_batches(tmp_path):
+    df = DataFrame(
+        {
+            "a": NumPyTensorColumn(np.arange(100)),
+            "b": NumPyTensorColumn(np.arange(100) * 2.0),
+            "c": ArrowScalarColumn(np.arange(100) * 3),
+        }
+    )
+    path = os.path.join(tmp_path, "test")
+    df.write(path, compression="zstd")
+    new_df = DataFrame.read(path, lazy=True)
+    blocks = [new_df["a"]._block, new_df["c"]._block]
+
+    # `map`, `filter` and `aggregate` only read a batch of rows at a time
+    out = new_df.map(lambda a, b: a + b, batch_size=10, is_batched_fn=True)
+    assert (out == np.arange(100) * 3.0).all()
+    filtered = new_df.filter(
+        lambda batch: batch["a"].data % 7 == 0, batch_size=10, is_batched_fn=True
+    )
+    assert (filtered["b"] == np.arange(0, 100, 7) * 2.0).all()
+    assert mk.aggregate(new_df, "mean", batch_size=30) == df.mean()
+    assert all(block.is_pending for block in blocks)
+
+    with pytest.raises(ValueError):
+        mk.aggregate(new_df, lambda col: col.mean(), batch_size=30)
+
+
+@pytest.mark.parametrize("function", ["mean", "sum", "min", "max", "count"])
+def test_aggregate_batches(function):
+    values = np.arange(100, dtype=float)
+    values[40:70] = np.nan
+    df = DataFrame(
+        {
+            "a": PandasScalarColumn(values),
+            "b": ArrowScalarColumn(np.arange(100)),
+            "c": NumPyTensorColumn(np.arange(100)),
+        }
+    )
+    # the aggregates of the batches are combined into that of the whole column
+    expected = mk.aggregate(df, function)
+    assert mk.aggregate(df, function, batch_size=30) == pytest.approx(expected)
+
+    with pytest.raises(ValueError):
+        mk.aggregate(df, "median", batch_size=30)
+
+
 @pytest.mark.parametrize(
     "url_suffix",
     ["embeddings/imagenette_160px.mk.tar.gz"],
@@ -795,6 +873,77 @@ def test_append_columns():
     assert out["b"].data == list(np.concatenate([np.arange(length)] * 2))
 
 
+def test_append_inplace():
+    df = DataFrame(
+        {
+            "a": np.arange(2),
+            "b": PandasScalarColumn(["x", "y"]),
+            "c": ArrowScalarColumn(["x", "y"]),
+            "d": ObjectColumn([{"a": 0}, {"a": 1}]),
+            "e": np.ones((2, 3)),
+        }
+    )
+    batch = df[:1]
+    # appending 10k small batches costs time proportional to the rows appended,
+    # rather than to the square of the rows
+    for _ in range(10_000):
+        out = df.append(batch, inplace=True)
+    assert out is df
+
+    assert len(df) == 10_002
+    assert (df["a"].data[2:] == 0).all()
+    assert df["b"][10_001] == "x" and df["b"][1] == "y"
+    assert df["c"].data.num_chunks <= 16
+    assert df["c"][10_001] == "x" and df["c"][1] == "y"
+    assert df["d"][10_001] == {"a": 0} and len(df["d"].data) == 10_002
+    assert df["e"].shape == (10_002, 3)
+
+    # the batch appended is left unchanged
+    assert len(batch) == 1
+
+    with pytest.raises(ConcatError):
+        df.append(batch[["a"]], inplace=True)
+
+
+def test_append_inplace_fallback():
+    df = DataFrame({"a": np.arange(4), "b": PandasScalarColumn(np.arange(4))})
+    df["c"] = df["a"].defer(lambda x: x + 1)
+
+    # deferred columns can't append in place, so they're concatenated instead
+    df.append(df[:2], inplace=True)
+    assert len(df) == 6
+    assert isinstance(df["c"], DeferredColumn)
+    assert (df["c"]().data == np.array([1, 2, 3, 4, 1, 2])).all()
+
+    # a column of the wrong type leaves all of the columns unchanged
+    other = df[:2]
+    other["b"] = ArrowScalarColumn([0, 1])
+    with pytest.raises(ConcatError):
+        df.append(other, inplace=True)
+    assert len(df["a"]) == len(df["b"]) == len(df["c"]) == 6
+
+    with pytest.raises(NotImplementedError, match="mk.concat"):
+        df["c"].append(df["c"])
+
+
+def test_append_inplace_view():
+    col = ObjectColumn([0, 1])
+    view = col.view()
+    col.append(ObjectColumn([2]))
+    # views of the column don't see the rows appended to it
+    assert col.data == [0, 1, 2]
+    assert view.data == [0, 1]
+
+    col = NumPyTensorColumn(np.arange(2))
+    view = col[:]
+    col.append(NumPyTensorColumn(np.arange(2, 4)))
+    assert (col.data == np.arange(4)).all()
+    assert len(view) == 2
+
+    with pytest.raises(ConcatError):
+        col.append(ObjectColumn([4]))
+
+
 @product_parametrize(
     params={
         "shuffle": [True, False],
@@ -950,6 +1099,81 @@ def test_from_batch():
     assert len(dataframe) == 3
 
 
+@pytest.mark.parametrize("backend", ["pandas", "arrow"])
+def test_from_csv_columns(tmpdir, backend: str):
+    path = os.path.join(tmpdir, "data.csv")
+    pd.DataFrame({"a": np.arange(10), "b": np.arange(10) * 2, "c": ["x"] * 10}).to_csv(
+        path, index=False
+    )
+    df = DataFrame.from_csv(path, backend=backend, columns=["c", "a"])
+    assert df.columns == ["c", "a"]
+    assert df["a"].to_pandas().tolist() == list(range(10))
+
+
+@pytest.mark.parametrize("backend", ["pandas", "arrow"])
+def test_from_parquet_filters(tmpdir, backend: str):
+    import pyarrow.parquet as pq
+
+    from meerkat.tools.parquet import select_row_groups
+
+    path = os.path.join(tmpdir, "data.parquet")
+    table = pa.table({"a": np.arange(100), "b": [str(i) for i in range(100)]})
+    pq.write_table(table, path, row_group_size=10)
+
+    # the statistics of the row groups show only the 3rd and 4th may match
+    filters = [("a", ">=", 25), ("a", "<", 35)]
+    assert select_row_groups(pq.ParquetFile(path).metadata, filters=filters) == [2, 3]
+
+    df = DataFrame.from_parquet(
+        path, backend=backend, columns=["b"], filters=filters, batch_size=4
+    )
+    assert df.columns == ["b"]
+    assert df["b"].to_pandas().tolist() == [str(i) for i in range(25, 35)]
+
+    df = DataFrame.from_parquet(
+        path, backend=backend, row_groups=[1], filters=[("b", "in", ["11", "45"])]
+    )
+    assert df["a"].to_pandas().tolist() == [11]
+    assert df["b"].to_pandas().tolist() == ["11"]
+
+
+def test_from_parquet_lazy(tmpdir):
+    import pyarrow.parquet as pq
+
+    path = os.path.join(tmpdir, "data.parquet")
+    table = pa.table({"a": np.arange(100), "b": [str(i) for i in range(100)]})
+    pq.write_table(table, path, row_group_size=10)
+
+    df = DataFrame.from_parquet(path, lazy=True)
+    assert df.columns == ["a", "b"]
+    assert len(df) == 100
+    assert all(isinstance(df[name], ArrowScalarColumn) for name in df.columns)
+    assert df["a"]._block.is_pending and df["b"]._block.is_pending
+
+    # indexing rows only reads the row groups holding them
+    out = df[25:35]
+    assert out["a"].to_pandas().tolist() == list(range(25, 35))
+    assert out["b"].to_pandas().tolist() == [str(i) for i in range(25, 35)]
+    assert df[np.array([93, 4, 93])]["a"].to_pandas().tolist() == [93, 4, 93]
+    assert df[57] == {"a": 57, "b": "57"}
+    assert df["b"][-1] == "99"
+    assert df["a"]._block.is_pending
+
+    assert (df["a"].to_numpy() == np.arange(100)).all()
+    assert not df["a"]._block.is_pending
+
+
+def test_from_jsonl_chunksize(tmpdir):
+    path = os.path.join(tmpdir, "data.jsonl")
+    with open(path, "w") as f:
+        for idx in range(10):
+            f.write(json.dumps({"a": idx, "b": str(idx)}) + "\n")
+
+    df = DataFrame.from_json(path, lines=True, chunksize=3, columns=["a"])
+    assert df.columns == ["a"]
+    assert df["a"].to_pandas().tolist() == list(range(10))
+
+
 def test_from_arrow():
     table = pa.Table.from_arrays(
         [
@@ -1091,6 +1315,33 @@ def test_parquet_io(testbed, tmpdir, engine):
             assert (df2[name].to_numpy() == col.to_numpy()).all()
 
 
+@product_parametrize(
+    params={"format": ["csv", "feather", "parquet"], "engine": ["arrow", "pandas"]}
+)
+def test_io_batched(tmpdir, format: str, engine: str):
+    df = DataFrame({"a": np.arange(10), "b": [str(i) for i in range(10)]})
+    calls = []
+
+    def fn(x):
+        calls.append(len(x))
+        return x * 2
+
+    # deferred columns are materialized one batch at a time, and written
+    df["c"] = df["a"].defer(fn, is_batched_fn=True, batch_size=100)
+    filepath = os.path.join(tmpdir, f"test.{format}")
+    getattr(df, f"to_{format}")(filepath, engine=engine, batch_size=4)
+    assert calls == [4, 4, 2]
+
+    df2 = getattr(DataFrame, f"from_{format}")(filepath)
+    assert df2.columns == ["a", "b", "c"]
+    assert df2["a"].to_pandas().tolist() == list(range(10))
+    assert df2["c"].to_pandas().tolist() == list(range(0, 20, 2))
+    if format == "parquet":
+        import pyarrow.parquet as pq
+
+        assert pq.ParquetFile(filepath).num_row_groups == 3
+
+
 def test_json_io(testbed, tmpdir):
     df = testbed.df
     filepath = os.path.join(tmpdir, "test.json")
@@ -1277,6 +1528,57 @@ def test_loc_missing():
         df.loc[1, 2, 4]
 
 
+@pytest.mark.parametrize(
+    "column_type", [ScalarColumn, ArrowScalarColumn, NumPyTensorColumn]
+)
+def test_loc_many(column_type):
+    keys = np.arange(10_000)
+    df = DataFrame({"a": column_type(keys[::-1].copy()), "b": ScalarColumn(keys)})
+    df = df.set_primary_key("a")
+
+    indices = np.random.permutation(keys)[:1000]
+    new_df = df.loc[indices]
+    assert (new_df["a"].to_numpy() == indices).all()
+    assert (new_df["b"].to_numpy() == len(keys) - 1 - indices).all()
+
+    # lists of keys are looked up in the same order
+    assert (df.loc[list(indices)]["b"].to_numpy() == len(keys) - 1 - indices).all()
+
+
+def test_loc_after_write():
+    df = DataFrame({"a": ScalarColumn(np.arange(4)), "b": ScalarColumn([4, 5, 6, 7])})
+    df = df.set_primary_key("a")
+    assert df.loc[0]["b"] == 4
+
+    # the key index is rebuilt after the key column is written to
+    df["a"][0] = 100
+    assert df.loc[100]["b"] == 4
+    with pytest.raises(KeyError):
+        df.loc[0]
+
+
+@pytest.mark.parametrize("column_type", [PandasScalarColumn, NumPyTensorColumn])
+def test_loc_after_inplace_write(column_type):
+    df = DataFrame(
+        {"id": column_type(np.array([10, 20, 30])), "b": ScalarColumn([4, 5, 6])}
+    )
+    df = df.set_primary_key("id")
+    assert df.loc[20]["b"] == 5
+
+    # writing through the data doesn't bump the version of the column, but the
+    # positions looked up are checked against its values
+    df["id"].data[1] = 99
+    assert df.loc[99]["b"] == 5
+    with pytest.raises(KeyError):
+        df.loc[20]
+    assert list(df.loc[[30, 99]]["b"]) == [6, 5]
+
+    df["id"].data[0] = 11
+    assert list(df.loc[[11, 30]]["b"]) == [4, 6]
+    with pytest.raises(KeyError):
+        df.loc[[10, 30]]
+
+
 def test_primary_key_persistence():
     df = DataFrame({"a": ScalarColumn(np.arange(16)), "b": ScalarColumn(np.arange(16))})
     df = df.set_primary_key("a")
@@ -1286,6 +1588,17 @@ def test_primary_key_persistence():
     assert (df.primary_key == ScalarColumn(np.arange(4))).all()
 
 
+def test_primary_key_persistence_selection():
+    df = DataFrame({"a": ScalarColumn(np.arange(16)), "b": ScalarColumn(np.arange(16))})
+    df = df.set_primary_key("a")
+
+    df = df[np.arange(16) % 2 == 0][np.array([7, 0, 3])][:2]
+    assert df.primary_key_name == "a"
+    # the primary key stays valid without gathering the selected rows
+    assert df["a"]._block.selection is not None
+    assert (df.primary_key == ScalarColumn([14, 0])).all()
+
+
 def test_invalid_primary_key():
     # multidimenmsional
     df = DataFrame({"a": TorchTensorColumn([[1, 2, 3]])})
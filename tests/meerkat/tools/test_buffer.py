@@ -0,0 +1,55 @@
+import numpy as np
+import pyarrow as pa
+import pytest
+
+from meerkat.tools.buffer import append_chunks, append_rows
+
+
+def test_append_rows():
+    data = np.arange(3)
+    out = append_rows(data, np.arange(3, 5))
+    assert (out == np.arange(5)).all()
+
+    # appending to all the rows in use of the buffer doesn't copy them
+    out2 = append_rows(out, np.arange(5, 6))
+    assert np.shares_memory(out, out2)
+    assert (out2 == np.arange(6)).all()
+    assert (out == np.arange(5)).all()
+
+    # appending to fewer rows than are in use copies them to a new buffer
+    out3 = append_rows(out, np.array([-1]))
+    assert not np.shares_memory(out2, out3)
+    assert (out3 == np.array([0, 1, 2, 3, 4, -1])).all()
+    assert (out2 == np.arange(6)).all()
+
+
+def test_append_rows_amortized():
+    data = np.zeros((0, 2))
+    buffers = set()
+    for i in range(1000):
+        data = append_rows(data, np.full((1, 2), i))
+        buffers.add(data.__array_interface__["data"][0])
+    assert (data[:, 0] == np.arange(1000)).all()
+    # the buffer is only reallocated when its capacity doubles
+    assert len(buffers) <= 8
+
+
+def test_append_rows_upcast():
+    out = append_rows(append_rows(np.arange(3), np.arange(1)), np.array([0.5]))
+    assert out.dtype == np.float64
+    assert (out == np.array([0, 1, 2, 0, 0.5])).all()
+
+
+def test_append_rows_shape_mismatch():
+    with pytest.raises(ValueError):
+        append_rows(np.zeros((3, 2)), np.zeros((1, 3)))
+
+
+def test_append_chunks():
+    chunks = []
+    for i in range(1000):
+        chunks = append_chunks(chunks, pa.array([i]))
+    assert pa.chunked_array(chunks).to_pylist() == list(range(1000))
+    # the chunks are kept ordered by decreasing length
+    assert all(len(a) > len(b) for a, b in zip(chunks, chunks[1:]))
+    assert len(chunks) <= 10
@@ -0,0 +1,294 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+import torch
+
+import meerkat as mk
+from meerkat.tools.cache import DiskCache, MemoryCache, fingerprint, get_deferred_cache
+
+
+@pytest.fixture
+def deferred_cache(tmpdir):
+    enabled, cache_dir = mk.config.cache.enabled, mk.config.cache.cache_dir
+    mk.config.cache.enabled = True
+    mk.config.cache.cache_dir = str(tmpdir)
+    yield get_deferred_cache()
+    mk.config.cache.enabled, mk.config.cache.cache_dir = enabled, cache_dir
+
+
+def test_fingerprint_function():
+    def fn1(x):
+        return x + 1
+
+    first = fingerprint(fn1)
+
+    def fn1(x):  # noqa: F811
+        return x + 1
+
+    assert fingerprint(fn1) == first
+
+    def fn1(x):  # noqa: F811
+        return x + 2
+
+    assert fingerprint(fn1) != first
+
+
+def test_fingerprint_closure():
+    def make_fn(k):
+        return lambda x: x + k
+
+    assert fingerprint(make_fn(1)) == fingerprint(make_fn(1))
+    assert fingerprint(make_fn(1)) != fingerprint(make_fn(2))
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        np.arange(10),
+        pd.Series(["a", "b", "c"]),
+        pa.array([1, 2, 3]),
+        torch.arange(10),
+        ["a", 1, None],
+    ],
+)
+def test_fingerprint_column(data):
+    col = mk.column(data)
+    assert fingerprint(col) == fingerprint(mk.column(data))
+    assert fingerprint(col[1:]) != fingerprint(col)
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        np.arange(10),
+        torch.arange(10),
+        [1, 2, 3],
+        ["a", "b"],
+        [np.int64(1), "a", None],
+        {"a": np.zeros(3), "b": [1.0, 2.0]},
+        (np.ones(2), ["x", "y"]),
+    ],
+)
+def test_disk_cache_round_trip(tmpdir, value):
+    cache = DiskCache(cache_dir=str(tmpdir), max_size=2**20)
+    cache["key"] = value
+    assert "key" in cache
+    out = cache["key"]
+
+    assert type(out) is type(value)
+    assert str(out) == str(value)
+
+
+def test_disk_cache_evict(tmpdir):
+    cache = DiskCache(cache_dir=str(tmpdir), max_size=3 * 8000 + 1000)
+    for idx in range(5):
+        cache[f"key{idx}"] = np.zeros(1000)
+        # access the first entry so that it is the most recently used
+        cache["key0"]
+    assert len(cache) <= 3
+    assert "key0" in cache
+    assert "key1" not in cache
+    assert "key4" in cache
+
+    with pytest.raises(KeyError):
+        cache["key1"]
+
+    # the index is rebuilt from disk
+    assert len(DiskCache(cache_dir=str(tmpdir), max_size=2**20)) == len(cache)
+
+
+def test_disk_cache_evicted_while_read(tmpdir, monkeypatch):
+    cache = DiskCache(cache_dir=str(tmpdir), max_size=2**20)
+    cache["key"] = np.zeros(10)
+
+    def utime(path, *args, **kwargs):
+        # the entry is evicted by another process after it's read
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(os, "utime", utime)
+    with pytest.raises(KeyError):
+        cache["key"]
+
+
+def test_deferred_cache(deferred_cache, tmpdir):
+    calls_path = os.path.join(tmpdir, "calls.txt")
+
+    def fn(x):
+        with open(calls_path, "a") as f:
+            f.write(".")
+        return x * 2
+
+    col = mk.column(np.arange(16)).defer(fn)
+    # `defer` calls the function on the first row to infer the output type
+    num_calls = len(open(calls_path).read())
+    num_entries = len(deferred_cache)
+    out = col(batch_size=4)
+    num_calls += 16
+    assert len(open(calls_path).read()) == num_calls
+    assert len(deferred_cache) == num_entries + 4
+
+    assert col(batch_size=4).is_equal(out)
+    assert len(open(calls_path).read()) == num_calls
+
+    # new inputs are not served from the cache
+    col = mk.column(np.arange(1, 17)).defer(fn)
+    num_entries = len(deferred_cache)
+    assert (col(batch_size=4).data == np.arange(1, 17) * 2).all()
+    assert len(deferred_cache) == num_entries + 4
+
+
+def test_deferred_cache_fingerprints_fn_once(deferred_cache, monkeypatch):
+    import meerkat.tools.cache
+
+    def fn(x):
+        return x * 2
+
+    calls = []
+
+    def _fingerprint(obj):
+        if obj is fn:
+            calls.append(obj)
+        return fingerprint(obj)
+
+    monkeypatch.setattr(meerkat.tools.cache, "fingerprint", _fingerprint)
+    col = mk.column(np.arange(16)).defer(fn)
+    col(batch_size=4)
+    # `fn` is fingerprinted once for the op, not once per batch
+    assert len(calls) == 1
+
+
+def test_deferred_cache_disabled(tmpdir):
+    assert not mk.config.cache.enabled
+    col = mk.column(np.arange(4)).defer(lambda x: x + 1)
+    col(batch_size=2)
+    assert len(DiskCache(cache_dir=str(tmpdir), max_size=2**20)) == 0
+
+
+@pytest.fixture
+def memory_cache():
+    memory_size = mk.config.cache.memory_size
+    mk.config.cache.memory_size = 2**20
+    yield
+    mk.config.cache.memory_size = memory_size
+
+
+def test_memory_cache_evict():
+    cache = MemoryCache(max_size=250)
+    for idx in range(3):
+        cache[idx] = np.zeros(10, dtype=np.int64)
+    assert cache.size == 240
+    cache[0]  # mark the first entry as recently used
+
+    cache[3] = np.zeros(10, dtype=np.int64)
+    assert 1 not in cache and 0 in cache and 3 in cache
+    assert cache.size == 240
+
+    with pytest.raises(KeyError):
+        cache[1]
+    info = cache.info()
+    assert (info.hits, info.misses, info.length) == (1, 1, 3)
+
+    # values larger than the cache are not stored
+    cache[4] = np.zeros(100)
+    assert 4 not in cache
+
+
+def test_memory_cache_disabled():
+    cache = MemoryCache(max_size=0)
+    assert not cache.enabled
+    cache[0] = 1
+    assert len(cache) == 0
+
+
+def test_deferred_cell_cache(memory_cache):
+    calls = []
+
+    def fn(x):
+        calls.append(x)
+        return {"a": x * 2, "b": x * 3}
+
+    df = mk.DataFrame({"x": np.arange(10)})
+    out = df["x"].defer(fn)
+    a, b = out["a"], out["b"]
+    a.clear_cache()
+    calls.clear()
+
+    assert a._get(3, materialize=True) == 6
+    # the cache is shared by the columns of the block
+    assert b._get(3, materialize=True) == 9
+    assert a[4].get() == 8
+    assert calls == [3, 4]
+
+    assert list(a._get(np.arange(2, 6), materialize=True)) == [4, 6, 8, 10]
+    assert calls == [3, 4, 2, 5]
+
+    # and by views of the columns
+    assert a.view()._get(2, materialize=True) == 4
+    assert calls == [3, 4, 2, 5]
+    assert b.cache_info().hits == 4
+
+
+def test_deferred_cell_cache_slices(memory_cache):
+    calls = []
+
+    def fn(x):
+        calls.append(x)
+        return x * 2
+
+    df = mk.DataFrame({"x": np.arange(10)})
+    df["y"] = df["x"].defer(fn)
+    calls.clear()
+
+    # the cache is shared by slices of the dataframe, e.g. the pages of a table
+    assert list(df[2:6]["y"]()) == [4, 6, 8, 10]
+    assert list(df[2:6]["y"]()) == [4, 6, 8, 10]
+    assert list(df[4:8]["y"]()) == [8, 10, 12, 14]
+    assert list(df[[7, 2]]["y"]()) == [14, 4]
+    assert calls == [2, 3, 4, 5, 6, 7]
+
+    # including slices of slices, which are keyed by position in the dataframe
+    assert df[5:][1:3]["y"]._get(0, materialize=True) == 12
+    assert df["y"]._get(6, materialize=True) == 12
+    assert calls == [2, 3, 4, 5, 6, 7]
+
+    # writing to an input invalidates the cells of slices taken before the write
+    page = df[2:4]
+    df["x"][2] = 100
+    assert list(df[2:4]["y"]()) == [200, 6]
+    assert calls[6:] == [100, 3]
+    assert list(page["y"]())[1] == 6
+    assert len(calls) == 10
+
+
+@pytest.mark.parametrize("column_type", [mk.TensorColumn, mk.ScalarColumn])
+def test_deferred_cell_cache_invalidate(memory_cache, column_type):
+    df = mk.DataFrame({"a": column_type(np.arange(4))})
+    out = df["a"].defer(lambda x: int(x) * 10)
+    chained = out.defer(lambda x: x + 1)
+    assert out[0]() == 0
+    assert chained[0]() == 1
+    assert list(out._get(np.arange(4), materialize=True)) == [0, 10, 20, 30]
+
+    # writing to an input invalidates the cells of the ops that depend on it
+    df["a"][0] = 7
+    assert out[0]() == 70
+    assert chained[0]() == 71
+    assert list(out._get(np.arange(4), materialize=True)) == [70, 10, 20, 30]
+
+
+def test_deferred_cell_cache_disabled():
+    calls = []
+
+    def fn(x):
+        calls.append(x)
+        return x + 1
+
+    col = mk.column(np.arange(10)).defer(fn)
+    calls.clear()
+    col._get(3, materialize=True)
+    col._get(3, materialize=True)
+    assert calls == [3, 3]
+    assert col.cache_info().length == 0
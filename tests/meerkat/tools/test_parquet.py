@@ -0,0 +1,49 @@
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from meerkat.tools.parquet import ParquetSource
+
+
+@pytest.fixture
+def path(tmpdir):
+    path = str(tmpdir / "data.parquet")
+    table = pa.table({"a": np.arange(100), "b": [str(i) for i in range(100)]})
+    pq.write_table(table, path, row_group_size=10)
+    return path
+
+
+def test_parquet_source(path):
+    source = ParquetSource(path)
+    assert source.num_rows == 100
+    assert source.columns == ["a", "b"]
+
+    table = source.read(["a"], rows=slice(15, 32))
+    assert table.column_names == ["a"]
+    assert table["a"].to_pylist() == list(range(15, 32))
+    # only the row groups holding the rows are decoded
+    assert source.cache.info().misses == 3
+
+    rows = np.array([31, 99, 16, 31])
+    assert source.read(["a", "b"], rows=rows)["b"].to_pylist() == [str(i) for i in rows]
+    # the decoded row groups of "a" are reused
+    assert source.cache.info().hits == 2
+    assert source.read(["a"], rows=slice(100, 100)).num_rows == 0
+
+
+def test_parquet_source_row_groups(path):
+    source = ParquetSource(path, row_groups=[7, 2])
+    assert source.num_rows == 20
+    assert source.read(["a"])["a"].to_pylist() == [*range(70, 80), *range(20, 30)]
+    assert source.read(["a"], rows=np.array([10, 9]))["a"].to_pylist() == [20, 79]
+
+
+def test_parquet_source_no_cache(path):
+    source = ParquetSource(path, cache_size=0)
+    assert source.read(["a"], rows=slice(15, 32))["a"].to_pylist() == list(
+        range(15, 32)
+    )
+    source.read(["a"], rows=slice(15, 32))
+    assert source.cache.info().hits == 0
+    assert len(source.cache) == 0
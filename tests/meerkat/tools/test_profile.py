@@ -0,0 +1,73 @@
+import json
+import os
+
+import numpy as np
+
+import meerkat as mk
+from meerkat.tools import profile
+from meerkat.tools.profile import PHASES, Profiler
+
+
+def add_one(x):
+    return x + 1
+
+
+def double(x):
+    return x * 2
+
+
+def test_profile_map():
+    df = mk.DataFrame({"a": np.arange(20)})
+    with mk.profile() as profiler:
+        df["a"].defer(add_one).map(double, batch_size=5, is_batched_fn=True)
+        df["a"].defer(add_one)[3]
+
+    assert profile._active_profiler is None
+    summary = profiler.to_df()
+    rows = {
+        (op, phase): rows
+        for op, phase, rows in zip(summary["op"], summary["phase"], summary["rows"])
+    }
+    assert set(summary["phase"]) <= set(PHASES)
+    # `map` also calls the function on the first row to infer its outputs
+    assert rows[("double", "fn")] > 20
+    assert rows[("add_one", "fn")] > 20
+    assert all(summary["time"] >= 0)
+
+    fn_rows = summary[summary["phase"] == "fn"]
+    assert (fn_rows["bytes"] > 0).all()
+
+
+def test_profile_fused():
+    inp = mk.TensorColumn(np.arange(20))
+    col = inp.defer(add_one).defer(double)
+    with Profiler() as profiler:
+        col(batch_size=10)
+
+    ops = set(profiler.to_df()["op"])
+    assert "fused(add_one, double)" in ops
+    assert {"add_one", "double"} <= ops
+
+
+def test_profile_disabled():
+    col = mk.TensorColumn(np.arange(4)).defer(add_one)
+    with Profiler() as profiler:
+        pass
+    col()
+    assert profiler.events == []
+
+
+def test_profile_chrome_trace(tmpdir):
+    col = mk.TensorColumn(np.arange(8)).defer(add_one)
+    with Profiler() as profiler:
+        col(batch_size=4)
+
+    path = os.path.join(tmpdir, "trace.json")
+    trace = profiler.to_chrome_trace(path)
+    with open(path) as f:
+        assert json.load(f) == trace
+
+    events = trace["traceEvents"]
+    assert len(events) == len(profiler.events)
+    assert all(event["ph"] == "X" and event["dur"] >= 0 for event in events)
+    assert {"add_one.fn", "add_one.convert"} <= {event["name"] for event in events}
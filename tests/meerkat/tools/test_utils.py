@@ -0,0 +1,33 @@
+import numpy as np
+
+import meerkat as mk
+from meerkat.interactive.formatter import NumberFormatterGroup
+from meerkat.tools.utils import dumps_manifest, loads_manifest
+
+
+def test_manifest():
+    obj = {
+        "dtype": mk.DataFrame,
+        "tuple": (1, 2.5, None, "a"),
+        "nan": float("nan"),
+        "keys": {1: "a", ("b", 2): [True, False]},
+        "tagged": {"!name": "not a tag"},
+        "array": np.arange(3),
+        "fn": lambda x: x + 1,
+    }
+    decoded = loads_manifest(dumps_manifest(obj))
+    assert decoded["dtype"] is mk.DataFrame
+    assert decoded["tuple"] == (1, 2.5, None, "a")
+    assert np.isnan(decoded["nan"])
+    assert decoded["keys"] == {1: "a", ("b", 2): [True, False]}
+    assert decoded["tagged"] == {"!name": "not a tag"}
+    assert (decoded["array"] == np.arange(3)).all()
+    assert decoded["fn"](1) == 2
+
+
+def test_manifest_formatters():
+    group = NumberFormatterGroup(precision=2)
+    decoded = loads_manifest(dumps_manifest({"_formatters": group}))["_formatters"]
+    assert type(decoded) is NumberFormatterGroup
+    assert decoded.keys() == group.keys()
+    assert decoded["base"]._get_state() == group["base"]._get_state()